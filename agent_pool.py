@@ -0,0 +1,196 @@
+"""
+Pool of compiled RAG agents keyed by tenant and role
+
+create_agent compiles a LangGraph graph and binds the tools for one
+(tenant_id, user_role) pair, which is too slow to repeat per request when
+traffic from several tenants is interleaved. The pool keeps compiled agents in
+a bounded LRU, drops agents that have been idle longer than the TTL, and builds
+each missing agent once even when concurrent requests ask for it together.
+Build times are recorded so they can be checked in the health endpoint.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """Bounded LRU of compiled agents per (tenant_id, user_role) with idle eviction"""
+
+    def __init__(self, builder: Optional[Callable[..., Any]] = None, max_agents: int = 32, idle_ttl_seconds: float = 1800.0):
+        """
+        Initialize the pool
+
+        Args:
+            builder: Called as builder(tenant_id=..., user_role=...) to build an agent (default: echo.create_agent)
+            max_agents: Maximum number of compiled agents kept
+            idle_ttl_seconds: Agents unused for longer are dropped (0 disables idle eviction)
+        """
+        self.builder = builder
+        self.max_agents = max(int(max_agents), 1)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._agents: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        # Per-key [build lock, number of requests using it]; removed once no request holds or waits on it
+        self._build_locks: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "misses": 0, "builds": 0, "build_failures": 0,
+            "build_ms_total": 0.0, "build_ms_max": 0.0,
+            "evicted_lru": 0, "evicted_idle": 0
+        }
+
+    def _build(self, tenant_id: str, user_role: str) -> Any:
+        if self.builder is None:
+            # Imported here so importing the pool doesn't pull in the LLM stack
+            from echo import create_agent
+            self.builder = create_agent
+        return self.builder(tenant_id=tenant_id, user_role=user_role)
+
+    def _lookup(self, key: Tuple[str, str], now: float) -> Optional[Any]:
+        """Return a pooled agent and mark it used (caller holds self._lock)"""
+        entry = self._agents.get(key)
+        if entry is None:
+            return None
+        self._agents[key] = (entry[0], now)
+        self._agents.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry[0]
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop agents idle longer than the TTL (caller holds self._lock)"""
+        if not self.idle_ttl_seconds:
+            return
+        # Entries are in least-recently-used order, so stop at the first fresh one
+        while self._agents:
+            key, (_, last_used) = next(iter(self._agents.items()))
+            if now - last_used <= self.idle_ttl_seconds:
+                break
+            del self._agents[key]
+            self._stats["evicted_idle"] += 1
+            logger.debug(f"Evicted idle agent for tenant={key[0]} role={key[1]}")
+
+    def get(self, tenant_id: str = "default", user_role: str = "customer") -> Any:
+        """
+        Get the compiled agent for a tenant and role, building it on first use
+
+        Args:
+            tenant_id: Tenant identifier
+            user_role: User role
+
+        Returns:
+            Any: Compiled agent
+        """
+        key = (tenant_id, user_role)
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            agent = self._lookup(key, now)
+            if agent is not None:
+                return agent
+            build_entry = self._build_locks.setdefault(key, [threading.Lock(), 0])
+            build_entry[1] += 1
+
+        try:
+            # One build per key at a time; concurrent requests for the same key wait and reuse it
+            with build_entry[0]:
+                with self._lock:
+                    agent = self._lookup(key, time.monotonic())
+                    if agent is not None:
+                        return agent
+                    # Only the request that builds counts as a miss
+                    self._stats["misses"] += 1
+
+                start = time.perf_counter()
+                try:
+                    agent = self._build(tenant_id, user_role)
+                except Exception:
+                    with self._lock:
+                        self._stats["build_failures"] += 1
+                    raise
+                build_ms = (time.perf_counter() - start) * 1000
+
+                with self._lock:
+                    self._agents[key] = (agent, time.monotonic())
+                    self._agents.move_to_end(key)
+                    while len(self._agents) > self.max_agents:
+                        self._agents.popitem(last=False)
+                        self._stats["evicted_lru"] += 1
+                    self._stats["builds"] += 1
+                    self._stats["build_ms_total"] += build_ms
+                    self._stats["build_ms_max"] = max(self._stats["build_ms_max"], build_ms)
+        finally:
+            with self._lock:
+                build_entry[1] -= 1
+                # Waiters keep the same lock, so a failed build can't let a new request build alongside them
+                if build_entry[1] == 0 and self._build_locks.get(key) is build_entry:
+                    del self._build_locks[key]
+
+        logger.info(f"Built agent for tenant={tenant_id} role={user_role} in {build_ms:.0f}ms")
+        return agent
+
+    def invalidate(self, tenant_id: Optional[str] = None, user_role: Optional[str] = None) -> int:
+        """
+        Drop pooled agents so they are rebuilt on next use
+
+        Args:
+            tenant_id: Only drop agents of this tenant (all tenants if None)
+            user_role: Only drop agents of this role (all roles if None)
+
+        Returns:
+            int: Number of agents dropped
+        """
+        with self._lock:
+            keys = [key for key in self._agents
+                    if (tenant_id is None or key[0] == tenant_id) and (user_role is None or key[1] == user_role)]
+            for key in keys:
+                del self._agents[key]
+        return len(keys)
+
+    def tenant_ids(self) -> List[str]:
+        """Tenants that currently have a pooled agent"""
+        with self._lock:
+            return sorted({key[0] for key in self._agents})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool size, hit-rate and build-time counters
+
+        Returns:
+            Dict[str, Any]: Counters plus hit rate and average build time
+        """
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            builds = self._stats["builds"]
+            return {
+                "entries": len(self._agents),
+                "max_agents": self.max_agents,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "build_ms_avg": self._stats["build_ms_total"] / builds if builds else 0.0
+            }
+
+
+# Shared pool built from config, created on first use
+_agent_pool: Optional[AgentPool] = None
+_agent_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """Get the shared agent pool configured from chat.agent_pool"""
+    global _agent_pool
+    if _agent_pool is None:
+        with _agent_pool_lock:
+            if _agent_pool is None:
+                pool_config = get_config().get('chat.agent_pool', {}) or {}
+                _agent_pool = AgentPool(
+                    max_agents=pool_config.get('max_agents', 32),
+                    idle_ttl_seconds=pool_config.get('idle_ttl_seconds', 1800)
+                )
+    return _agent_pool
@@ -1,49 +1,106 @@
+import asyncio
+import logging
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from fastapi import HTTPException
 from langchain_core.messages import BaseMessage
 
-# In-memory session storage
+from echo_ui import (
+    get_conversation, get_current_chat_messages, clear_chat_session, drop_conversation,
+    expire_conversations, get_session_limits
+)
+
+logger = logging.getLogger(__name__)
+
+# In-memory session storage (session metadata; chat messages live in echo_ui's per-session conversation state)
 _sessions: Dict[str, Dict] = {}
 
-def get_or_create_session(session_id: Optional[str] = None) -> str:
-    """Get existing session or create new one"""
+def get_or_create_session(session_id: Optional[str] = None, tenant_id: Optional[str] = None,
+                          user_role: Optional[str] = None) -> str:
+    """
+    Get existing session or create new one bound to a tenant context
+
+    An existing session only serves the tenant_id and user_role it was created with, so one
+    tenant can't read or extend another tenant's conversation by reusing its session id;
+    None accepts the session's own context.
+
+    Raises:
+        HTTPException: 403 if the session belongs to a different tenant or role
+    """
     if session_id and session_id in _sessions:
+        session = _sessions[session_id]
+        for key, value in (("tenant_id", tenant_id), ("user_role", user_role)):
+            if value is not None and session.get(key, value) != value:
+                raise HTTPException(status_code=403, detail=f"Session belongs to a different {key}")
+        session["last_activity"] = datetime.now()
         return session_id
-    
+
     # Create new session
     new_session_id = str(uuid.uuid4())
     _sessions[new_session_id] = {
-        "messages": [],
         "created_at": datetime.now(),
-        "last_activity": datetime.now()
+        "last_activity": datetime.now(),
+        "tenant_id": tenant_id or "default",
+        "user_role": user_role or "customer"
     }
     return new_session_id
 
+def get_session_tenant_context(session_id: Optional[str]) -> Dict[str, str]:
+    """Get tenant context from session if available"""
+    if session_id in _sessions:
+        session_data = _sessions[session_id]
+        return {
+            "tenant_id": session_data.get("tenant_id", "default"),
+            "user_role": session_data.get("user_role", "customer")
+        }
+    return {"tenant_id": "default", "user_role": "customer"}
+
 def get_session_messages(session_id: str) -> List[BaseMessage]:
     """Get messages for a session"""
     if session_id in _sessions:
-        return _sessions[session_id]["messages"].copy()
+        return get_current_chat_messages(session_id)
     return []
 
 def add_session_message(session_id: str, message: BaseMessage):
     """Add message to session"""
     if session_id in _sessions:
-        _sessions[session_id]["messages"].append(message)
+        get_conversation(session_id)["messages"].append(message)
         _sessions[session_id]["last_activity"] = datetime.now()
 
 def clear_session(session_id: str):
     """Clear session messages"""
     if session_id in _sessions:
-        _sessions[session_id]["messages"].clear()
+        clear_chat_session(session_id)
         _sessions[session_id]["last_activity"] = datetime.now()
 
-def cleanup_old_sessions():
-    """Remove sessions older than 24 hours"""
-    cutoff_time = datetime.now() - timedelta(hours=24)
-    sessions_to_remove = [
-        sid for sid, session in _sessions.items() 
-        if session["last_activity"] < cutoff_time
-    ]
+def delete_session(session_id: str):
+    """Remove a session and its conversation state"""
+    _sessions.pop(session_id, None)
+    drop_conversation(session_id)
+
+def cleanup_old_sessions() -> int:
+    """Remove sessions idle longer than chat.sessions.idle_ttl_seconds, and conversations left without a session"""
+    idle_ttl_seconds = get_session_limits()["idle_ttl_seconds"]
+    sessions_to_remove = []
+    if idle_ttl_seconds > 0:
+        cutoff_time = datetime.now() - timedelta(seconds=idle_ttl_seconds)
+        sessions_to_remove = [
+            sid for sid, session in list(_sessions.items())
+            if session["last_activity"] < cutoff_time
+        ]
     for sid in sessions_to_remove:
-        del _sessions[sid]
\ No newline at end of file
+        delete_session(sid)
+    expired = expire_conversations()
+    return len(set(sessions_to_remove) | set(expired))
+
+async def run_session_cleanup():
+    """Run cleanup_old_sessions every chat.sessions.cleanup_interval_seconds (started with the API)"""
+    while True:
+        await asyncio.sleep(max(get_session_limits()["cleanup_interval_seconds"], 1))
+        try:
+            removed = await asyncio.to_thread(cleanup_old_sessions)
+            if removed:
+                logger.info(f"Removed {removed} idle chat sessions")
+        except Exception as e:
+            logger.warning(f"Session cleanup failed: {e}")
@@ -25,6 +25,28 @@ app.include_router(chat.router)
 app.include_router(knowledge_base.router)
 app.include_router(session.router)
 
+@app.on_event("startup")
+async def warm_up_services():
+    """Load the embedding model and vector store in the background so startup isn't blocked"""
+    import services
+    services.start_background_warmup()
+
+_session_cleanup_task = None
+
+@app.on_event("startup")
+async def schedule_session_cleanup():
+    """Drop idle chat sessions and their conversation state periodically (chat.sessions)"""
+    import asyncio
+    from .dependencies import run_session_cleanup
+    global _session_cleanup_task
+    _session_cleanup_task = asyncio.create_task(run_session_cleanup())
+
+@app.on_event("shutdown")
+async def stop_session_cleanup():
+    """Stop the periodic session cleanup"""
+    if _session_cleanup_task is not None:
+        _session_cleanup_task.cancel()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -35,16 +57,33 @@ async def health_check():
     """Health check endpoint"""
     from datetime import datetime
     import os
+    import services
     from echo_ui import get_vector_store_status
+    from agent_pool import get_agent_pool
     
     try:
+        # Check API key
+        api_key_present = bool(os.environ.get("GOOGLE_API_KEY"))
+
+        # Report warming instead of blocking while the model and vector store load
+        readiness = services.get_readiness()
+        if readiness["status"] != "ready":
+            return {
+                "status": "warming" if readiness["status"] in ["warming", "cold"] else "unhealthy",
+                "timestamp": datetime.now(),
+                "error": readiness["error_message"],
+                "services": {
+                    "vector_store": readiness["vector_store_open"],
+                    "embedding_model": readiness["embedding_model_loaded"],
+                    "api_key": api_key_present,
+                    "agent": False
+                }
+            }
+
         # Check vector store
         vector_status = get_vector_store_status()
         vector_healthy = vector_status["status"] in ["ready", "empty"]
         
-        # Check API key
-        api_key_present = bool(os.environ.get("GOOGLE_API_KEY"))
-        
         # Overall health
         healthy = vector_healthy and api_key_present
         
@@ -53,9 +92,11 @@ async def health_check():
             "timestamp": datetime.now(),
             "services": {
                 "vector_store": vector_healthy,
+                "embedding_model": True,
                 "api_key": api_key_present,
                 "agent": healthy
-            }
+            },
+            "agent_pool": get_agent_pool().get_stats()
         }
     except Exception as e:
         return {
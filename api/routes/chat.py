@@ -1,40 +1,28 @@
 from fastapi import APIRouter, HTTPException, Form, UploadFile, File
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 import tempfile
 import os
 import uuid
 
 from ..models.requests import ChatRequest, ChatRequestWithTenant, UserRole
 from ..models.responses import ChatResponse, ChatResponseWithTenant
-from ..dependencies import get_or_create_session, add_session_message
-from echo_ui import initialize_agent, process_user_message
+from ..dependencies import get_or_create_session, get_session_tenant_context
+from echo_ui import initialize_agent, aprocess_user_message, astream_user_message
+from chat_streaming import format_sse
 from multiModalInputService import process_uploaded_files
-from langchain_core.messages import HumanMessage, AIMessage
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
-# Global agent initialization - now supports tenant context
-_agent_initialized = False
-_current_agent_context = {"tenant_id": "default", "user_role": "customer"}
-
 def ensure_agent_initialized(tenant_id: str = "default", user_role: str = "customer"):
     """Ensure agent is initialized with proper tenant context"""
-    global _agent_initialized, _current_agent_context
-
-    # Check if we need to reinitialize due to context change
-    context_changed = (
-        _current_agent_context["tenant_id"] != tenant_id or
-        _current_agent_context["user_role"] != user_role
-    )
-
-    if not _agent_initialized or context_changed:
-        try:
-            initialize_agent(tenant_id=tenant_id, user_role=user_role)
-            _agent_initialized = True
-            _current_agent_context = {"tenant_id": tenant_id, "user_role": user_role}
-        except Exception as e:
-            raise HTTPException(status_code=503, detail=f"Agent initialization failed: {str(e)}")
+    # Agents are pooled per tenant and role, so a context change reuses an already compiled agent
+    try:
+        initialize_agent(tenant_id=tenant_id, user_role=user_role)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Agent initialization failed: {str(e)}")
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
@@ -44,8 +32,10 @@ async def chat(
 ):
     """
     Process user query with optional file attachments (legacy endpoint)
+    Uses the tenant context the session was started with
     """
-    return await _process_chat_request(message, session_id, files)
+    tenant_context = get_session_tenant_context(session_id)
+    return await _process_chat_request(message, session_id, files, **tenant_context)
 
 @router.post("/chat-tenant", response_model=ChatResponseWithTenant)
 async def chat_with_tenant(
@@ -76,6 +66,90 @@ async def chat_with_tenant(
         files_processed=chat_result.files_processed
     )
 
+async def _process_files(files: List[UploadFile]):
+    """
+    Process uploaded files for the agent
+
+    Returns:
+        (processed files or None, number of files processed)
+    """
+    if not files:
+        return None, 0
+
+    # Convert UploadFile objects to format expected by process_uploaded_files
+    uploaded_files_list = []
+    for file in files:
+        # Create a temporary object that mimics Streamlit's UploadedFile
+        class MockUploadedFile:
+            def __init__(self, upload_file: UploadFile):
+                self.name = upload_file.filename
+                self.type = upload_file.content_type
+                self._content = None
+                self._upload_file = upload_file
+
+            def getvalue(self):
+                if self._content is None:
+                    self._content = self._upload_file.file.read()
+                    self._upload_file.file.seek(0)  # Reset file pointer
+                return self._content
+
+        uploaded_files_list.append(MockUploadedFile(file))
+
+    processed_files = await asyncio.to_thread(process_uploaded_files, uploaded_files_list)
+    return processed_files, len(processed_files.get("image_files", [])) + len(processed_files.get("doc_files", []))
+
+@router.post("/chat/stream")
+async def chat_stream(
+    message: str = Form(...),
+    tenant_id: str = Form(default="default"),
+    user_role: str = Form(default="customer"),
+    session_id: Optional[str] = Form(None),
+    files: List[UploadFile] = File(default=[])
+):
+    """
+    Stream the agent's answer as server-sent events with tenant context
+
+    Events: "token" (LLM text as it is generated), "tool_start" / "tool_end" (per
+    retrieval or Jira call), then "message" (final answer with session_id, timing and
+    tool metadata); "error" replaces "message" if processing fails.
+    """
+    # Validate user role
+    try:
+        UserRole(user_role)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid user_role. Must be one of: {[r.value for r in UserRole]}")
+
+    actual_session_id = get_or_create_session(session_id, tenant_id=tenant_id, user_role=user_role)
+    await asyncio.to_thread(ensure_agent_initialized, tenant_id=tenant_id, user_role=user_role)
+    processed_files, files_processed_count = await _process_files(files)
+
+    async def event_stream():
+        try:
+            async for event in astream_user_message(
+                message,
+                processed_files,
+                tenant_id=tenant_id,
+                user_role=user_role,
+                session_id=actual_session_id
+            ):
+                if event["event"] == "message":
+                    event["data"].update({
+                        "session_id": actual_session_id,
+                        "tenant_id": tenant_id,
+                        "timestamp": datetime.now().isoformat(),
+                        "files_processed": files_processed_count
+                    })
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Chat processing failed: {str(e)}", "session_id": actual_session_id})
+
+    # No caching or proxy buffering, so each event reaches the client as soon as it is produced
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 async def _process_chat_request(
     message: str,
     session_id: Optional[str],
@@ -87,55 +161,24 @@ async def _process_chat_request(
     Common chat processing logic with tenant context support
     """
     try:
-        # Ensure agent is ready with tenant context
-        ensure_agent_initialized(tenant_id=tenant_id, user_role=user_role)
+        # Get or create session (an existing session must belong to this tenant context)
+        actual_session_id = get_or_create_session(session_id, tenant_id=tenant_id, user_role=user_role)
 
-        # Get or create session
-        actual_session_id = get_or_create_session(session_id)
+        # Ensure agent is ready with tenant context (a pool miss compiles the agent, so off the event loop)
+        await asyncio.to_thread(ensure_agent_initialized, tenant_id=tenant_id, user_role=user_role)
 
         # Process uploaded files if any
-        processed_files = None
-        files_processed_count = 0
-
-        if files:
-            # Convert UploadFile objects to format expected by process_uploaded_files
-            uploaded_files_list = []
-            for file in files:
-                # Create a temporary object that mimics Streamlit's UploadedFile
-                class MockUploadedFile:
-                    def __init__(self, upload_file: UploadFile):
-                        self.name = upload_file.filename
-                        self.type = upload_file.content_type
-                        self._content = None
-                        self._upload_file = upload_file
-
-                    def getvalue(self):
-                        if self._content is None:
-                            self._content = self._upload_file.file.read()
-                            self._upload_file.file.seek(0)  # Reset file pointer
-                        return self._content
-
-                uploaded_files_list.append(MockUploadedFile(file))
-
-            processed_files = process_uploaded_files(uploaded_files_list)
-            files_processed_count = len(processed_files.get("image_files", [])) + len(processed_files.get("doc_files", []))
-
-        # Store user message in session
-        user_message = HumanMessage(content=message)
-        add_session_message(actual_session_id, user_message)
-
-        # Process message through agent with tenant context
-        ai_response = process_user_message(
+        processed_files, files_processed_count = await _process_files(files)
+
+        # Process message through agent with tenant context; the exchange is stored in the session's conversation
+        ai_response = await aprocess_user_message(
             message,
             processed_files,
             tenant_id=tenant_id,
-            user_role=user_role
+            user_role=user_role,
+            session_id=actual_session_id
         )
 
-        # Store AI response in session
-        ai_message = AIMessage(content=ai_response)
-        add_session_message(actual_session_id, ai_message)
-
         return ChatResponse(
             response=ai_response,
             session_id=actual_session_id,
@@ -143,5 +186,7 @@ async def _process_chat_request(
             files_processed=files_processed_count
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
\ No newline at end of file
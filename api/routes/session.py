@@ -1,27 +1,19 @@
 from fastapi import APIRouter, HTTPException
+import asyncio
 import uuid
 from datetime import datetime
 from typing import Dict, Any
 
 from ..models.requests import SessionEndRequest, UserRole
 from ..models.responses import SessionEndResponse, SessionStartResponse, SessionHistoryResponse, SessionClearResponse
-from ..dependencies import get_or_create_session, get_session_messages, clear_session, _sessions
+from ..dependencies import (
+    get_or_create_session, get_session_messages, clear_session, delete_session, get_session_tenant_context, _sessions
+)
 from echo_ui import initialize_agent, save_current_chat_session, clear_chat_session
 
 router = APIRouter(prefix="/api/v1", tags=["session"])
 
 
-def get_session_tenant_context(session_id: str) -> Dict[str, str]:
-    """Get tenant context from session if available"""
-    if session_id in _sessions:
-        session_data = _sessions[session_id]
-        return {
-            "tenant_id": session_data.get("tenant_id", "default"),
-            "user_role": session_data.get("user_role", "customer")
-        }
-    return {"tenant_id": "default", "user_role": "customer"}
-
-
 @router.post("/session/start", response_model=SessionStartResponse)
 async def start_session(
     tenant_id: str = "default",
@@ -42,19 +34,18 @@ async def start_session(
         # Initialize agent with tenant context
         agent_initialized = False
         try:
-            initialize_agent(tenant_id=tenant_id, user_role=user_role)
+            # A pool miss compiles the agent, so off the event loop
+            await asyncio.to_thread(initialize_agent, tenant_id=tenant_id, user_role=user_role)
             agent_initialized = True
         except Exception as e:
             raise HTTPException(status_code=503, detail=f"Agent initialization failed: {str(e)}")
 
-        # Create new session using dependencies
-        session_id = get_or_create_session()
+        # Create new session bound to the tenant context
+        session_id = get_or_create_session(tenant_id=tenant_id, user_role=user_role)
 
-        # Add agent initialization status and tenant context to session
+        # Add agent initialization status to session
         if session_id in _sessions:
             _sessions[session_id]["agent_initialized"] = agent_initialized
-            _sessions[session_id]["tenant_id"] = tenant_id
-            _sessions[session_id]["user_role"] = user_role
 
         return SessionStartResponse(
             session_id=session_id,
@@ -80,11 +71,11 @@ async def end_session(request: SessionEndRequest):
         if session_id not in _sessions:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Save current chat session
-        save_current_chat_session()
+        # Save this session's chat (an LLM summarization call and a file write, so off the event loop)
+        await asyncio.to_thread(save_current_chat_session, session_id)
         
         # Remove session from memory
-        del _sessions[session_id]
+        delete_session(session_id)
         
         return SessionEndResponse(
             success=True,
@@ -118,6 +109,9 @@ async def get_session_history(session_id: str):
             if hasattr(msg, 'type') and hasattr(msg, 'content'):
                 role = "user" if msg.type == "human" else "assistant"
                 content = msg.content
+                if isinstance(content, list):
+                    # Multi-modal message: show its text parts
+                    content = " ".join(part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text")
             else:
                 # Fallback for dict-like messages
                 role = msg.get("role", "unknown")
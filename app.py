@@ -3,6 +3,7 @@ import streamlit as st
 import os
 from pathlib import Path
 import tempfile
+import uuid
 from echo_ui import initialize_agent, process_user_message, get_vector_store_status, clear_chat_session, save_current_chat_session
 from data_ingestion import ingest_file_with_feedback
 
@@ -26,6 +27,9 @@ def initialize_session_state():
         st.session_state.uploaded_files = []
     if 'file_uploader_key' not in st.session_state:
         st.session_state.file_uploader_key = 0
+    if 'chat_session_id' not in st.session_state:
+        # Each browser session keeps its own conversation in echo_ui
+        st.session_state.chat_session_id = str(uuid.uuid4())
 
 def render_data_ingestion_section():
     """Render the data ingestion interface"""
@@ -172,7 +176,7 @@ def render_chat_section():
         # Get AI response [Main AI agent call]
         with st.spinner("Thinking..."):
             try:
-                ai_response = process_user_message(user_input, processed_files)
+                ai_response = process_user_message(user_input, processed_files, session_id=st.session_state.chat_session_id)
                 
                 # Add AI response to history
                 st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
@@ -198,7 +202,7 @@ def render_chat_section():
         if st.session_state.chat_history:
             with st.spinner("Saving chat session..."):
                 try:
-                    save_current_chat_session()
+                    save_current_chat_session(st.session_state.chat_session_id)
                     st.session_state.chat_history.clear()
                     st.success("✅ Chat session saved and ended successfully!")
                     st.rerun()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Scoring Feature Backfill Script
+
+Chunks ingested now carry precomputed scoring features: quality_score, epoch-second
+timestamps (ingestion_epoch, file_modified_epoch) and a sparse term_vector. This
+script adds the same fields to chunks ingested before they existed so retrieval
+reads them directly instead of recomputing per query. Only metadata is
+rewritten; embeddings are left as they are.
+
+Usage:
+    python backfill_scoring_features.py [--collection <name> | --tenant_id <tenant_id>] [--batch_size <n>] [--force] [--dry_run]
+
+Examples:
+    # Count chunks missing features in every collection
+    python backfill_scoring_features.py --dry_run
+
+    # Recompute features for tenant "acme_corp", even where already present
+    python backfill_scoring_features.py --tenant_id acme_corp --force
+"""
+
+import argparse
+import math
+import sys
+from datetime import datetime
+from typing import Dict, Any, Optional
+import sqlite_fix  # Import before ChromaDB
+
+import services
+from rag_scoring import compute_quality_score
+from term_vectors import TERM_VECTOR_KEY, document_term_vector, serialize_term_vector
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+FEATURE_KEYS = ("quality_score", "ingestion_epoch", "file_modified_epoch", TERM_VECTOR_KEY)
+
+
+def _iso_to_epoch(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds for an ISO timestamp, None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def scoring_features(metadata: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    Compute the precomputed scoring fields for one chunk
+
+    Args:
+        metadata: Existing chunk metadata
+        text: Chunk content
+
+    Returns:
+        Dict[str, Any]: Feature fields to merge into the metadata (timestamps that
+            can't be parsed are left out so recency scoring treats them as unknown)
+    """
+    features = {
+        "quality_score": compute_quality_score(metadata),
+        TERM_VECTOR_KEY: serialize_term_vector(document_term_vector(text or ""))
+    }
+    for epoch_key, iso_key in (("ingestion_epoch", "ingestion_timestamp"), ("file_modified_epoch", "file_modified_timestamp")):
+        epoch = _iso_to_epoch(metadata.get(iso_key))
+        if epoch is not None and not math.isnan(epoch):
+            features[epoch_key] = epoch
+    return features
+
+
+class ScoringFeatureBackfill:
+    """Class to add precomputed scoring features to existing chunks"""
+
+    def __init__(self, batch_size: int = 500, force: bool = False, dry_run: bool = False):
+        self.client = services._get_chroma_client()
+        self.batch_size = batch_size
+        self.force = force
+        self.dry_run = dry_run
+
+    def needs_update(self, metadata: Dict[str, Any]) -> bool:
+        """Whether a chunk is missing features (always true with --force)"""
+        if self.force:
+            return True
+        if "quality_score" not in metadata or TERM_VECTOR_KEY not in metadata:
+            return True
+        return ("ingestion_epoch" not in metadata and bool(metadata.get("ingestion_timestamp"))) or \
+            ("file_modified_epoch" not in metadata and bool(metadata.get("file_modified_timestamp")))
+
+    def backfill(self, collection_name: str) -> Dict[str, int]:
+        """Add features to every chunk in a collection that needs them"""
+        collection = self.client.get_collection(collection_name)
+        total = collection.count()
+        stats = {"scanned": 0, "updated": 0}
+
+        offset = 0
+        while offset < total:
+            batch = collection.get(include=['documents', 'metadatas'], limit=self.batch_size, offset=offset)
+            if not batch['ids']:
+                break
+
+            update_ids, update_metadatas = [], []
+            for chunk_id, text, metadata in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                metadata = metadata or {}
+                if self.needs_update(metadata):
+                    update_ids.append(chunk_id)
+                    update_metadatas.append({**metadata, **scoring_features(metadata, text)})
+
+            if update_ids and not self.dry_run:
+                # Metadata only - ids and embeddings are unchanged, so offsets stay valid
+                collection.update(ids=update_ids, metadatas=update_metadatas)
+
+            stats["scanned"] += len(batch['ids'])
+            stats["updated"] += len(update_ids)
+            offset += len(batch['ids'])
+            logger.info(f"{collection_name}: scanned {offset}/{total}, {stats['updated']} need features")
+
+        return stats
+
+
+def resolve_collections(args):
+    """Collections selected on the command line (default: every collection in use)"""
+    if args.collection:
+        return [args.collection]
+    if args.tenant_id:
+        return [services.get_collection_name(args.tenant_id)]
+    return services.list_collection_names()
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Add precomputed scoring features to existing chunks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--collection', help='Collection to backfill (default: all collections in use)')
+    target_group.add_argument('--tenant_id', help="Backfill the collection holding this tenant's documents")
+    parser.add_argument('--batch_size', type=int, default=500, help='Chunks read per batch (default: 500)')
+    parser.add_argument('--force', action='store_true', help='Recompute features even where already present')
+    parser.add_argument('--dry_run', action='store_true', help='Count chunks that need features without changing anything')
+    parser.add_argument('--log_level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                        help='Set the logging level (default: INFO)')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+
+    try:
+        backfill = ScoringFeatureBackfill(batch_size=args.batch_size, force=args.force, dry_run=args.dry_run)
+        collections = resolve_collections(args)
+        if not collections:
+            logger.warning("No collections found")
+            sys.exit(0)
+
+        for collection_name in collections:
+            stats = backfill.backfill(collection_name)
+            if args.dry_run:
+                logger.info(f"🔍 DRY RUN: {collection_name}: {stats['updated']}/{stats['scanned']} chunks would be updated")
+            else:
+                logger.info(f"✓ {collection_name}: updated {stats['updated']}/{stats['scanned']} chunks")
+
+        logger.info("✅ Done")
+        sys.exit(0)
+
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Backfill interrupted by user - re-run to resume")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ Backfill failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@ Vector Database Backup Script
 
 This script creates a backup of the current ChromaDB vector store before
 running metadata updates. It exports all documents, metadata, and embeddings
-to a JSON file for recovery purposes.
+to a JSON file for recovery purposes. Every collection is included (all shards
+when collection sharding is enabled); each document records its collection.
 
 Usage:
     python backup_vector_db.py [--output_file <filename>]
@@ -20,7 +21,7 @@ from datetime import datetime
 from pathlib import Path
 import sqlite_fix  # Import before ChromaDB
 
-from services import vector_store, db_collection_name
+from services import list_collection_names, _get_chroma_client
 from logger_setup import setup_logger
 
 logger = setup_logger()
@@ -36,56 +37,58 @@ def create_backup(output_file: str = None) -> bool:
     logger.info("=" * 60)
     logger.info("VECTOR DATABASE BACKUP SCRIPT")
     logger.info("=" * 60)
-    logger.info(f"Collection: {db_collection_name}")
+    collection_names = list_collection_names()
+    logger.info(f"Collections: {', '.join(collection_names) or '(none)'}")
     logger.info(f"Output file: {output_file}")
     logger.info("=" * 60)
 
     try:
-        # Get all documents from the collection
         logger.info("Retrieving documents from ChromaDB...")
-        collection = vector_store._collection
+        client = _get_chroma_client()
 
-        results = collection.get(
-            include=['metadatas', 'documents', 'embeddings']
-        )
-
-        if not results['ids']:
-            logger.warning("No documents found in the vector store")
-            return False
-
-        document_count = len(results['ids'])
-        logger.info(f"Found {document_count} documents to backup")
-
-        # Prepare backup data
         backup_data = {
             'metadata': {
                 'backup_timestamp': datetime.now().isoformat(),
-                'collection_name': db_collection_name,
-                'document_count': document_count,
-                'script_version': '1.0'
+                'collection_names': collection_names,
+                'document_count': 0,
+                'script_version': '1.1'
             },
             'documents': []
         }
 
-        # Process each document
-        for i in range(document_count):
-            # Handle embeddings - convert numpy array to list for JSON serialization
-            embedding_data = None
-            if results['embeddings'] is not None and len(results['embeddings']) > i:
-                embedding = results['embeddings'][i]
-                # Convert numpy array to list if needed
-                if hasattr(embedding, 'tolist'):
-                    embedding_data = embedding.tolist()
-                else:
-                    embedding_data = embedding
-
-            doc_data = {
-                'id': results['ids'][i],
-                'document': results['documents'][i] if results['documents'] is not None and len(results['documents']) > i else None,
-                'metadata': results['metadatas'][i] if results['metadatas'] is not None and len(results['metadatas']) > i else {},
-                'embedding': embedding_data
-            }
-            backup_data['documents'].append(doc_data)
+        for collection_name in collection_names:
+            results = client.get_collection(collection_name).get(
+                include=['metadatas', 'documents', 'embeddings']
+            )
+            logger.info(f"Found {len(results['ids'])} documents in {collection_name}")
+
+            # Process each document
+            for i in range(len(results['ids'])):
+                # Handle embeddings - convert numpy array to list for JSON serialization
+                embedding_data = None
+                if results['embeddings'] is not None and len(results['embeddings']) > i:
+                    embedding = results['embeddings'][i]
+                    # Convert numpy array to list if needed
+                    if hasattr(embedding, 'tolist'):
+                        embedding_data = embedding.tolist()
+                    else:
+                        embedding_data = embedding
+
+                doc_data = {
+                    'id': results['ids'][i],
+                    'collection': collection_name,
+                    'document': results['documents'][i] if results['documents'] is not None and len(results['documents']) > i else None,
+                    'metadata': results['metadatas'][i] if results['metadatas'] is not None and len(results['metadatas']) > i else {},
+                    'embedding': embedding_data
+                }
+                backup_data['documents'].append(doc_data)
+
+        document_count = len(backup_data['documents'])
+        if not document_count:
+            logger.warning("No documents found in the vector store")
+            return False
+        backup_data['metadata']['document_count'] = document_count
+        logger.info(f"Found {document_count} documents to backup")
 
         # Write backup to file
         logger.info(f"Writing backup to {output_file}...")
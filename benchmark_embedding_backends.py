@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Benchmark Script
+
+This script embeds real knowledge base chunks with each embedding backend
+(PyTorch, ONNX, int8-quantized ONNX), reports throughput in docs/sec and checks
+cosine drift of every backend against the PyTorch vectors for the same texts.
+
+Usage:
+    python benchmark_embedding_backends.py [--backends torch onnx onnx_int8] [--limit <chunks>] [--batch_size <n>]
+    python benchmark_embedding_backends.py --export_int8 <output_dir>
+
+Examples:
+    # Compare all backends on up to 500 chunks from knowledgeBase/
+    python benchmark_embedding_backends.py --limit 500
+
+    # Export an int8-quantized ONNX copy of the model for a deployment without hub access
+    python benchmark_embedding_backends.py --export_int8 models/minilm-int8
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from embedding_engine import EmbeddingEngine, SUPPORTED_BACKENDS, load_sentence_transformer, cosine_drift
+from config_loader import get_config
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+
+def load_benchmark_texts(directory: str, limit: int) -> List[str]:
+    """Chunk the knowledge base files the same way ingestion does"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from data_ingestion import extract_pdf, extract_docx, extract_txt, get_supported_extensions
+
+    processors = {'.pdf': extract_pdf, '.docx': extract_docx, '.txt': extract_txt, '.md': extract_txt}
+    chunking_config = get_config().get('document_processing.chunking', {})
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunking_config.get('chunk_size', 1000),
+        chunk_overlap=chunking_config.get('chunk_overlap', 200)
+    )
+
+    texts = []
+    for file_path in sorted(Path(directory).iterdir()):
+        extension = file_path.suffix.lower()
+        if extension not in processors or extension not in get_supported_extensions():
+            continue
+        try:
+            documents = processors[extension](str(file_path)) or []
+        except Exception as e:
+            logger.warning(f"Skipping {file_path.name}: {e}")
+            continue
+        texts.extend(chunk.page_content for chunk in splitter.split_documents(documents))
+        if len(texts) >= limit:
+            break
+
+    return texts[:limit]
+
+
+def export_int8(model_name: str, output_dir: str, quantization: str) -> None:
+    """Save the model with PyTorch weights, an ONNX export and an int8 dynamically quantized variant"""
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    # Keep the PyTorch weights alongside the ONNX files so the torch parity reference still loads
+    load_sentence_transformer(model_name, "torch").save(output_dir)
+    model = load_sentence_transformer(output_dir, "onnx")
+    model.save(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, output_dir)
+    logger.info(f"Exported ONNX and int8 ({quantization}) models to {output_dir}")
+    logger.info(f"Set embedding.model_name to '{output_dir}' and embedding.backend to 'onnx_int8' to use it")
+
+
+def main():
+    """Main function to handle command line arguments"""
+    embedding_config = get_config().get_section('embedding')
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark embedding backends for throughput and parity",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--backends', nargs='+', choices=SUPPORTED_BACKENDS, default=SUPPORTED_BACKENDS,
+                        help='Backends to benchmark (default: all)')
+    parser.add_argument('--model_name', default=embedding_config.get('model_name', 'sentence-transformers/all-MiniLM-L6-v2'),
+                        help='Model name or local path (default: embedding.model_name from config)')
+    parser.add_argument('--data_dir', default='knowledgeBase', help='Directory of documents to chunk (default: knowledgeBase)')
+    parser.add_argument('--limit', type=int, default=500, help='Maximum number of chunks to embed (default: 500)')
+    parser.add_argument('--batch_size', type=int, default=embedding_config.get('batch_size', 32),
+                        help='Texts per encode call (default: embedding.batch_size from config)')
+    parser.add_argument('--export_int8', metavar='OUTPUT_DIR', help='Export an int8-quantized ONNX model and exit')
+    parser.add_argument('--quantization', default='avx2', choices=['arm64', 'avx2', 'avx512', 'avx512_vnni'],
+                        help='Quantization config used with --export_int8 (default: avx2)')
+    args = parser.parse_args()
+
+    if args.export_int8:
+        export_int8(args.model_name, args.export_int8, args.quantization)
+        return 0
+
+    texts = load_benchmark_texts(args.data_dir, args.limit)
+    if not texts:
+        logger.error(f"No supported documents found in {args.data_dir}")
+        return 1
+    logger.info(f"Benchmarking {len(texts)} chunks from {args.data_dir} with batch size {args.batch_size}")
+
+    # PyTorch vectors are the parity reference, so always compute them first
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    reference = None
+    results = []
+
+    for backend in backends:
+        try:
+            model = load_sentence_transformer(args.model_name, backend)
+        except Exception as e:
+            logger.error(f"Could not load backend '{backend}': {e}")
+            continue
+
+        engine = EmbeddingEngine(model, batch_size=args.batch_size)
+        engine.encode(texts[:args.batch_size])  # warm-up
+        engine.reset_stats()
+
+        start = time.perf_counter()
+        embeddings = engine.encode(texts)
+        elapsed = time.perf_counter() - start
+
+        if backend == "torch":
+            reference = embeddings
+        parity = cosine_drift(reference, embeddings) if reference is not None else None
+
+        if backend in args.backends:
+            results.append((backend, len(texts) / elapsed, parity))
+
+    print("\n" + "=" * 64)
+    print(f"{'backend':<12}{'docs/sec':>12}{'mean cosine':>14}{'min cosine':>13}{'max drift':>13}")
+    print("-" * 64)
+    for backend, docs_per_sec, parity in results:
+        if parity:
+            print(f"{backend:<12}{docs_per_sec:>12.1f}{parity['mean_cosine']:>14.5f}"
+                  f"{parity['min_cosine']:>13.5f}{parity['max_drift']:>13.5f}")
+        else:
+            print(f"{backend:<12}{docs_per_sec:>12.1f}{'n/a':>14}{'n/a':>13}{'n/a':>13}")
+    print("=" * 64)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
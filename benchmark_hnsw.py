@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+HNSW Recall/Latency Benchmark Script
+
+This script measures query latency (p50/p95) and recall@k of a ChromaDB
+collection's HNSW index against exact brute-force search over the same stored
+embeddings. Queries are either sampled from the stored chunk embeddings or
+embedded from a text file, so it runs on real knowledgeBase data. Several
+search_ef values can be compared in one run; the collection's original value is
+restored afterwards.
+
+Usage:
+    python benchmark_hnsw.py [--collection <name> | --tenant_id <tenant_id>] [--k <n>] [--num_queries <n>] [--search_ef <ef> ...] [--queries_file <path>]
+
+Examples:
+    # Sweep search_ef on the default collection
+    python benchmark_hnsw.py --search_ef 10 50 100 200
+
+    # Tenant-filtered queries, as the agent runs them, with real questions
+    python benchmark_hnsw.py --tenant_id acme_corp --queries_file queries.txt
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, Any, List, Optional
+import numpy as np
+import sqlite_fix  # Import before ChromaDB
+
+import services
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """
+    Brute-force nearest neighbours using the collection's distance metric
+
+    Returns:
+        np.ndarray: Row indices into matrix, shape (num_queries, k), nearest first
+    """
+    if space == "l2":
+        distances = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ matrix.T + (matrix ** 2).sum(axis=1)[None, :]
+    elif space == "cosine":
+        matrix_norm = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        query_norm = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        distances = 1.0 - query_norm @ matrix_norm.T
+    else:  # ip
+        distances = 1.0 - queries @ matrix.T
+
+    k = min(k, matrix.shape[0])
+    candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, candidates, axis=1).argsort(axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def load_embeddings(collection, where: Optional[Dict[str, Any]], batch_size: int = 1000):
+    """Page through a collection and return (ids, float32 embedding matrix)"""
+    ids, vectors = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=['embeddings'], where=where, limit=batch_size, offset=offset)
+        if not page['ids']:
+            break
+        ids.extend(page['ids'])
+        vectors.append(np.asarray(page['embeddings'], dtype=np.float32))
+        offset += len(page['ids'])
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    return ids, matrix
+
+
+def run_queries(collection, queries: np.ndarray, k: int, where: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Time one ANN query per row and collect the returned ids"""
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = collection.query(query_embeddings=query[None, :], n_results=k, where=where, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(response['ids'][0])
+    return {"latencies_ms": np.array(latencies), "ids": results}
+
+
+def recall_at_k(ann_ids: List[List[str]], exact_ids: List[List[str]]) -> float:
+    """Mean fraction of exact neighbours the ANN query also returned"""
+    recalls = [len(set(ann) & set(exact)) / max(len(exact), 1) for ann, exact in zip(ann_ids, exact_ids)]
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark HNSW recall@k and query latency against brute force",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--collection', help='Collection to benchmark (default: the default collection)')
+    target_group.add_argument('--tenant_id', help="Benchmark the tenant's collection with the tenant filter applied")
+    parser.add_argument('--k', type=int, default=services.config.get('retrieval.k', 5),
+                        help='Neighbours per query (default: retrieval.k from config)')
+    parser.add_argument('--num_queries', type=int, default=200, help='Number of queries (default: 200)')
+    parser.add_argument('--search_ef', type=int, nargs='+', help='search_ef values to compare (default: current value)')
+    parser.add_argument('--queries_file', help='Text file with one query per line (default: sample stored chunks)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for sampling queries (default: 42)')
+    args = parser.parse_args()
+
+    client = services._get_chroma_client()
+    if args.tenant_id:
+        collection_name = services.get_collection_name(args.tenant_id)
+        where = {"tenant_id": args.tenant_id}
+    else:
+        collection_name = args.collection or services.db_collection_name
+        where = None
+
+    try:
+        collection = client.get_collection(collection_name)
+    except Exception as e:
+        logger.error(f"Could not open collection '{collection_name}': {e}")
+        return 1
+
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    space = hnsw.get("space", "l2")
+    original_ef = hnsw.get("ef_search")
+
+    ids, matrix = load_embeddings(collection, where)
+    if not ids:
+        logger.error(f"No documents found in '{collection_name}'")
+        return 1
+
+    rng = np.random.default_rng(args.seed)
+    if args.queries_file:
+        with open(args.queries_file, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()][:args.num_queries]
+        queries = np.asarray([services.get_embedding_model().embed_query(text) for text in texts], dtype=np.float32)
+    else:
+        sample = rng.choice(len(ids), size=min(args.num_queries, len(ids)), replace=False)
+        queries = matrix[sample]
+
+    k = min(args.k, len(ids))
+    exact = exact_top_k(matrix, queries, k, space)
+    exact_ids = [[ids[i] for i in row] for row in exact]
+
+    logger.info(f"Collection '{collection_name}': {len(ids)} vectors, dim {matrix.shape[1]}, space {space}, "
+                f"construction_ef {hnsw.get('ef_construction')}, M {hnsw.get('max_neighbors')}")
+    logger.info(f"{len(queries)} queries, k={k}{', tenant filter ' + args.tenant_id if args.tenant_id else ''}")
+
+    results = []
+    try:
+        for ef in args.search_ef or [original_ef]:
+            if ef != original_ef:
+                collection.modify(configuration={"hnsw": {"ef_search": ef}})
+            run_queries(collection, queries[:5], k, where)  # warm-up
+            run = run_queries(collection, queries, k, where)
+            results.append((ef, np.percentile(run["latencies_ms"], 50), np.percentile(run["latencies_ms"], 95),
+                            recall_at_k(run["ids"], exact_ids)))
+    finally:
+        if args.search_ef and original_ef is not None:
+            collection.modify(configuration={"hnsw": {"ef_search": original_ef}})
+
+    print("\n" + "=" * 52)
+    print(f"{'search_ef':>10}{'p50 ms':>12}{'p95 ms':>12}{f'recall@{k}':>18}")
+    print("-" * 52)
+    for ef, p50, p95, recall in results:
+        print(f"{str(ef):>10}{p50:>12.2f}{p95:>12.2f}{recall:>18.4f}")
+    print("=" * 52)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
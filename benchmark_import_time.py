@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Import-Time Benchmark Script
+
+This script measures how long it takes a fresh Python process to import the
+modules API workers and the Streamlit app load at boot (echo, echo_ui, api.main).
+Each import runs in its own subprocess with stdin closed, so a module that
+blocks on input at import fails instead of hanging. With --importtime the
+slowest imports (cumulative, from python -X importtime) are listed per module.
+
+Usage:
+    python benchmark_import_time.py [--modules <module> ...] [--runs <n>] [--importtime] [--top <n>] [--extra_path <dir> ...]
+
+Examples:
+    # Compare startup cost of the entry modules
+    python benchmark_import_time.py
+
+    # See which imports dominate echo's startup
+    python benchmark_import_time.py --modules echo --importtime --top 20
+
+    # Put stub packages for optional dependencies (e.g. jira) on the path
+    GOOGLE_API_KEY=dummy python benchmark_import_time.py --extra_path /tmp/stubs
+
+Note:
+    Run it on two commits (e.g. before/after a change) to compare startup times.
+    Older trees import jira and prompt for GOOGLE_API_KEY at import, so set the
+    key and pass --extra_path with a stub jira package when it isn't installed.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Tuple
+
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_MODULES = ["echo", "echo_ui", "api.main"]
+
+
+def _subprocess_env(extra_path: List[str]) -> Dict[str, str]:
+    """Environment for the import subprocesses, with extra_path prepended to PYTHONPATH"""
+    env = dict(os.environ)
+    if extra_path:
+        env["PYTHONPATH"] = os.pathsep.join(list(extra_path) + [p for p in [env.get("PYTHONPATH")] if p])
+    return env
+
+
+def time_import(module: str, runs: int, extra_path: List[str] = None) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters and time each run
+
+    Args:
+        module: Dotted module name
+        runs: Number of subprocesses to start
+        extra_path: Directories prepended to PYTHONPATH (e.g. stub packages)
+
+    Returns:
+        Dict[str, Any]: min/median/max seconds, or the error of the first failed run
+    """
+    code = f"import time; _t = time.perf_counter(); import {module}; print(time.perf_counter() - _t)"
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=_subprocess_env(extra_path)
+        )
+        if result.returncode != 0:
+            return {"module": module, "error": (result.stderr.strip().splitlines() or ["unknown error"])[-1]}
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        "module": module,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings)
+    }
+
+
+def slowest_imports(module: str, top: int, extra_path: List[str] = None) -> List[Tuple[int, str]]:
+    """
+    Cumulative import time per imported package, from python -X importtime
+
+    Returns:
+        List[Tuple[int, str]]: (cumulative microseconds, package) for the slowest imports
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=_subprocess_env(extra_path)
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = (part.strip() for part in line[len("import time:"):].split("|"))
+        entries.append((int(cumulative), package))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark module import time in fresh interpreters",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES,
+                        help=f"Modules to import (default: {' '.join(DEFAULT_MODULES)})")
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module (default: 5)')
+    parser.add_argument('--importtime', action='store_true', help='List the slowest imports per module')
+    parser.add_argument('--top', type=int, default=15, help='Imports listed with --importtime (default: 15)')
+    parser.add_argument('--extra_path', nargs='+', default=[],
+                        help='Directories prepended to PYTHONPATH, e.g. stub packages for missing optional dependencies')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = [time_import(module, args.runs, args.extra_path) for module in args.modules]
+
+    print(f"\n{'module':<20} {'min (s)':>10} {'median (s)':>12} {'max (s)':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<20} failed: {result['error']}")
+        else:
+            print(f"{result['module']:<20} {result['min']:>10.3f} {result['median']:>12.3f} {result['max']:>10.3f}")
+
+    if args.importtime:
+        for module in args.modules:
+            print(f"\nSlowest imports for {module} (cumulative ms):")
+            for cumulative_us, package in slowest_imports(module, args.top, args.extra_path):
+                print(f"  {cumulative_us / 1000:>9.1f}  {package}")
+
+    logger.info(f"Benchmark finished in {time.perf_counter() - start:.1f}s ({args.runs} runs per module)")
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
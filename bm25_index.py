@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Tenant-scoped BM25 inverted index
+
+BM25Index keeps term postings for every ingested chunk in SQLite, keyed by tenant
+and the chunk's vector store id, and serves keyword candidates from an in-memory
+copy loaded per tenant on first use. It is updated by services.add_documents,
+delete_documents and record_metadata_update, so data_ingestion and the metadata
+tools keep it in step with ChromaDB. Every change bumps a per-tenant version row,
+and a process whose in-memory copy is older than the stored version reloads it, so
+ingestion run as a separate process reaches a running API's keyword search.
+Role access (document_visibility and access_role_* flags) is stored per chunk so
+keyword hits obey the same RBAC rules as the vector search filter.
+
+reciprocal_rank_fusion() merges the keyword and dense result lists.
+
+Usage:
+    python bm25_index.py --rebuild [--tenant_id <tenant_id>]
+"""
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keeps codes like "RM-1042" or "plan_v2.1" together as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how i if in is it its
+me my no not of on or our so than that the their them then there these they this to
+was we were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping common stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def access_from_metadata(metadata: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract (document_visibility, comma-separated roles) from chunk metadata"""
+    roles = sorted(key[len("access_role_"):] for key, value in metadata.items()
+                   if key.startswith("access_role_") and value is True)
+    return metadata.get("document_visibility", ""), ",".join(roles)
+
+
+class _TenantPostings:
+    """In-memory postings for one tenant, with an array view compiled for scoring"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.terms: Dict[str, List[str]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.access: Dict[str, Tuple[str, frozenset]] = {}
+        self.total_length = 0
+        # bm25_versions value the postings were loaded at
+        self.version = 0
+        self._compiled: Optional[Dict[str, Any]] = None
+
+    def compiled(self) -> Dict[str, Any]:
+        """Row-indexed arrays of the postings, rebuilt after the first search following a change"""
+        if self._compiled is None:
+            chunk_ids = list(self.lengths)
+            row_of = {chunk_id: row for row, chunk_id in enumerate(chunk_ids)}
+            self._compiled = {
+                "chunk_ids": chunk_ids,
+                "lengths": np.array([self.lengths[chunk_id] for chunk_id in chunk_ids], dtype=np.float32),
+                "public": np.array([self.access[chunk_id][0] == "Public" for chunk_id in chunk_ids], dtype=bool),
+                "postings": {
+                    term: (np.fromiter((row_of[chunk_id] for chunk_id in docs), dtype=np.int64, count=len(docs)),
+                           np.fromiter(docs.values(), dtype=np.float32, count=len(docs)))
+                    for term, docs in self.postings.items()
+                },
+                "role_masks": {}
+            }
+        return self._compiled
+
+    def role_mask(self, user_role: str) -> np.ndarray:
+        """Boolean row mask of chunks visible to a role (Public or access_role_<role>)"""
+        compiled = self.compiled()
+        mask = compiled["role_masks"].get(user_role)
+        if mask is None:
+            mask = compiled["public"] | np.array(
+                [user_role in self.access[chunk_id][1] for chunk_id in compiled["chunk_ids"]], dtype=bool
+            )
+            compiled["role_masks"][user_role] = mask
+        return mask
+
+    def add(self, chunk_id: str, term_counts: Dict[str, int], length: int, visibility: str, roles: str) -> None:
+        self._compiled = None
+        if chunk_id in self.lengths:
+            self.remove(chunk_id)
+        for term, tf in term_counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        self.terms[chunk_id] = list(term_counts)
+        self.lengths[chunk_id] = length
+        self.access[chunk_id] = (visibility, frozenset(filter(None, roles.split(","))))
+        self.total_length += length
+
+    def remove(self, chunk_id: str) -> None:
+        if chunk_id not in self.lengths:
+            return
+        self._compiled = None
+        for term in self.terms.pop(chunk_id, []):
+            postings = self.postings.get(term, {})
+            postings.pop(chunk_id, None)
+            if not postings:
+                self.postings.pop(term, None)
+        self.total_length -= self.lengths.pop(chunk_id)
+        self.access.pop(chunk_id, None)
+
+
+class BM25Index:
+    """Persisted, tenant-scoped BM25 keyword index"""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the index
+
+        Args:
+            path: SQLite file used to persist postings
+            k1: Term frequency saturation
+            b: Document length normalisation
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._tenants: Dict[str, _TenantPostings] = {}
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bm25_docs (
+                tenant_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                visibility TEXT NOT NULL,
+                roles TEXT NOT NULL,
+                PRIMARY KEY (tenant_id, chunk_id)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bm25_postings (
+                tenant_id TEXT NOT NULL,
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (tenant_id, term, chunk_id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bm25_postings_chunk ON bm25_postings (tenant_id, chunk_id)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bm25_versions (
+                tenant_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _stored_version(self, tenant_id: str) -> int:
+        row = self._conn.execute("SELECT version FROM bm25_versions WHERE tenant_id = ?", (tenant_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self, tenant_id: str) -> None:
+        """Record a change to a tenant's postings (caller holds the write transaction)"""
+        self._conn.execute(
+            "INSERT INTO bm25_versions VALUES (?, 1) ON CONFLICT(tenant_id) DO UPDATE SET version = version + 1",
+            (tenant_id,)
+        )
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            return
+        version = self._stored_version(tenant_id)
+        if version == tenant.version + 1:
+            tenant.version = version
+        else:
+            # Another process changed the tenant since it was loaded - reload on next use
+            self._tenants.pop(tenant_id, None)
+
+    def _load_tenant(self, tenant_id: str) -> _TenantPostings:
+        """Load a tenant's postings into memory, again whenever the stored version moved on"""
+        with self._lock:
+            version = self._stored_version(tenant_id)
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None or tenant.version != version:
+                tenant = _TenantPostings()
+                tenant.version = version
+                for chunk_id, length, visibility, roles in self._conn.execute(
+                    "SELECT chunk_id, length, visibility, roles FROM bm25_docs WHERE tenant_id = ?", (tenant_id,)
+                ):
+                    tenant.lengths[chunk_id] = length
+                    tenant.access[chunk_id] = (visibility, frozenset(filter(None, roles.split(","))))
+                    tenant.total_length += length
+                for term, chunk_id, tf in self._conn.execute(
+                    "SELECT term, chunk_id, tf FROM bm25_postings WHERE tenant_id = ?", (tenant_id,)
+                ):
+                    tenant.postings.setdefault(term, {})[chunk_id] = tf
+                    tenant.terms.setdefault(chunk_id, []).append(term)
+                self._tenants[tenant_id] = tenant
+                logger.info(f"Loaded BM25 postings for tenant {tenant_id}: {len(tenant.lengths)} chunks, {len(tenant.postings)} terms")
+        return tenant
+
+    def add(self, tenant_id: str, chunk_ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Index chunks for a tenant (re-adding a chunk id replaces it)
+
+        Args:
+            tenant_id: Tenant that owns the chunks
+            chunk_ids: Vector store ids of the chunks
+            texts: Chunk texts
+            metadatas: Chunk metadata carrying the RBAC fields
+        """
+        if not chunk_ids:
+            return
+
+        with self._lock:
+            tenant = self._load_tenant(tenant_id)
+            self._delete_rows(tenant_id, chunk_ids)
+            doc_rows, posting_rows = [], []
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                tokens = tokenize(text)
+                term_counts = Counter(tokens)
+                visibility, roles = access_from_metadata(metadata or {})
+                doc_rows.append((tenant_id, chunk_id, len(tokens), visibility, roles))
+                posting_rows.extend((tenant_id, term, chunk_id, tf) for term, tf in term_counts.items())
+                tenant.add(chunk_id, term_counts, len(tokens), visibility, roles)
+
+            self._conn.executemany("INSERT INTO bm25_docs VALUES (?, ?, ?, ?, ?)", doc_rows)
+            self._conn.executemany("INSERT INTO bm25_postings VALUES (?, ?, ?, ?)", posting_rows)
+            self._bump_version(tenant_id)
+            self._conn.commit()
+
+    def delete(self, tenant_id: str, chunk_ids: List[str]) -> None:
+        """Remove chunks from a tenant's index"""
+        if not chunk_ids:
+            return
+        with self._lock:
+            tenant = self._load_tenant(tenant_id)
+            for chunk_id in chunk_ids:
+                tenant.remove(chunk_id)
+            self._delete_rows(tenant_id, chunk_ids)
+            self._bump_version(tenant_id)
+            self._conn.commit()
+
+    def _delete_rows(self, tenant_id: str, chunk_ids: List[str]) -> None:
+        rows = [(tenant_id, chunk_id) for chunk_id in chunk_ids]
+        self._conn.executemany("DELETE FROM bm25_docs WHERE tenant_id = ? AND chunk_id = ?", rows)
+        self._conn.executemany("DELETE FROM bm25_postings WHERE tenant_id = ? AND chunk_id = ?", rows)
+
+    def clear(self, tenant_id: Optional[str] = None) -> None:
+        """Drop the index for one tenant or all tenants"""
+        with self._lock:
+            if tenant_id is None:
+                self._conn.execute("DELETE FROM bm25_docs")
+                self._conn.execute("DELETE FROM bm25_postings")
+                self._conn.execute("UPDATE bm25_versions SET version = version + 1")
+                self._tenants.clear()
+            else:
+                self._conn.execute("DELETE FROM bm25_docs WHERE tenant_id = ?", (tenant_id,))
+                self._conn.execute("DELETE FROM bm25_postings WHERE tenant_id = ?", (tenant_id,))
+                self._tenants.pop(tenant_id, None)
+                self._bump_version(tenant_id)
+            self._conn.commit()
+
+    def search(self, tenant_id: str, query: str, user_role: str, k: int = 50) -> List[Tuple[str, float]]:
+        """
+        Score a tenant's chunks for a query
+
+        Args:
+            tenant_id: Tenant to search
+            query: Search query
+            user_role: Role used for RBAC filtering (Public chunks are always visible)
+            k: Maximum number of hits
+
+        Returns:
+            List[Tuple[str, float]]: (chunk_id, BM25 score) best first
+        """
+        tenant = self._load_tenant(tenant_id)
+        k1, b = self.k1, self.b
+
+        # Held so concurrent ingestion can't swap the postings mid-query
+        with self._lock:
+            num_docs = len(tenant.lengths)
+            if not num_docs:
+                return []
+            compiled = tenant.compiled()
+            visible = tenant.role_mask(user_role)
+            average_length = tenant.total_length / num_docs or 1.0
+
+        # Vectorised over each term's postings: one scatter-add per query term
+        norms = k1 * (1 - b + b * compiled["lengths"] / average_length)
+        scores = np.zeros(num_docs, dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            postings = compiled["postings"].get(term)
+            if postings is None:
+                continue
+            rows, tfs = postings
+            idf = math.log(1 + (num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (k1 + 1) / (tfs + norms[rows])
+            matched = True
+
+        if not matched:
+            return []
+        scores[~visible] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(compiled["chunk_ids"][row], float(scores[row])) for row in hits]
+
+    def document_frequency(self, tenant_id: str, terms: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+        """Return (number of chunks, {term: chunks containing it}) for a tenant"""
+        tenant = self._load_tenant(tenant_id)
+        with self._lock:
+            return len(tenant.lengths), {term: len(tenant.postings.get(term, ())) for term in terms}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return chunk counts per tenant"""
+        with self._lock:
+            rows = self._conn.execute("SELECT tenant_id, COUNT(*) FROM bm25_docs GROUP BY tenant_id").fetchall()
+        return {"tenants": dict(rows), "loaded_tenants": sorted(self._tenants)}
+
+
+def reciprocal_rank_fusion(result_lists: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists with reciprocal-rank fusion
+
+    Args:
+        result_lists: Ranked ids from each retriever, best first
+        k: Rank smoothing constant (60 is the usual choice)
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) best first
+    """
+    fused: Dict[str, float] = {}
+    for results in result_lists:
+        for rank, item_id in enumerate(results):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    """Rebuild the keyword index from the vector store and print its size"""
+    parser = argparse.ArgumentParser(description="Rebuild or inspect the BM25 keyword index")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index chunks from the vector store")
+    parser.add_argument("--tenant_id", help="Only rebuild this tenant (default: all tenants)")
+    args = parser.parse_args()
+
+    import services
+
+    if args.rebuild:
+        indexed = services.rebuild_bm25_index(tenant_id=args.tenant_id)
+        print(f"Indexed {indexed} chunks")
+
+    for key, value in services.get_bm25_index().get_stats().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Streaming chat events
+
+Turns a compiled agent's LangGraph event stream (astream_events, v2) into the
+small set of events the chat widget consumes over server-sent events:
+
+- token: a piece of LLM output text as soon as the model produces it
+- tool_start / tool_end: one pair per tool call (retrieval and Jira), emitted by
+  the agent's async tool node through dispatch_tool_event
+- message: the final answer with its metadata, always the last event
+
+format_sse() renders one event in the text/event-stream wire format.
+"""
+
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+TOOL_START_EVENT = "tool_start"
+TOOL_END_EVENT = "tool_end"
+
+
+async def dispatch_tool_event(name: str, payload: Dict[str, Any], config: Optional[Dict[str, Any]]) -> None:
+    """
+    Emit a tool_start / tool_end event from inside a graph node
+
+    Args:
+        name: TOOL_START_EVENT or TOOL_END_EVENT
+        payload: JSON-serialisable event data
+        config: The node's runnable config (links the event to the running graph)
+    """
+    if config is None:
+        return
+    await adispatch_custom_event(name, payload, config=config)
+
+
+def _chunk_text(content: Any) -> str:
+    """Text of a streamed message chunk (content is a string or a list of content parts)"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return ""
+
+
+async def stream_chat_events(agent: Any, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the agent and yield chat events as they happen
+
+    Args:
+        agent: Compiled agent graph
+        inputs: Graph input, e.g. {"messages": [...]}
+
+    Yields:
+        Dict[str, Any]: {"event": name, "data": {...}}; the last event is "message",
+            whose data holds the response text, timing metadata and the final graph state
+    """
+    start = time.perf_counter()
+    first_token_ms = None
+    tool_calls = 0
+    final_state = None
+
+    async for event in agent.astream_events(inputs, version="v2"):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            text = _chunk_text(event["data"]["chunk"].content)
+            if text:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                # The graph step lets clients tell apart text from different LLM turns
+                yield {"event": "token", "data": {"text": text, "step": event.get("metadata", {}).get("langgraph_step")}}
+        elif kind == "on_custom_event" and event["name"] in (TOOL_START_EVENT, TOOL_END_EVENT):
+            if event["name"] == TOOL_START_EVENT:
+                tool_calls += 1
+            yield {"event": event["name"], "data": event["data"]}
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            # End of the top-level graph run
+            final_state = event["data"]["output"]
+
+    response = final_state["messages"][-1].content if final_state and final_state.get("messages") else ""
+    yield {
+        "event": "message",
+        "data": {
+            "response": _chunk_text(response),
+            "tool_calls": tool_calls,
+            "time_to_first_token_ms": first_token_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+            "state": final_state
+        }
+    }
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Render one server-sent event
+
+    Args:
+        event: Event name
+        data: JSON-serialisable payload
+
+    Returns:
+        str: The event in text/event-stream format
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
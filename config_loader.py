@@ -54,22 +54,75 @@ class ConfigLoader:
                 "name": "gemini-2.5-flash",
                 "provider": "google_genai"
             },
+            "embedding": {
+                "model_name": "sentence-transformers/all-MiniLM-L6-v2",
+                "backend": "torch",
+                "onnx_file_name": None,
+                "batch_size": 32,
+                "sort_by_length": True,
+                "cache": {
+                    "enabled": True,
+                    "path": "knowledgeBase/embedding_cache.sqlite3",
+                    "max_entries": 100000
+                },
+                "query_cache": {
+                    "enabled": True,
+                    "max_entries": 2048
+                }
+            },
+            "vector_store": {
+                "collection_name": "general_rentomojo",
+                "sharding": {
+                    "mode": "single",
+                    "num_buckets": 8,
+                    "collection_prefix": "kb"
+                },
+                "doc_counts_path": "knowledgeBase/tenant_doc_counts.sqlite3"
+            },
             "retrieval": {
                 "k": 5,
                 "search_type": "similarity",
-                "threshold": 0.2
+                "mmr": {
+                    "lambda_mult": 0.5
+                },
+                "tenants": {},
+                "threshold": 0.2,
+                "two_stage": {
+                    "enabled": True,
+                    "candidate_pool": 50
+                },
+                "bm25": {
+                    "enabled": True,
+                    "path": "knowledgeBase/bm25_index.sqlite3",
+                    "k1": 1.5,
+                    "b": 0.75,
+                    "rrf_k": 60
+                },
+                "hnsw": {
+                    "space": "l2",
+                    "construction_ef": 100,
+                    "search_ef": 100,
+                    "M": 16,
+                    "collections": {}
+                },
+                "executor_workers": 4,
+                "retriever_cache_size": 256
             },
             "rag_scoring": {
                 "weights": {
                     "semantic": 0.4,
                     "keyword": 0.3,
                     "quality": 0.2,
-                    "recency": 0.1
+                    "recency": 0.1,
+                    "rerank": 0.0
                 },
-                "tfidf": {
-                    "max_features": 1000,
-                    "ngram_range": [1, 2],
-                    "stop_words": "english"
+                "cross_encoder": {
+                    "enabled": False,
+                    "model_name": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                    "batch_size": 32,
+                    "max_length": 512,
+                    "latency_budget_ms": 150,
+                    "cache_size": 10000
                 },
                 "default_threshold": 0.3
             },
@@ -82,6 +135,23 @@ class ConfigLoader:
             },
             "chat": {
                 "max_retrieval_results": 8,
+                "tools": {
+                    "max_workers": 4,
+                    "timeout_seconds": 30,
+                    "timeouts": {
+                        "retriever_tool": 20,
+                        "create_jira_ticket": 30
+                    }
+                },
+                "agent_pool": {
+                    "max_agents": 32,
+                    "idle_ttl_seconds": 1800
+                },
+                "sessions": {
+                    "idle_ttl_seconds": 86400,
+                    "max_sessions": 1000,
+                    "cleanup_interval_seconds": 600
+                },
                 "summary": {
                     "max_length_chars": 200
                 }
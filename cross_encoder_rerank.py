@@ -0,0 +1,200 @@
+"""
+Local cross-encoder reranking
+
+Scores (query, chunk) pairs with a small sentence-transformers CrossEncoder on CPU.
+All uncached pairs of a request go to the model in one predict call, scores are
+kept in an LRU keyed by (query hash, chunk id), and a latency budget skips the
+stage when the estimated model time for the uncached pairs would exceed it. The
+estimate is a running average of the measured per-pair cost that decays while
+requests are being skipped, so reranking resumes once a probe fits the budget. RAGScoringService
+uses the scores as its "rerank" component and drops that component for the
+request when reranking is skipped.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+
+from config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_key(document: Document) -> str:
+    """Stable chunk identity: the vector store id, or a content hash for documents without one"""
+    return document.id or hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """Batched cross-encoder scoring with a score cache and a latency budget"""
+
+    def __init__(self,
+                 model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 batch_size: int = 32,
+                 max_length: int = 512,
+                 latency_budget_ms: float = 150.0,
+                 cache_size: int = 10000):
+        """
+        Initialize the reranker (the model is loaded on first use)
+
+        Args:
+            model_name: Hub name or local path of a single-output CrossEncoder model
+            batch_size: Pairs per forward pass inside the predict call
+            max_length: Maximum tokens per (query, chunk) pair
+            latency_budget_ms: Skip reranking when uncached pairs are estimated to take longer
+            cache_size: Maximum number of cached (query, chunk) scores
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = max(int(cache_size), 1)
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._ms_per_pair: Optional[float] = None
+        self._stats = {"requests": 0, "skipped": 0, "pairs_scored": 0, "cache_hits": 0}
+
+    def _get_model(self):
+        """Load the CrossEncoder on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import torch
+                    from sentence_transformers import CrossEncoder
+                    start = time.perf_counter()
+                    # Sigmoid keeps scores in 0-1 like the other scoring components
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu",
+                                               activation_fn=torch.nn.Sigmoid())
+                    logger.info(f"Cross-encoder {self.model_name} loaded in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return self._model
+
+    def warm_up(self) -> None:
+        """Load the model and measure the per-pair cost so the first request can be budgeted"""
+        start = time.perf_counter()
+        self._get_model().predict([("warm up", "warm up")] * 4, batch_size=self.batch_size, show_progress_bar=False)
+        self._ms_per_pair = (time.perf_counter() - start) * 1000 / 4
+
+    def score(self, query: str, documents: List[Document]) -> Optional[List[float]]:
+        """
+        Cross-encoder relevance of each document to the query
+
+        Args:
+            query: User query
+            documents: Candidate documents
+
+        Returns:
+            Optional[List[float]]: Scores aligned with documents (0-1 range), or None if
+                the latency budget would be exceeded or the model failed
+        """
+        if not documents:
+            return []
+
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [(query_hash, _chunk_key(doc)) for doc in documents]
+        scores: List[Optional[float]] = [None] * len(documents)
+
+        with self._cache_lock:
+            self._stats["requests"] += 1
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+        missing = [i for i, score in enumerate(scores) if score is None]
+        hits = len(documents) - len(missing)
+
+        if missing:
+            if self._ms_per_pair is not None and self._ms_per_pair * len(missing) > self.latency_budget_ms:
+                with self._cache_lock:
+                    self._stats["skipped"] += 1
+                    # Decay the estimate so one slow batch doesn't disable reranking for good
+                    self._ms_per_pair *= 0.9
+                logger.info(f"Cross-encoder rerank skipped: {len(missing)} pairs estimated at "
+                            f"{self._ms_per_pair * len(missing):.0f}ms > budget {self.latency_budget_ms:.0f}ms")
+                return None
+
+            try:
+                model = self._get_model()
+                start = time.perf_counter()
+                predicted = model.predict(
+                    [(query, documents[i].page_content) for i in missing],
+                    batch_size=self.batch_size,
+                    show_progress_bar=False
+                )
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                logger.warning(f"Cross-encoder rerank failed: {e}")
+                return None
+
+            # Running estimate of model cost per pair for the budget check
+            per_pair = elapsed_ms / len(missing)
+            self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+
+            predicted = np.clip(np.asarray(predicted, dtype=np.float64).reshape(-1), 0.0, 1.0).tolist()
+            with self._cache_lock:
+                for i, value in zip(missing, predicted):
+                    scores[i] = value
+                    self._cache[keys[i]] = value
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                self._stats["pairs_scored"] += len(missing)
+
+            logger.debug(f"Cross-encoder scored {len(missing)} pairs in {elapsed_ms:.1f}ms ({hits} cached)")
+
+        with self._cache_lock:
+            self._stats["cache_hits"] += hits
+        return scores
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request, skip and cache counters
+
+        Returns:
+            Dict[str, Any]: Counters plus the current per-pair latency estimate
+        """
+        with self._cache_lock:
+            return {
+                **self._stats,
+                "cache_entries": len(self._cache),
+                "ms_per_pair": self._ms_per_pair,
+                "latency_budget_ms": self.latency_budget_ms
+            }
+
+
+# Shared reranker built from config, created on first use
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    Get the configured cross-encoder reranker
+
+    Returns:
+        Optional[CrossEncoderReranker]: The shared reranker, or None when
+            rag_scoring.cross_encoder.enabled is false
+    """
+    global _reranker
+    if _reranker is None:
+        cross_encoder_config = get_config().get('rag_scoring.cross_encoder', {}) or {}
+        if not cross_encoder_config.get('enabled', False):
+            return None
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker(
+                    model_name=cross_encoder_config.get('model_name', 'cross-encoder/ms-marco-MiniLM-L-6-v2'),
+                    batch_size=cross_encoder_config.get('batch_size', 32),
+                    max_length=cross_encoder_config.get('max_length', 512),
+                    latency_budget_ms=cross_encoder_config.get('latency_budget_ms', 150),
+                    cache_size=cross_encoder_config.get('cache_size', 10000)
+                )
+    return _reranker
@@ -1,15 +1,16 @@
 import os
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 import logging
 import docx2txt
 from pathlib import Path
 from langchain.schema import Document
-from services import vector_store
+import services
 from datetime import datetime
 import hashlib
 from config_loader import get_config
+from term_vectors import TERM_VECTOR_KEY, document_term_vector, serialize_term_vector
+from rag_scoring import compute_quality_score
 
 ## want this to be a separate layer for data ingestion into the vector db - chromaDB
 ## a function that takes multi-file input and stores them in the vector db
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 config = get_config()
 doc_processing_config = config.get_section('document_processing')
 
-def create_enhanced_metadata(file_path: Path, chunk_index: int, total_chunks: int, word_count: int, char_count: int, page_number: int = None, tenant_id: str = "default", access_roles: list = None, document_visibility: str = "Public") -> dict:
+def create_enhanced_metadata(file_path: Path, chunk_index: int, total_chunks: int, word_count: int, char_count: int, page_number: int = None, tenant_id: str = "default", access_roles: list = None, document_visibility: str = "Public", chunk_text: str = None) -> dict:
     """
     Create comprehensive metadata for document chunks to enable effective retrieval scoring
 
@@ -33,11 +34,13 @@ def create_enhanced_metadata(file_path: Path, chunk_index: int, total_chunks: in
         tenant_id: Unique identifier for tenant (default: "default")
         access_roles: List of roles that can access this document (default: ["customer"])
         document_visibility: Document visibility level (default: "Public")
+        chunk_text: Chunk content; when given, its sparse term vector is stored for keyword scoring
 
     Returns:
         dict: Enhanced metadata for scoring during retrieval and tenant filtering
     """
     file_stats = file_path.stat()
+    ingested_at = datetime.now()
 
     # Set default access roles if not provided
     if access_roles is None:
@@ -56,9 +59,12 @@ def create_enhanced_metadata(file_path: Path, chunk_index: int, total_chunks: in
         "document_visibility": document_visibility,
 
         # Temporal information for recency scoring
-        "ingestion_timestamp": datetime.now().isoformat(),
+        "ingestion_timestamp": ingested_at.isoformat(),
         "file_modified_timestamp": datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
         "file_created_timestamp": datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
+        # Epoch seconds, read directly by recency scoring
+        "ingestion_epoch": ingested_at.timestamp(),
+        "file_modified_epoch": file_stats.st_mtime,
 
         # Document structure for position-based scoring
         "chunk_index": chunk_index,
@@ -88,6 +94,13 @@ def create_enhanced_metadata(file_path: Path, chunk_index: int, total_chunks: in
         metadata["page_number"] = page_number
         metadata["is_first_page"] = page_number == 1
 
+    # Quality inputs are all fixed per chunk, so score once here instead of per query
+    metadata["quality_score"] = compute_quality_score(metadata)
+
+    # Precomputed term vector so keyword scoring needs no per-query fitting
+    if chunk_text is not None:
+        metadata[TERM_VECTOR_KEY] = serialize_term_vector(document_term_vector(chunk_text))
+
     return metadata
 
 def get_document_type(file_extension: str) -> str:
@@ -250,7 +263,8 @@ def ingest_file_with_feedback(file_path: str, original_file_name: str = None, te
                 page_number=chunk.metadata.get('page_number'),  # Preserve page number if exists
                 tenant_id=tenant_id,
                 access_roles=access_roles,
-                document_visibility=document_visibility
+                document_visibility=document_visibility,
+                chunk_text=chunk.page_content
             )
 
             # Preserve any existing metadata and merge with enhanced metadata
@@ -264,7 +278,7 @@ def ingest_file_with_feedback(file_path: str, original_file_name: str = None, te
             enhanced_chunks.append(enhanced_chunk)
 
         # Store in vector DB with enhanced metadata
-        vector_store.add_documents(documents=enhanced_chunks)
+        services.add_documents(tenant_id, enhanced_chunks)
         
         return {"success": True, "message": f"Successfully processed {len(pages_split)} chunks", "file_name": file_name}
         
@@ -349,7 +363,8 @@ def ingest_file_to_vectordb(file_paths, tenant_id: str = "default", access_roles
                     page_number=chunk.metadata.get('page_number'),  # Preserve page number if exists
                     tenant_id=tenant_id,
                     access_roles=access_roles,
-                    document_visibility=document_visibility
+                    document_visibility=document_visibility,
+                    chunk_text=chunk.page_content
                 )
 
                 # Preserve any existing metadata and merge with enhanced metadata
@@ -363,7 +378,7 @@ def ingest_file_to_vectordb(file_paths, tenant_id: str = "default", access_roles
                 enhanced_chunks.append(enhanced_chunk)
 
             # Store in vector DB with enhanced metadata
-            vector_store.add_documents(documents=enhanced_chunks)
+            services.add_documents(tenant_id, enhanced_chunks)
             print(f"Successfully ingested {file_path.name}")
             successful_files.append(file_path.name)
             
@@ -1,18 +1,20 @@
 from dotenv import load_dotenv
 import os
 from pathlib import Path
+from functools import partial
 from datetime import datetime
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage, AIMessage
 from operator import add as add_messages
 from langchain.chat_models import init_chat_model
-from langchain_core.tools import tool
-from jira_tool import JiraTool
-import services
+from langchain_core.tools import tool, StructuredTool
+from langchain_core.runnables import RunnableLambda, RunnableConfig
+import threading
 from chat_mgmt import load_chat_summary, save_chat_summary
-from multiModalInputService import process_image_to_base64, process_document_to_text, parse_multimodal_input
-from rag_scoring import score_documents
+from retrieval_pipeline import RetrievalPipeline
+from tool_runner import get_tool_runner, ToolOutcome
+from chat_streaming import dispatch_tool_event, TOOL_START_EVENT, TOOL_END_EVENT
 from logger_setup import setup_logger
 from config_loader import get_config
 logger = setup_logger()
@@ -24,101 +26,57 @@ import os
 # Load configuration
 config = get_config()
 
-if not os.environ.get("GOOGLE_API_KEY"):
-  os.environ["GOOGLE_API_KEY"] = getpass.getpass("Enter API key for Google Gemini: ")
+# Nothing is built at import: API workers and the UI import create_agent only, so the
+# default CLI agent, its tools and LLM are created on first use (see __getattr__ below)
 
-# Now we create our retriever using config values
-retrieval_config = config.get_section('retrieval')
-retriever = services.vector_store.as_retriever(
-    search_type=retrieval_config.get('search_type', 'similarity'),
-    search_kwargs={"k": retrieval_config.get('k', 5)} # K is the amount of chunks to return
-)
+def ensure_google_api_key():
+    """Prompt for the Gemini API key if it isn't set (interactive CLI only)"""
+    if not os.environ.get("GOOGLE_API_KEY"):
+        os.environ["GOOGLE_API_KEY"] = getpass.getpass("Enter API key for Google Gemini: ")
 
-def get_tools(tenant_id: str = "default", user_role: str = "customer"):
-    """Get tenant-aware tools for the agent with RBAC filtering"""
-    # Create tenant-aware retriever using services module
-    retrieval_config = config.get_section('retrieval')
-    search_kwargs = {"k": retrieval_config.get('k', 5)}
-
-    # Use tenant-aware retriever from services
-    retriever = services.create_tenant_aware_retriever(
-        tenant_id=tenant_id,
-        user_role=user_role,
-        search_kwargs=search_kwargs
+def init_base_llm():
+    """Create the configured chat model (no tools bound)"""
+    model_config = config.get_section('model')
+    return init_chat_model(
+        model_config.get('name', 'gemini-2.5-flash'),
+        model_provider=model_config.get('provider', 'google_genai')
     )
-    
-    @tool
+
+def format_retrieval_results(retrieval: dict) -> str:
+    """Format one retrieval result as the retriever_tool response"""
+    if not retrieval["documents"] and retrieval.get("duplicates"):
+        return "The relevant documents for this search are already included in the results of the other searches."
+    if not retrieval["candidate_count"]:
+        return "I found no relevant information in my knowledge base."
+    if not retrieval["documents"]:
+        return "I found no sufficiently relevant information in my knowledge base."
+
+    # Format results with relevance scores
+    results = []
+    for i, (doc, score) in enumerate(retrieval["documents"]):
+        results.append(f"Document {i+1} (relevance: {score:.2f}):\\n{doc.page_content}")
+
+    return "\\n\\n".join(results)
+
+def get_tools(tenant_id: str = "default", user_role: str = "customer", pipeline: RetrievalPipeline = None):
+    """Get tenant-aware tools for the agent with RBAC filtering"""
+    # Tenant-aware two-stage retrieval (over-fetch from the vector store, then hybrid rerank)
+    if pipeline is None:
+        pipeline = RetrievalPipeline(tenant_id=tenant_id, user_role=user_role)
+
     def retriever_tool(query: str) -> str:
         """
         This tool searches and returns the information from the organization's knowledge base.
         Use this tool multiple times with different keyword searches for complex queries that have multiple aspects.
         For simple, focused queries, one search is sufficient.
         """
-        # TODO: handle this useless invoke_with_scores -> llm node is not configured to call it
-        # Get documents with similarity scores
-        docs_with_scores = retriever.invoke_with_scores(query) if hasattr(retriever, 'invoke_with_scores') else None
-        
-        if docs_with_scores is None:
-            # Fallback to regular retrieval if scoring not available
-            docs = retriever.invoke(query)
-            if not docs:
-                return "I found no relevant information in my knowledge base."
-
-            # Use RAG scoring service to improve results
-            try:
-                # Extract similarity scores (not available in fallback)
-                similarity_scores = [0.7] * len(docs)  # Default scores for fallback
-                threshold = config.get('retrieval.threshold', 0.2)
-                scored_docs = score_documents(query, docs, similarity_scores, threshold=threshold)
-
-                if not scored_docs:
-                    return "I found no sufficiently relevant information in my knowledge base."
-
-                # Format top results
-                results = []
-                max_results = config.get('chat.max_retrieval_results', 8)
-                for i, (doc, score) in enumerate(scored_docs[:max_results]):  # Top results from config
-                    results.append(f"Document {i+1} (relevance: {score:.2f}):\\n{doc.page_content}")
-
-                return "\\n\\n".join(results)
-
-            except Exception as e:
-                logger.warning(f"RAG scoring failed, using basic retrieval: {e}")
-                # Fallback to original format
-                results = []
-                for i, doc in enumerate(docs):
-                    results.append(f"Document {i+1}:\\n{doc.page_content}")
-                return "\\n\\n".join(results)
+        return format_retrieval_results(pipeline.run(query))
 
-        else:
-            # Enhanced retrieval with similarity scores
-            docs, similarity_scores = docs_with_scores
-            if not docs:
-                return "I found no relevant information in my knowledge base."
-
-            try:
-                # Apply RAG scoring
-                threshold = config.get('retrieval.threshold', 0.2)
-                scored_docs = score_documents(query, docs, similarity_scores, threshold=threshold)
-
-                if not scored_docs:
-                    return "I found no sufficiently relevant information in my knowledge base."
-
-                # Format results with relevance scores
-                results = []
-                max_results = config.get('chat.max_retrieval_results', 8)
-                for i, (doc, score) in enumerate(scored_docs[:max_results]):  # Top results from config
-                    results.append(f"Document {i+1} (relevance: {score:.2f}):\\n{doc.page_content}")
-
-                return "\\n\\n".join(results)
-
-            except Exception as e:
-                logger.warning(f"RAG scoring failed, using basic retrieval: {e}")
-                # Fallback to original format
-                results = []
-                for i, doc in enumerate(docs):
-                    results.append(f"Document {i+1}:\\n{doc.page_content}")
-                return "\\n\\n".join(results)
+    async def aretriever_tool(query: str) -> str:
+        return format_retrieval_results(await pipeline.arun(query))
+
+    # Sync and async implementations: ainvoke searches on the retrieval executor instead of the event loop
+    retriever_tool = StructuredTool.from_function(func=retriever_tool, coroutine=aretriever_tool)
 
     @tool
     def create_jira_ticket(summary: str, description: str, intent: str, urgency: str, sentiment: str) -> str:
@@ -129,29 +87,29 @@ def get_tools(tenant_id: str = "default", user_role: str = "customer"):
                 intent (one of): service_request, complaints or feature_request
                 urgency (one of): high (if told critical or urgent), medium (default for complaint and service_request), low (else)
                 sentiment (one of): positive (on receiving good remark), neutral (default), negative (if user expresses bad experience)
-            returns: ticket id as string if success. None if failed to create ticket.
+            returns: message with the created ticket id. Raises an error if the ticket could not be created.
         """
+        # Failures raise, so the tool node reports them as failed calls (and tool_end events as errors)
         try:
+            from jira_tool import JiraTool  # Jira client is only loaded when a ticket is created
             jira_tool = JiraTool()
             ticket_key = jira_tool.create_ticket(summary, description, intent, urgency, sentiment)
-            return f"Successfully created JIRA ticket: {ticket_key}"
         except Exception as e:
-            return f"Failed to create JIRA ticket: {str(e)}"
+            raise RuntimeError(f"Failed to create JIRA ticket: {str(e)}") from e
+        return f"Successfully created JIRA ticket: {ticket_key}"
 
+    # create_jira_ticket has no async implementation: its ainvoke runs the blocking Jira client in a worker thread
     return [retriever_tool, create_jira_ticket]
 
 
-def create_agent(tenant_id: str = "default", user_role: str = "customer"):
+def create_agent(tenant_id: str = "default", user_role: str = "customer", pipeline: RetrievalPipeline = None):
     """Create and return a compiled RAG agent with tenant context"""
-    tools = get_tools(tenant_id=tenant_id, user_role=user_role)
+    if pipeline is None:
+        pipeline = RetrievalPipeline(tenant_id=tenant_id, user_role=user_role)
+    tools = get_tools(tenant_id=tenant_id, user_role=user_role, pipeline=pipeline)
     tools_dict = {our_tool.name: our_tool for our_tool in tools} # Creating a dictionary of our tools
 
-    model_config = config.get_section('model')
-    base_llm = init_chat_model(
-        model_config.get('name', 'gemini-2.5-flash'),
-        model_provider=model_config.get('provider', 'google_genai')
-    )
-    llm = base_llm.bind_tools(tools)
+    llm = init_base_llm().bind_tools(tools)
     
     class AgentState(TypedDict):
         messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -159,11 +117,7 @@ def create_agent(tenant_id: str = "default", user_role: str = "customer"):
     def should_continue(state: AgentState):
         """Check if the last message contains tool calls."""
         result = state['messages'][-1]
-        if (hasattr(result, 'tool_calls') and len(result.tool_calls) > 0):
-            return True
-        else:
-            current_chat_messages.append(AIMessage(content=result.content)) # saving only the final AI response
-            return False
+        return hasattr(result, 'tool_calls') and len(result.tool_calls) > 0
 # TODO: we can simply tell the llm node to call the retrieval tool multiple times if needed for complex user queries. Its redundant to write a strategy for it. 
     system_prompt_llm = """
 You are an intelligent AI assistant who answers questions based on the documents in your knowledge base and perform tool calling. User query can contain images and extracted data from documents.
@@ -202,37 +156,158 @@ When images/added documents are provided:
         message = llm.invoke(messages)
         return {'messages': [message]}
 
-    # Tools Agent - retriever and ticket creation
-    def take_action(state: AgentState) -> AgentState:
-        """Execute tool calls from the LLM's response."""
+    async def acall_llm(state: AgentState) -> AgentState:
+        """Async call_llm: awaits the LLM without blocking the event loop."""
+        messages = [SystemMessage(content=system_prompt_llm)] + list(state['messages'])
+        message = await llm.ainvoke(messages)
+        return {'messages': [message]}
 
-        tool_calls = state['messages'][-1].tool_calls
-        results = []
-        for t in tool_calls:
+    def batched_retriever_calls(tool_calls):
+        """Retriever calls to run as one batched multi-query retrieval (empty if fewer than two)"""
+        retriever_calls = [t for t in tool_calls if t['name'] == 'retriever_tool' and isinstance(t['args'].get('query'), str)]
+        if len(retriever_calls) > 1 and len({t['id'] for t in retriever_calls}) == len(retriever_calls):
+            return retriever_calls
+        return []
+
+    def plan_tool_tasks(tool_calls, retriever_calls, run_many, tool_method):
+        """Independent work units: the batched search plus every other tool call"""
+        tasks = []
+        if retriever_calls:
+            queries = [t['args']['query'] for t in retriever_calls]
+            tasks.append(('retriever_tool', partial(run_many, queries)))
+        batched_ids = {t['id'] for t in retriever_calls}
+        task_for_call = {}
+        for i, t in enumerate(tool_calls):
             print(f"Calling Tool: {t['name']} with args: {t['args']}")
-            
-            if not t['name'] in tools_dict: # Checks if a valid tool is present
+            if t['id'] not in batched_ids and t['name'] in tools_dict:
+                task_for_call[i] = len(tasks)
+                tasks.append((t['name'], partial(getattr(tools_dict[t['name']], tool_method), t['args'])))
+        return tasks, task_for_call
+
+    def batch_results(retriever_calls, batch_outcome):
+        """Per-call results of the batched search, or None if it failed and should be retried call by call"""
+        if batch_outcome.error is None:
+            print(f"Batched {len(retriever_calls)} retriever calls into one retrieval")
+            return {t['id']: format_retrieval_results(r) for t, r in zip(retriever_calls, batch_outcome.value)}
+        if batch_outcome.timed_out:
+            return {t['id']: f"Tool execution failed: {batch_outcome.error}" for t in retriever_calls}
+        print(f"Batched retrieval failed, running searches one by one: {batch_outcome.error}")
+        return None
+
+    def fallback_results(retriever_calls, fallback):
+        return {
+            t['id']: f"Tool execution failed: {outcome.error}" if outcome.error else outcome.value
+            for t, outcome in zip(retriever_calls, fallback)
+        }
+
+    def tool_messages(tool_calls, batched_results, outcomes, task_for_call):
+        """Tool messages go back in the order the LLM issued the calls"""
+        results = []
+        for i, t in enumerate(tool_calls):
+            if t['id'] in batched_results:
+                result = batched_results[t['id']]
+            elif not t['name'] in tools_dict: # Checks if a valid tool is present
                 print(f"\\nTool: {t['name']} does not exist.")
                 result = "Incorrect Tool Name, Please Retry and Select tool from List of Available tools."
-            
             else:
-                try:
-                    result = tools_dict[t['name']].invoke(t['args'])
-                    print(f"Tool execution successful. Result length: {len(str(result))}")
-                except Exception as e:
-                    print(f"Tool execution failed with error: {str(e)}")
-                    result = f"Tool execution failed: {str(e)}"
-                
+                outcome = outcomes[task_for_call[i]]
+                if outcome.error is None:
+                    result = outcome.value
+                    print(f"Tool {t['name']} execution successful in {outcome.elapsed_ms:.0f}ms. Result length: {len(str(result))}")
+                else:
+                    print(f"Tool execution failed with error: {outcome.error}")
+                    result = f"Tool execution failed: {outcome.error}"
 
             # Appends the Tool Message
             results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
 
         print("Tools Execution Complete. Back to the model!")
-        return {'messages': results}
+        return results
+
+    # Tools Agent - retriever and ticket creation
+    def take_action(state: AgentState) -> AgentState:
+        """Execute tool calls from the LLM's response."""
+
+        tool_calls = state['messages'][-1].tool_calls
+        runner = get_tool_runner()
+
+        # Several retriever calls in one turn run as one batched multi-query retrieval
+        retriever_calls = batched_retriever_calls(tool_calls)
+        tasks, task_for_call = plan_tool_tasks(tool_calls, retriever_calls, pipeline.run_many, 'invoke')
+        outcomes = runner.run(tasks)
+
+        batched_results = {}
+        if retriever_calls:
+            batched_results = batch_results(retriever_calls, outcomes[0])
+            if batched_results is None:
+                fallback = runner.run([('retriever_tool', partial(tools_dict['retriever_tool'].invoke, t['args'])) for t in retriever_calls])
+                batched_results = fallback_results(retriever_calls, fallback)
+
+        return {'messages': tool_messages(tool_calls, batched_results, outcomes, task_for_call)}
+
+    async def atake_action(state: AgentState, config: RunnableConfig = None) -> AgentState:
+        """Async take_action: tool calls are awaited concurrently on the event loop."""
+
+        tool_calls = state['messages'][-1].tool_calls
+        runner = get_tool_runner()
+
+        # tool_start / tool_end events for streaming clients (no-ops outside astream_events)
+        for t in tool_calls:
+            await dispatch_tool_event(TOOL_START_EVENT, {'id': t['id'], 'tool': t['name'], 'input': t['args']}, config)
+
+        async def tool_ended(t, outcome, content):
+            await dispatch_tool_event(TOOL_END_EVENT, {
+                'id': t['id'],
+                'tool': t['name'],
+                'status': 'error' if outcome.error else 'ok',
+                'error': outcome.error,
+                'elapsed_ms': outcome.elapsed_ms,
+                'result_chars': len(content)
+            }, config)
+
+        def call_content(outcome):
+            return f"Tool execution failed: {outcome.error}" if outcome.error else str(outcome.value)
+
+        for t in tool_calls:
+            if t['name'] not in tools_dict:
+                await tool_ended(t, ToolOutcome(None, "unknown tool", 0.0), "")
+
+        retriever_calls = batched_retriever_calls(tool_calls)
+        tasks, task_for_call = plan_tool_tasks(tool_calls, retriever_calls, pipeline.arun_many, 'ainvoke')
+        call_for_task = {task: tool_calls[i] for i, task in task_for_call.items()}
+
+        async def task_done(task, outcome):
+            """tool_end as soon as each call's result is known; a failed batch waits for its retries"""
+            if task in call_for_task:
+                await tool_ended(call_for_task[task], outcome, call_content(outcome))
+            elif outcome.error is None:
+                for t, retrieval in zip(retriever_calls, outcome.value):
+                    await tool_ended(t, outcome, format_retrieval_results(retrieval))
+            elif outcome.timed_out:
+                for t in retriever_calls:
+                    await tool_ended(t, outcome, call_content(outcome))
+
+        outcomes = await runner.arun(tasks, on_done=task_done)
+
+        batched_results = {}
+        if retriever_calls:
+            batched_results = batch_results(retriever_calls, outcomes[0])
+            if batched_results is None:
+                async def retry_done(index, outcome):
+                    await tool_ended(retriever_calls[index], outcome, call_content(outcome))
+
+                fallback = await runner.arun(
+                    [('retriever_tool', partial(tools_dict['retriever_tool'].ainvoke, t['args'])) for t in retriever_calls],
+                    on_done=retry_done
+                )
+                batched_results = fallback_results(retriever_calls, fallback)
+
+        return {'messages': tool_messages(tool_calls, batched_results, outcomes, task_for_call)}
 
     graph = StateGraph(AgentState)
-    graph.add_node("llm", call_llm)
-    graph.add_node("tool_agent", take_action)
+    # Each node has a sync and an async implementation: invoke() uses the first, ainvoke() the second
+    graph.add_node("llm", RunnableLambda(call_llm, afunc=acall_llm))
+    graph.add_node("tool_agent", RunnableLambda(take_action, afunc=atake_action))
 
     graph.add_conditional_edges(
         "llm",
@@ -244,19 +319,28 @@ When images/added documents are provided:
 
     return graph.compile()
 
-# For backward compatibility, keep these at module level for CLI usage
-tools = get_tools()
-model_config = config.get_section('model')
-base_llm = init_chat_model(
-    model_config.get('name', 'gemini-2.5-flash'),
-    model_provider=model_config.get('provider', 'google_genai')
-)
-llm = base_llm.bind_tools(tools)
-tools_dict = {our_tool.name: our_tool for our_tool in tools} # Creating a dictionary of our tools
-
-# Load chat history on startup
-current_chat_messages = []
-old_chat_summary = load_chat_summary()
+# Default (tenant "default", role "customer") objects, built on first attribute access
+_lazy_defaults = {}
+_lazy_defaults_lock = threading.RLock()
+
+def _build_default(name: str):
+    if name == "rag_agent":
+        return create_agent()
+    if name == "tools":
+        return get_tools()
+    if name == "tools_dict":
+        return {our_tool.name: our_tool for our_tool in __getattr__("tools")}
+    if name == "llm":
+        return init_base_llm().bind_tools(__getattr__("tools"))
+
+def __getattr__(name: str):
+    # Backward compatibility for `echo.rag_agent`, `echo.tools`, `echo.tools_dict` and `echo.llm`
+    if name not in ("rag_agent", "tools", "tools_dict", "llm"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_defaults_lock:
+        if name not in _lazy_defaults:
+            _lazy_defaults[name] = _build_default(name)
+    return _lazy_defaults[name]
 
 def summarize_current_chat(current_chat_messages, old_chat_summary):
     """Summarize current chat session and append to old summary with timestamp"""
@@ -271,8 +355,7 @@ def summarize_current_chat(current_chat_messages, old_chat_summary):
     chat_to_summarize = [SystemMessage(content=system_prompt)] + current_chat_messages
     current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        unbounded_llm = llm.bind_tools([])
-        current_chat_summary = unbounded_llm.invoke(chat_to_summarize)
+        current_chat_summary = init_base_llm().invoke(chat_to_summarize)
         
         # Handle empty responses from Gemini
         if not current_chat_summary or not current_chat_summary.content or not current_chat_summary.content.strip():
@@ -288,11 +371,17 @@ def summarize_current_chat(current_chat_messages, old_chat_summary):
         fallback_summary = f"\\n\\n=== Chat Session ({current_timestamp}) ===\\nChat session occurred but summary failed due to error: {str(e)}"
         return old_chat_summary + fallback_summary
 
-rag_agent = create_agent()
-
-
 def running_agent():
     """CLI entry point for backend-only usage"""
+    from multiModalInputService import process_image_to_base64, process_document_to_text, parse_multimodal_input
+
+    ensure_google_api_key()
+    rag_agent = create_agent()
+
+    # Load chat history for this CLI session
+    current_chat_messages = []
+    old_chat_summary = load_chat_summary()
+
     print("\\n=== RAG AGENT===")
     print("Tip: Include files in your query using:")
     print("  Images: 'image:/path/to/chart.png' or 'img:/path/to/screenshot.jpg'")
@@ -363,6 +452,7 @@ def running_agent():
         messages_with_context.append(human_message)
         
         result = rag_agent.invoke({"messages": messages_with_context})
+        current_chat_messages.append(AIMessage(content=result['messages'][-1].content)) # saving only the final AI response
         
         print("\\n=== ANSWER ===")
         print(result['messages'][-1].content)
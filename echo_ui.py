@@ -1,134 +1,253 @@
 from dotenv import load_dotenv
+import asyncio
 import os
-from datetime import datetime
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+import threading
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 from langchain.chat_models import init_chat_model
 from chat_mgmt import load_chat_summary, save_chat_summary
-from echo import create_agent
+from agent_pool import get_agent_pool
+from chat_streaming import stream_chat_events
+from config_loader import get_config
 import services
 import guardrails
 
 # Load environment variables
 load_dotenv()
 
-# Global variables for agent initialization - now supports tenant context
-_rag_agent = None
-_current_chat_messages = []
-_old_chat_summary = ""
-_current_tenant_id = "default"
-_current_user_role = "customer"
+# Conversation state per chat session: {"messages": [...], "old_chat_summary": str, "last_activity": datetime}
+# old_chat_summary only holds summaries of chats saved earlier in the same session; chat_summary.txt
+# collects every saved chat but is never fed back into other sessions (they may belong to other tenants)
+# The Streamlit app and the CLI-style helpers use DEFAULT_SESSION_ID; API sessions use their own ids
+# Idle conversations are dropped after chat.sessions.idle_ttl_seconds, and the least recently
+# active ones once there are more than chat.sessions.max_sessions
+DEFAULT_SESSION_ID = "default"
+_conversations: Dict[str, Dict] = {}
+_conversations_lock = threading.Lock()
+_summary_file_lock = threading.Lock()
+_last_sweep = datetime.now()
 
 def initialize_agent(tenant_id: str = "default", user_role: str = "customer"):
     """Initialize the RAG agent for UI use with tenant context"""
-    global _rag_agent, _current_chat_messages, _old_chat_summary, _current_tenant_id, _current_user_role
-
-    # Check if we need to reinitialize due to tenant context change
-    if _rag_agent is not None and _current_tenant_id == tenant_id and _current_user_role == user_role:
-        return _rag_agent
-
     # Set up API key if not present
     if not os.environ.get("GOOGLE_API_KEY"):
         raise ValueError("GOOGLE_API_KEY environment variable not set")
 
-    # Update tenant context
-    _current_tenant_id = tenant_id
-    _current_user_role = user_role
+    # Reuse the pooled agent for this tenant context (built once per tenant and role); callers
+    # keep the returned agent, there is no process-wide "current" tenant
+    return get_agent_pool().get(tenant_id=tenant_id, user_role=user_role)
+
+def get_session_limits() -> Dict[str, int]:
+    """idle_ttl_seconds, max_sessions and cleanup_interval_seconds from chat.sessions (0 disables a limit)"""
+    sessions_config = get_config().get('chat.sessions', {}) or {}
+    return {
+        "idle_ttl_seconds": int(sessions_config.get('idle_ttl_seconds', 86400)),
+        "max_sessions": int(sessions_config.get('max_sessions', 1000)),
+        "cleanup_interval_seconds": int(sessions_config.get('cleanup_interval_seconds', 600))
+    }
+
+def _expire_conversations_locked(now: datetime) -> List[str]:
+    """Drop idle conversations, then the least recently active ones above the cap; caller holds the lock"""
+    global _last_sweep
+    limits = get_session_limits()
+    expired = []
+    if limits["idle_ttl_seconds"] > 0:
+        cutoff = now - timedelta(seconds=limits["idle_ttl_seconds"])
+        expired = [sid for sid, conversation in _conversations.items() if conversation["last_activity"] < cutoff]
+    for sid in expired:
+        del _conversations[sid]
 
-    # Use centralized agent creation from echo.py with tenant context
-    _rag_agent = create_agent(tenant_id=tenant_id, user_role=user_role)
+    overflow = len(_conversations) - limits["max_sessions"]
+    if limits["max_sessions"] > 0 and overflow > 0:
+        evicted = sorted(_conversations, key=lambda sid: _conversations[sid]["last_activity"])[:overflow]
+        for sid in evicted:
+            del _conversations[sid]
+        expired.extend(evicted)
 
-    # Load chat history
-    _current_chat_messages.clear()
-    _old_chat_summary = load_chat_summary()
+    _last_sweep = now
+    return expired
 
-    return _rag_agent
+def expire_conversations() -> List[str]:
+    """
+    Drop conversations idle longer than chat.sessions.idle_ttl_seconds and, above
+    chat.sessions.max_sessions, the least recently active ones
 
-def process_user_message(message: str, processed_files=None, tenant_id: str = "default", user_role: str = "customer") -> str:
-    """Process text message with optional files through agent and return AI response as string with tenant context"""
-    global _current_chat_messages, _old_chat_summary
+    Returns:
+        List[str]: Session ids whose conversation state was dropped
+    """
+    with _conversations_lock:
+        return _expire_conversations_locked(datetime.now())
+
+def get_conversation(session_id: str = DEFAULT_SESSION_ID) -> Dict:
+    """Get the conversation state of a chat session, creating it on first use"""
+    now = datetime.now()
+    with _conversations_lock:
+        conversation = _conversations.get(session_id)
+        if conversation is None:
+            conversation = {"messages": [], "old_chat_summary": "", "last_activity": now}
+            _conversations[session_id] = conversation
+            # Processes without the API's scheduled cleanup (e.g. Streamlit) sweep when sessions are created
+            limits = get_session_limits()
+            if (0 < limits["max_sessions"] < len(_conversations)
+                    or (now - _last_sweep).total_seconds() >= limits["cleanup_interval_seconds"]):
+                _expire_conversations_locked(now)
+        conversation["last_activity"] = now
+    return conversation
+
+def drop_conversation(session_id: str):
+    """Forget a chat session's conversation state without saving it"""
+    with _conversations_lock:
+        _conversations.pop(session_id, None)
+
+def _build_human_message(message: str, processed_files=None) -> HumanMessage:
+    """Build the user's message, inlining uploaded images and document text (temp files are removed)"""
+    # Process uploaded files if provided
+    if processed_files:
+        from multiModalInputService import process_image_to_base64, process_document_to_text
+        import os
+
+        # Process images to base64
+        image_data = []
+        for image_path in processed_files.get("image_files", []):
+            base64_data = process_image_to_base64(image_path)
+            if base64_data:
+                image_data.append({
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{base64_data}"}
+                })
+            # Clean up temp file
+            try:
+                os.unlink(image_path)
+            except:
+                pass
+
+        # Process documents to text
+        doc_text = ""
+        for doc_path in processed_files.get("doc_files", []):
+            text_content = process_document_to_text(doc_path)
+            if text_content:
+                doc_text += f"\\n\\nDocument content:\\n{text_content}"
+            # Clean up temp file
+            try:
+                os.unlink(doc_path)
+            except:
+                pass
+
+        # Create multi-modal message content
+        if image_data or doc_text:
+            # Combine text with document content
+            combined_text = message + doc_text
+
+            if image_data:
+                # Multi-modal content with images
+                content = [{"type": "text", "text": combined_text}] + image_data
+                human_message = HumanMessage(content=content)
+            else:
+                # Text only with document content
+                human_message = HumanMessage(content=combined_text)
+        else:
+            human_message = HumanMessage(content=message)
+    else:
+        # Text-only message
+        human_message = HumanMessage(content=message)
+    return human_message
 
-    if _rag_agent is None:
-        initialize_agent(tenant_id=tenant_id, user_role=user_role)
+def _messages_with_context(conversation: Dict, human_message: HumanMessage) -> List[BaseMessage]:
+    """Create messages list with summary context, the session's history and the new message"""
+    messages_with_context = []
+    if conversation["old_chat_summary"].strip():
+        messages_with_context.append(HumanMessage(content=f"Previous chat context: {conversation['old_chat_summary']}"))
     
+    messages_with_context.extend(conversation["messages"])
+    messages_with_context.append(human_message)
+    return messages_with_context
+
+def _record_exchange(conversation: Dict, human_message: HumanMessage, result) -> str:
+    """Save the exchange to the session's chat messages and return the AI response"""
+    ai_response = AIMessage(content=result['messages'][-1].content)
+    conversation["messages"].extend([human_message, ai_response])
+    conversation["last_activity"] = datetime.now()
+    return result['messages'][-1].content
+
+def process_user_message(message: str, processed_files=None, tenant_id: str = "default", user_role: str = "customer",
+                         session_id: str = DEFAULT_SESSION_ID) -> str:
+    """Process text message with optional files through agent and return AI response as string with tenant context"""
+    # Pooled agent for this request's tenant context, so interleaved tenants don't trigger rebuilds
+    rag_agent = initialize_agent(tenant_id=tenant_id, user_role=user_role)
+
+    # Only this session's history goes into the prompt
+    conversation = get_conversation(session_id)
+
     try:
         # check relevance of human query first - deny if irrelevant without processing
         relevant, msg = guardrails.is_relevant(message)
         if not relevant:
             return msg
         
-        # Process uploaded files if provided
-        if processed_files:
-            from multiModalInputService import process_image_to_base64, process_document_to_text
-            import os
-            
-            # Process images to base64
-            image_data = []
-            for image_path in processed_files.get("image_files", []):
-                base64_data = process_image_to_base64(image_path)
-                if base64_data:
-                    image_data.append({
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_data}"}
-                    })
-                # Clean up temp file
-                try:
-                    os.unlink(image_path)
-                except:
-                    pass
-            
-            # Process documents to text
-            doc_text = ""
-            for doc_path in processed_files.get("doc_files", []):
-                text_content = process_document_to_text(doc_path)
-                if text_content:
-                    doc_text += f"\\n\\nDocument content:\\n{text_content}"
-                # Clean up temp file
-                try:
-                    os.unlink(doc_path)
-                except:
-                    pass
-            
-            # Create multi-modal message content
-            if image_data or doc_text:
-                # Combine text with document content
-                combined_text = message + doc_text
-                
-                if image_data:
-                    # Multi-modal content with images
-                    content = [{"type": "text", "text": combined_text}] + image_data
-                    human_message = HumanMessage(content=content)
-                else:
-                    # Text only with document content
-                    human_message = HumanMessage(content=combined_text)
-            else:
-                human_message = HumanMessage(content=message)
-        else:
-            # Text-only message
-            human_message = HumanMessage(content=message)
-        
-        _current_chat_messages.append(human_message)
-        
-        # Create messages list with summary context
-        messages_with_context = []
-        if _old_chat_summary.strip():
-            messages_with_context.append(HumanMessage(content=f"Previous chat context: {_old_chat_summary}"))
-        
-        messages_with_context.extend(_current_chat_messages[:-1])
-        messages_with_context.append(human_message)
+        human_message = _build_human_message(message, processed_files)
         
         # Get response from agent
-        result = _rag_agent.invoke({"messages": messages_with_context})
-        
-        # Save AI response to current chat messages
-        ai_response = AIMessage(content=result['messages'][-1].content)
-        _current_chat_messages.append(ai_response)
+        result = rag_agent.invoke({"messages": _messages_with_context(conversation, human_message)})
         
         # Return the AI response
-        return result['messages'][-1].content
+        return _record_exchange(conversation, human_message, result)
         
     except Exception as e:
         return f"Sorry, I encountered an error: {str(e)}"
 
+async def aprocess_user_message(message: str, processed_files=None, tenant_id: str = "default", user_role: str = "customer",
+                                session_id: str = DEFAULT_SESSION_ID) -> str:
+    """Async process_user_message for the API: awaits the agent so other requests keep running meanwhile"""
+    # A pool miss compiles the agent and file processing reads from disk, so both run in worker threads
+    rag_agent = await asyncio.to_thread(initialize_agent, tenant_id=tenant_id, user_role=user_role)
+
+    conversation = await asyncio.to_thread(get_conversation, session_id)
+
+    try:
+        # check relevance of human query first - deny if irrelevant without processing
+        relevant, msg = guardrails.is_relevant(message)
+        if not relevant:
+            return msg
+
+        if processed_files:
+            human_message = await asyncio.to_thread(_build_human_message, message, processed_files)
+        else:
+            human_message = HumanMessage(content=message)
+
+        result = await rag_agent.ainvoke({"messages": _messages_with_context(conversation, human_message)})
+
+        return _record_exchange(conversation, human_message, result)
+
+    except Exception as e:
+        return f"Sorry, I encountered an error: {str(e)}"
+
+async def astream_user_message(message: str, processed_files=None, tenant_id: str = "default", user_role: str = "customer",
+                               session_id: str = DEFAULT_SESSION_ID) -> AsyncIterator[Dict]:
+    """Streaming aprocess_user_message: yields token, tool_start/tool_end and a final message event (see chat_streaming)"""
+    rag_agent = await asyncio.to_thread(initialize_agent, tenant_id=tenant_id, user_role=user_role)
+
+    conversation = await asyncio.to_thread(get_conversation, session_id)
+
+    # check relevance of human query first - deny if irrelevant without processing
+    relevant, msg = guardrails.is_relevant(message)
+    if not relevant:
+        yield {"event": "message", "data": {"response": msg, "tool_calls": 0, "time_to_first_token_ms": None, "total_ms": 0.0}}
+        return
+
+    if processed_files:
+        human_message = await asyncio.to_thread(_build_human_message, message, processed_files)
+    else:
+        human_message = HumanMessage(content=message)
+
+    async for event in stream_chat_events(rag_agent, {"messages": _messages_with_context(conversation, human_message)}):
+        if event["event"] == "message":
+            # The final graph state is recorded in the session, not sent to the client
+            state = event["data"].pop("state")
+            if state:
+                _record_exchange(conversation, human_message, state)
+        yield event
+
 def _summarize_current_chat(current_chat_messages, old_chat_summary):
     """Summarize current chat session and append to old summary with timestamp"""
     if not current_chat_messages: 
@@ -170,43 +289,42 @@ def get_vector_store_status(tenant_id: str = None) -> dict:
     except Exception as e:
         return {"status": "error", "approx_docs": 0, "error": str(e)}
 
-def save_current_chat_session():
-    """Save current chat session to summary"""
-    global _current_chat_messages, _old_chat_summary
-    
-    if not _current_chat_messages:
+def save_current_chat_session(session_id: str = DEFAULT_SESSION_ID):
+    """Save a chat session to summary"""
+    with _conversations_lock:
+        conversation = _conversations.get(session_id)
+        messages = list(conversation["messages"]) if conversation else []
+    if not messages:
         return
     
     try:
         # Use local summarization logic to avoid importing echo.py's main execution
-        updated_summary = _summarize_current_chat(_current_chat_messages, _old_chat_summary)
-        save_chat_summary(updated_summary)
+        # (outside the lock - the LLM call is slow)
+        session_summary = _summarize_current_chat(messages, "")
+
+        # Append to the summary file as it is now, so sessions saved in the meantime are kept
+        with _summary_file_lock:
+            save_chat_summary(load_chat_summary() + session_summary)
         
-        # Reset current chat
-        _current_chat_messages.clear()
-        _old_chat_summary = updated_summary
+        # Reset current chat, keeping messages added while summarizing; only this session's
+        # own summaries carry over as context
+        with _conversations_lock:
+            del conversation["messages"][:len(messages)]
+            conversation["old_chat_summary"] += session_summary
         
     except Exception as e:
         print(f"Error saving chat session: {str(e)}")
 
-def clear_chat_session():
-    """Clear current chat session"""
-    global _current_chat_messages
-    _current_chat_messages.clear()
-
-def get_current_chat_messages():
-    """Get current chat messages for display"""
-    return _current_chat_messages.copy()
-
-def get_current_tenant_context():
-    """Get current tenant context"""
-    return {
-        "tenant_id": _current_tenant_id,
-        "user_role": _current_user_role
-    }
+def clear_chat_session(session_id: str = DEFAULT_SESSION_ID):
+    """Clear a chat session without saving"""
+    with _conversations_lock:
+        conversation = _conversations.get(session_id)
+        if conversation:
+            conversation["messages"].clear()
+            conversation["last_activity"] = datetime.now()
 
-def reset_agent_for_new_tenant(tenant_id: str, user_role: str):
-    """Reset agent when tenant context changes"""
-    global _rag_agent
-    _rag_agent = None  # Force reinitialization with new context
-    initialize_agent(tenant_id=tenant_id, user_role=user_role)
\ No newline at end of file
+def get_current_chat_messages(session_id: str = DEFAULT_SESSION_ID) -> List[BaseMessage]:
+    """Get a chat session's messages for display"""
+    with _conversations_lock:
+        conversation = _conversations.get(session_id)
+        return list(conversation["messages"]) if conversation else []
\ No newline at end of file
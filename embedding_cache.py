@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Embedding caches
+
+EmbeddingCache stores document embeddings on disk keyed by (model name, sha256 of
+chunk text) so re-ingesting, migrating or restoring unchanged chunks does not
+re-run the model. Entries are evicted least-recently-used once the configured
+size cap is reached.
+
+QueryEmbeddingCache is a bounded in-process LRU for query embeddings with
+hit/miss counters per tenant.
+
+Usage:
+    python embedding_cache.py [--clear]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Any, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest used as the cache key for a chunk of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of float32 embedding vectors"""
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        """
+        Initialize the embedding cache
+
+        Args:
+            path: SQLite file used to persist cached vectors
+            max_entries: Maximum number of vectors kept before LRU eviction
+        """
+        self.path = path
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._last_tick = 0.0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def _tick(self) -> float:
+        """Return a strictly increasing access timestamp so LRU order has no ties"""
+        self._last_tick = max(time.time(), self._last_tick + 1e-6)
+        return self._last_tick
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached vectors and mark them as recently used
+
+        Args:
+            model: Embedding model identifier
+            hashes: Content hashes to look up
+
+        Returns:
+            Dict[str, np.ndarray]: Cached vectors keyed by content hash
+        """
+        found = {}
+        if not hashes:
+            return found
+
+        with self._lock:
+            now = self._tick()
+            # SQLite limits bound parameters per statement, so query in slices
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + batch
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, model: str, hashes: List[str], vectors: np.ndarray) -> None:
+        """
+        Store vectors and evict least-recently-used entries above the size cap
+
+        Args:
+            model: Embedding model identifier
+            hashes: Content hashes, one per vector row
+            vectors: float32 matrix of embeddings
+        """
+        if not hashes:
+            return
+
+        with self._lock:
+            now = self._tick()
+            rows = [
+                (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for text_hash, vector in zip(hashes, vectors)
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = total - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self._evictions += overflow
+                logger.debug(f"Evicted {overflow} embeddings from cache")
+            self._conn.commit()
+
+    def embed_with_cache(self, model: str, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings for texts, encoding only those not already cached
+
+        Args:
+            model: Embedding model identifier
+            texts: Texts to embed
+            encode_fn: Function that embeds a list of texts into a float32 matrix
+
+        Returns:
+            np.ndarray: float32 matrix of embeddings in input order
+        """
+        texts = list(texts)
+        if not texts:
+            return encode_fn(texts)
+
+        hashes = [content_hash(text) for text in texts]
+        cached = self.get_many(model, list(set(hashes)))
+
+        # Encode each distinct missing text once, even if it repeats in the input
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            missing_hashes = list(missing.keys())
+            new_vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            self.put_many(model, missing_hashes, new_vectors)
+            cached.update(zip(missing_hashes, new_vectors))
+
+        with self._lock:
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        return np.vstack([cached[text_hash] for text_hash in hashes]).astype(np.float32, copy=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss statistics
+
+        Returns:
+            Dict[str, Any]: Hits, misses, hit rate, evictions and current entry count
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self._hits + self._misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def clear(self) -> None:
+        """Remove all cached vectors"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+        logger.info(f"Embedding cache cleared: {self.path}")
+
+
+class QueryEmbeddingCache:
+    """Bounded in-process LRU of query embeddings with per-tenant hit metrics"""
+
+    def __init__(self, max_entries: int = 2048, lowercase: bool = False):
+        """
+        Initialize the query embedding cache
+
+        Args:
+            max_entries: Maximum number of cached query embeddings
+            lowercase: Fold case when normalizing keys (safe for uncased models only)
+        """
+        self.max_entries = max(int(max_entries), 1)
+        self.lowercase = lowercase
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tenant_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def normalize(self, text: str) -> str:
+        """Collapse whitespace (and case for uncased models) so trivial variants share a key"""
+        key = " ".join(text.split())
+        return key.lower() if self.lowercase else key
+
+    def get_or_compute(self, text: str, compute_fn: Callable[[str], List[float]], tenant_id: Optional[str] = None) -> List[float]:
+        """
+        Return the cached embedding for a query, computing and storing it on a miss
+
+        Args:
+            text: Query text
+            compute_fn: Function that embeds the query text
+            tenant_id: Tenant the lookup is attributed to in hit metrics
+
+        Returns:
+            List[float]: Query embedding
+        """
+        key = self.normalize(text)
+        tenant_key = tenant_id or "unknown"
+
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._tenant_stats[tenant_key]["hits"] += 1
+                return list(vector)
+            self._tenant_stats[tenant_key]["misses"] += 1
+
+        # Embed outside the lock so concurrent misses don't serialize on the model
+        vector = compute_fn(key)
+
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return list(vector)
+
+    def get_or_compute_many(self, texts: List[str], compute_many_fn: Callable[[List[str]], List[List[float]]], tenant_id: Optional[str] = None) -> List[List[float]]:
+        """
+        Return cached embeddings for several queries, computing all misses in one call
+
+        Args:
+            texts: Query texts
+            compute_many_fn: Function that embeds a list of query texts in one batch
+            tenant_id: Tenant the lookups are attributed to in hit metrics
+
+        Returns:
+            List[List[float]]: Query embeddings in the order of texts
+        """
+        keys = [self.normalize(text) for text in texts]
+        tenant_key = tenant_id or "unknown"
+        vectors: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self._tenant_stats[tenant_key]["hits"] += 1
+                    vectors[key] = vector
+                else:
+                    self._tenant_stats[tenant_key]["misses"] += 1
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            # One batched encode for every miss, outside the lock
+            computed = compute_many_fn(missing)
+            with self._lock:
+                for key, vector in zip(missing, computed):
+                    vectors[key] = vector
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return [list(vectors[key]) for key in keys]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache size and hit-rate counters overall and per tenant
+
+        Returns:
+            Dict[str, Any]: Entry count, totals and a per-tenant breakdown
+        """
+        with self._lock:
+            tenants = {}
+            total_hits = total_misses = 0
+            for tenant_id, counts in self._tenant_stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                tenants[tenant_id] = {
+                    "hits": counts["hits"],
+                    "misses": counts["misses"],
+                    "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+                }
+                total_hits += counts["hits"]
+                total_misses += counts["misses"]
+
+            total = total_hits + total_misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": total_hits,
+                "misses": total_misses,
+                "hit_rate": total_hits / total if total else 0.0,
+                "tenants": tenants,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached query embeddings and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._tenant_stats.clear()
+
+
+def main():
+    """Print cache statistics or clear the cache"""
+    from config_loader import get_config
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the persistent embedding cache")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached embeddings")
+    args = parser.parse_args()
+
+    cache_config = get_config().get('embedding.cache', {})
+    cache = EmbeddingCache(
+        cache_config.get('path', 'knowledgeBase/embedding_cache.sqlite3'),
+        max_entries=cache_config.get('max_entries', 100000)
+    )
+
+    if args.clear:
+        cache.clear()
+
+    for key, value in cache.get_stats().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
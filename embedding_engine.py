@@ -0,0 +1,195 @@
+import time
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Supported embedding backends and the ONNX file loaded for each by default
+# (plain "onnx" lets sentence-transformers find onnx/model.onnx or export one)
+SUPPORTED_BACKENDS = ["torch", "onnx", "onnx_int8"]
+DEFAULT_ONNX_FILES = {
+    "onnx": None,
+    "onnx_int8": "onnx/model_quint8_avx2.onnx",
+}
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch", onnx_file_name: Optional[str] = None):
+    """
+    Load a SentenceTransformer model on the requested CPU backend
+
+    Args:
+        model_name: Hub name or local path of the model (or of an exported ONNX copy)
+        backend: One of "torch", "onnx" or "onnx_int8"
+        onnx_file_name: ONNX file inside the model directory (defaults per backend)
+
+    Returns:
+        SentenceTransformer: Loaded model
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend '{backend}'. Must be one of: {SUPPORTED_BACKENDS}")
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    file_name = onnx_file_name or DEFAULT_ONNX_FILES[backend]
+    if file_name:
+        model_kwargs["file_name"] = file_name
+    return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Compare two embedding matrices row by row
+
+    Args:
+        reference: Embeddings from the reference backend (e.g. PyTorch)
+        candidate: Embeddings for the same texts from another backend
+
+    Returns:
+        Dict[str, float]: Mean and minimum cosine similarity and the worst-case drift (1 - cosine)
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Shape mismatch: {reference.shape} vs {candidate.shape}")
+
+    ref_norm = np.linalg.norm(reference, axis=1)
+    cand_norm = np.linalg.norm(candidate, axis=1)
+    cosines = np.einsum("ij,ij->i", reference, candidate) / np.maximum(ref_norm * cand_norm, 1e-12)
+
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "max_drift": float(1.0 - cosines.min()),
+    }
+
+
+class EmbeddingEngine:
+    """
+    Batched embedding engine wrapping a SentenceTransformer model.
+
+    Inputs are sorted by token length and split into fixed-size batches so each
+    encode call pads to a similar length. Output is a float32 NumPy matrix in the
+    original input order, which Chroma accepts directly.
+    """
+
+    def __init__(self, model, batch_size: int = 32, sort_by_length: bool = True):
+        """
+        Initialize the embedding engine
+
+        Args:
+            model: Loaded SentenceTransformer model
+            batch_size: Number of texts per encode call
+            sort_by_length: Group texts of similar token length into the same batch
+        """
+        self.model = model
+        self.batch_size = max(int(batch_size), 1)
+        self.sort_by_length = sort_by_length
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "texts": 0,
+            "tokens": 0,
+            "seconds": 0.0,
+            "last_batch_docs_per_sec": 0.0,
+        }
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Return the token length of each text, falling back to character length"""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(text) for text in texts]
+
+        max_length = getattr(self.model, "max_seq_length", None)
+        try:
+            encoded = tokenizer(
+                texts,
+                add_special_tokens=True,
+                truncation=max_length is not None,
+                max_length=max_length,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+            )
+            return [len(ids) for ids in encoded["input_ids"]]
+        except Exception as e:
+            logger.debug(f"Tokenizer length estimation failed, using character length: {e}")
+            return [len(text) for text in texts]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts into a float32 embedding matrix
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            np.ndarray: Matrix of shape (len(texts), dim) in input order
+        """
+        texts = list(texts)
+        if not texts:
+            dim = self.model.get_sentence_embedding_dimension() or 0
+            return np.empty((0, dim), dtype=np.float32)
+
+        lengths = self._token_lengths(texts)
+        if self.sort_by_length:
+            order = np.argsort(lengths, kind="stable")
+        else:
+            order = np.arange(len(texts))
+
+        output = None
+        for start in range(0, len(texts), self.batch_size):
+            batch_idx = order[start:start + self.batch_size]
+            batch_texts = [texts[i] for i in batch_idx]
+
+            batch_start = time.perf_counter()
+            batch_embeddings = self.model.encode(
+                batch_texts,
+                batch_size=len(batch_texts),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            elapsed = time.perf_counter() - batch_start
+
+            if output is None:
+                output = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            output[batch_idx] = batch_embeddings
+
+            self._record_batch(len(batch_texts), sum(lengths[i] for i in batch_idx), elapsed)
+
+        return output
+
+    def _record_batch(self, num_texts: int, num_tokens: int, elapsed: float) -> None:
+        """Update throughput counters for one encoded batch"""
+        docs_per_sec = num_texts / elapsed if elapsed > 0 else 0.0
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["texts"] += num_texts
+            self._stats["tokens"] += num_tokens
+            self._stats["seconds"] += elapsed
+            self._stats["last_batch_docs_per_sec"] = docs_per_sec
+
+        logger.debug(f"Embedded batch of {num_texts} texts ({num_tokens} tokens) "
+                     f"in {elapsed * 1000:.1f} ms ({docs_per_sec:.1f} docs/sec)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cumulative throughput statistics
+
+        Returns:
+            Dict[str, Any]: Batch, text and token counts with overall docs/sec
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["docs_per_sec"] = stats["texts"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        """Reset throughput statistics"""
+        with self._stats_lock:
+            for key in self._stats:
+                self._stats[key] = 0.0 if isinstance(self._stats[key], float) else 0
@@ -4,7 +4,8 @@ Vector Database Metadata Inspection Script
 
 This script inspects the current metadata structure of documents in the ChromaDB
 vector store to understand what fields exist and identify which documents need
-multi-tenant metadata updates.
+multi-tenant metadata updates. Every collection is inspected (all shards when
+collection sharding is enabled); --tenant_id only reads that tenant's collection.
 
 Usage:
     python inspect_vector_db_metadata.py [--sample_size <number>] [--tenant_id <tenant>] [--show_examples]
@@ -29,7 +30,7 @@ from collections import Counter, defaultdict
 from datetime import datetime
 import sqlite_fix  # Import before ChromaDB
 
-from services import vector_store, db_collection_name
+from services import get_collection_name, list_collection_names, _get_chroma_client
 from logger_setup import setup_logger
 
 logger = setup_logger()
@@ -38,8 +39,8 @@ class VectorDBInspector:
     """Class to inspect vector database metadata"""
 
     def __init__(self):
-        self.vector_store = vector_store
-        self.collection = vector_store._collection
+        self.client = _get_chroma_client()
+        self.collection_names = list_collection_names()
 
     def get_documents_sample(self, sample_size: int = 5, tenant_id: str = None) -> dict:
         """Get a sample of documents for analysis, optionally filtered by tenant_id"""
@@ -52,11 +53,22 @@ class VectorDBInspector:
                 logger.info("Retrieving documents from ChromaDB...")
                 where_clause = None
 
-            results = self.collection.get(
-                include=['metadatas', 'documents'],
-                limit=sample_size if sample_size > 0 else None,
-                where=where_clause
-            )
+            collection_names = self.collection_names
+            if tenant_id:
+                collection_names = [name for name in collection_names if name == get_collection_name(tenant_id)]
+
+            results = {'ids': [], 'metadatas': [], 'documents': []}
+            for collection_name in collection_names:
+                remaining = sample_size - len(results['ids']) if sample_size > 0 else None
+                if remaining == 0:
+                    break
+                page = self.client.get_collection(collection_name).get(
+                    include=['metadatas', 'documents'],
+                    limit=remaining,
+                    where=where_clause
+                )
+                for key in results:
+                    results[key].extend(page[key])
 
             if not results['ids']:
                 if tenant_id:
@@ -111,7 +123,7 @@ class VectorDBInspector:
         logger.info("=" * 70)
         logger.info("VECTOR DATABASE METADATA ANALYSIS REPORT")
         logger.info("=" * 70)
-        logger.info(f"Collection: {db_collection_name}")
+        logger.info(f"Collections: {', '.join(self.collection_names)}")
         logger.info(f"Total Documents Analyzed: {analysis['total_documents']}")
         logger.info(f"Analysis Timestamp: {datetime.now().isoformat()}")
         logger.info("=" * 70)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Collection Sharding Migration Script
+
+This script splits the single multi-tenant ChromaDB collection into the per-tenant
+or hashed shard collections selected by vector_store.sharding.mode in the config.
+Documents are copied with their stored embeddings (nothing is re-embedded), in
+batches, and the source collection is only deleted when asked for and after the
+shard counts have been verified.
+
+Usage:
+    python migrate_to_sharded_collections.py [--source_collection <name>] [--batch_size <n>] [--dry_run] [--delete_source]
+
+Examples:
+    # Show how documents would be distributed without writing anything
+    python migrate_to_sharded_collections.py --dry_run
+
+    # Copy into shards, verify, then drop the old collection
+    python migrate_to_sharded_collections.py --delete_source
+
+Note:
+    Set vector_store.sharding.mode to "per_tenant" or "hashed" in config/base.yaml first,
+    and back up the vector store (python backup_vector_db.py) before using --delete_source.
+    A running API keeps handles to the collections it opened, so it must be restarted
+    after the migration.
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from typing import Dict, Any
+import sqlite_fix  # Import before ChromaDB
+
+import services
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Tenant assigned to documents ingested before tenant metadata existed (matches data_ingestion)
+DEFAULT_TENANT = "default"
+
+
+class ShardMigrator:
+    """Class to copy documents from the single collection into tenant shards"""
+
+    def __init__(self, source_collection: str, batch_size: int = 500):
+        self.client = services._get_chroma_client()
+        self.source = self.client.get_collection(source_collection)
+        self.source_name = source_collection
+        self.batch_size = batch_size
+        self.copied_per_shard: Dict[str, int] = defaultdict(int)
+        self.tenants_per_shard: Dict[str, set] = defaultdict(set)
+        self.untagged_count = 0
+
+    def migrate(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Copy every document of the source collection into its shard"""
+        total = self.source.count()
+        logger.info(f"Source collection '{self.source_name}' holds {total} documents")
+
+        offset = 0
+        while offset < total:
+            batch = self.source.get(
+                include=['embeddings', 'documents', 'metadatas'],
+                limit=self.batch_size,
+                offset=offset
+            )
+            if not batch['ids']:
+                break
+            self._copy_batch(batch, dry_run)
+            offset += len(batch['ids'])
+            logger.info(f"Processed {offset}/{total} documents")
+
+        return {
+            "source_count": total,
+            "copied": sum(self.copied_per_shard.values()),
+            "shards": dict(self.copied_per_shard),
+            "untagged": self.untagged_count
+        }
+
+    def _copy_batch(self, batch: Dict[str, Any], dry_run: bool) -> None:
+        """Group one batch by target shard and upsert it"""
+        groups = defaultdict(lambda: {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+        shard_tenant = {}
+
+        for i, doc_id in enumerate(batch['ids']):
+            metadata = batch['metadatas'][i] or {}
+            tenant_id = metadata.get('tenant_id')
+            if not tenant_id:
+                tenant_id = DEFAULT_TENANT
+                self.untagged_count += 1
+
+            shard = services.get_collection_name(tenant_id)
+            shard_tenant.setdefault(shard, tenant_id)
+            self.tenants_per_shard[shard].add(tenant_id)
+
+            group = groups[shard]
+            group["ids"].append(doc_id)
+            group["embeddings"].append(batch['embeddings'][i])
+            group["documents"].append(batch['documents'][i])
+            group["metadatas"].append(metadata)
+
+        for shard, group in groups.items():
+            if not dry_run:
+                # Upsert keeps the migration idempotent if it is re-run after an interruption
+                target = services.get_vector_store(shard_tenant[shard])._collection
+                target.upsert(
+                    ids=group["ids"],
+                    embeddings=group["embeddings"],
+                    documents=group["documents"],
+                    metadatas=group["metadatas"]
+                )
+            self.copied_per_shard[shard] += len(group["ids"])
+
+    def verify(self) -> bool:
+        """Check every shard holds at least the documents copied into it"""
+        ok = True
+        for shard, expected in self.copied_per_shard.items():
+            actual = self.client.get_collection(shard).count()
+            if actual < expected:
+                logger.error(f"✗ Shard '{shard}' has {actual} documents, expected at least {expected}")
+                ok = False
+            else:
+                logger.info(f"✓ Shard '{shard}': {actual} documents")
+        return ok
+
+    def delete_source(self) -> None:
+        """Drop the source collection once its documents live in shards"""
+        services.drop_collection(self.source_name)
+        logger.info(f"Deleted source collection '{self.source_name}'")
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Split the multi-tenant ChromaDB collection into shard collections",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--source_collection', default=services.db_collection_name,
+                        help=f'Collection to split (default: {services.db_collection_name})')
+    parser.add_argument('--batch_size', type=int, default=500, help='Documents copied per batch (default: 500)')
+    parser.add_argument('--dry_run', action='store_true', help='Show the shard distribution without writing')
+    parser.add_argument('--delete_source', action='store_true', help='Delete the source collection after a verified copy')
+    parser.add_argument('--log_level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                        help='Set the logging level (default: INFO)')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+
+    if services.sharding_mode == "single":
+        logger.error("vector_store.sharding.mode is 'single' - set it to 'per_tenant' or 'hashed' before migrating")
+        sys.exit(1)
+
+    logger.info("=" * 60)
+    logger.info("COLLECTION SHARDING MIGRATION")
+    logger.info("=" * 60)
+    logger.info(f"Sharding mode: {services.sharding_mode}")
+    logger.info(f"Dry run: {args.dry_run}")
+    logger.info("=" * 60)
+
+    try:
+        migrator = ShardMigrator(args.source_collection, batch_size=args.batch_size)
+        summary = migrator.migrate(dry_run=args.dry_run)
+
+        logger.info("=" * 60)
+        logger.info("MIGRATION SUMMARY")
+        logger.info("=" * 60)
+        for shard, count in sorted(summary["shards"].items()):
+            tenants = ", ".join(sorted(migrator.tenants_per_shard[shard]))
+            logger.info(f"📁 {shard}: {count} documents (tenants: {tenants})")
+        if summary["untagged"]:
+            logger.warning(f"⚠️ {summary['untagged']} documents had no tenant_id and were routed to tenant '{DEFAULT_TENANT}'")
+        logger.info(f"📄 Documents {'to copy' if args.dry_run else 'copied'}: {summary['copied']}/{summary['source_count']}")
+
+        if args.dry_run:
+            logger.info("Dry run - no changes written")
+            sys.exit(0)
+
+        if not migrator.verify():
+            logger.error("❌ Verification failed - source collection left untouched")
+            sys.exit(1)
+
+        if args.delete_source:
+            if args.source_collection in summary["shards"]:
+                logger.error("❌ Source collection is also a shard target - not deleting it")
+                sys.exit(1)
+            migrator.delete_source()
+
+        logger.info("✅ Migration completed successfully")
+        sys.exit(0)
+
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Migration interrupted by user - re-run to resume")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,210 @@
 import os
 import math
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, NamedTuple
 from collections import Counter
 import re
 from langchain.schema import Document
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from config_loader import get_config
+from term_vectors import query_term_vector, term_vector_from_metadata, sparse_dot
+from cross_encoder_rerank import CrossEncoderReranker, get_reranker
 
 logger = logging.getLogger(__name__)
 
+# Quality contribution of each document_type set at ingestion
+DOCUMENT_TYPE_QUALITY = {
+    'formatted_document': 0.3,
+    'structured_text': 0.2,
+    'plain_text': 0.1
+}
+
+# Metadata fields read into columns for scoring, in row order
+METADATA_COLUMNS = (
+    "quality_score",
+    "document_type",
+    "content_density",
+    "chunk_position_ratio",
+    "word_count",
+    "is_first_chunk",
+    "is_first_page",
+    "file_modified_epoch",
+    "ingestion_epoch"
+)
+
+
+@lru_cache(maxsize=4096)
+def _timestamp_to_epoch(value: str) -> float:
+    """Parse an ISO timestamp to epoch seconds (NaN if invalid); cached because chunks recur across queries"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid timestamp in document metadata: {value}")
+        return math.nan
+
+
+def _epoch_field(metadata: Dict, epoch_key: str, iso_key: str) -> float:
+    """Epoch seconds stored at ingestion, or parsed from the ISO timestamp for older chunks"""
+    epoch = metadata.get(epoch_key)
+    if epoch is not None:
+        return epoch
+    value = metadata.get(iso_key)
+    return _timestamp_to_epoch(value) if value else math.nan
+
+
+def extract_metadata_columns(documents: List[Document]) -> Dict[str, np.ndarray]:
+    """
+    Read the metadata fields used for scoring into NumPy columns, one pass over the documents
+
+    Chunks ingested with precomputed features only need their quality_score and
+    epoch fields read. For older chunks the raw quality fields are read instead
+    (quality_score is NaN), and missing fields take the defaults the scoring rules
+    assume: unknown type, zero density and word count, mid-document position and
+    NaN timestamps.
+
+    Args:
+        documents: Documents to score
+
+    Returns:
+        Dict[str, np.ndarray]: One float array per field, aligned with documents
+    """
+    rows = []
+    for doc in documents:
+        metadata = doc.metadata
+        quality_score = metadata.get('quality_score')
+        if quality_score is not None:
+            quality_fields = (quality_score, 0.0, 0.0, 0.5, 0, False, False)
+        else:
+            quality_fields = (
+                math.nan,
+                DOCUMENT_TYPE_QUALITY.get(metadata.get('document_type'), 0.0),
+                metadata.get('content_density', 0.0),
+                metadata.get('chunk_position_ratio', 0.5),
+                metadata.get('word_count', 0),
+                bool(metadata.get('is_first_chunk', False)),
+                bool(metadata.get('is_first_page', False))
+            )
+        rows.append(quality_fields + (
+            _epoch_field(metadata, 'file_modified_epoch', 'file_modified_timestamp'),
+            _epoch_field(metadata, 'ingestion_epoch', 'ingestion_timestamp')
+        ))
+
+    table = np.array(rows, dtype=np.float64).reshape(len(rows), len(METADATA_COLUMNS))
+    return {name: table[:, i] for i, name in enumerate(METADATA_COLUMNS)}
+
+
+def static_quality_scores(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Quality score per document from its raw metadata columns
+
+    Every input is fixed when a chunk is ingested, so ingestion stores the result
+    as quality_score (see compute_quality_score) and scoring only falls back to this
+    for chunks ingested before that field existed.
+    """
+    # Document type quality (formatted documents score higher)
+    score = columns["document_type"].copy()
+
+    # Content density (higher word density = better quality, typical range 0.1-0.2 for good content)
+    score += np.minimum(np.maximum(columns["content_density"], 0.0) * 5, 0.3)
+
+    # Position-based scoring (first chunks often contain important info):
+    # 0.2 in the first 20% of the document, 0.1 in the first 50%
+    position = columns["chunk_position_ratio"]
+    score += 0.1 * (position <= 0.2) + 0.1 * (position <= 0.5)
+
+    # Document size quality (medium-sized documents often better):
+    # 0.1 for 100-1000 words, 0.05 for 50-2000 words
+    words = columns["word_count"]
+    score += 0.05 * ((words >= 50) & (words <= 2000)) + 0.05 * ((words >= 100) & (words <= 1000))
+
+    # First page/chunk bonus (often contains summaries/introductions)
+    score += 0.1 * columns["is_first_chunk"] + 0.1 * columns["is_first_page"]
+
+    return np.minimum(score, 1.0)
+
+
+def compute_quality_score(metadata: Dict) -> float:
+    """
+    Static quality score for one chunk, stored as quality_score at ingestion
+
+    Args:
+        metadata: Chunk metadata with the raw quality fields (quality_score itself is ignored)
+
+    Returns:
+        float: Quality score (0-1 range)
+    """
+    raw_fields = {key: value for key, value in metadata.items() if key != 'quality_score'}
+    columns = extract_metadata_columns([Document(page_content="", metadata=raw_fields)])
+    return round(float(static_quality_scores(columns)[0]), 6)
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first (all indices when k is None)
+
+    Uses a partition so only the selected k are sorted; ties keep input order, also
+    at the k boundary, where the earliest of the tied indices are the ones kept.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    kth_score = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth_score)
+    tied = np.flatnonzero(scores == kth_score)[:k - len(above)]
+    candidates = np.concatenate([above, tied])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ScoringWeights(NamedTuple):
+    """Component weights, replaced as a whole so a scoring call never sees a half-updated set"""
+    semantic: float
+    keyword: float
+    quality: float
+    recency: float
+    rerank: float = 0.0
+
+    def normalized(self) -> "ScoringWeights":
+        """Scale the weights to sum to 1.0 (warns when they didn't)"""
+        total = sum(self)
+        if abs(total - 1.0) > 0.01:
+            logger.warning(f"Scoring weights sum to {total}, not 1.0. Normalizing weights.")
+            return ScoringWeights(*(weight / total for weight in self))
+        return self
+
+    def without_rerank(self) -> "ScoringWeights":
+        """The other four weights rescaled to sum to 1.0, for requests where reranking was skipped"""
+        total = self.semantic + self.keyword + self.quality + self.recency
+        if total <= 0:
+            return self
+        return ScoringWeights(self.semantic / total, self.keyword / total, self.quality / total, self.recency / total, 0.0)
+
+
 class RAGScoringService:
     """
     Enhanced document scoring service for RAG retrieval combining multiple scoring algorithms:
     - Semantic similarity (vector search scores)
-    - Keyword matching (BM25/TF-IDF)
+    - Keyword matching (sparse term vectors built at ingestion)
     - Document quality (metadata-based)
     - Recency scoring
+    - Cross-encoder rerank (optional, weight 0 by default)
+
+    Scoring is reentrant: all per-request state is local to the call and the only
+    shared state, the weights, is an immutable ScoringWeights read once per call,
+    so one instance can serve concurrent requests from the API's thread pool.
     """
 
     def __init__(self,
                  semantic_weight: Optional[float] = None,
                  keyword_weight: Optional[float] = None,
                  quality_weight: Optional[float] = None,
-                 recency_weight: Optional[float] = None):
+                 recency_weight: Optional[float] = None,
+                 rerank_weight: Optional[float] = None,
+                 reranker: Optional[CrossEncoderReranker] = None):
         """
         Initialize RAG scoring service with configurable weights
 
@@ -35,36 +213,46 @@ class RAGScoringService:
             keyword_weight: Weight for keyword matching scores (None to use config)
             quality_weight: Weight for document quality scores (None to use config)
             recency_weight: Weight for recency scores (None to use config)
+            rerank_weight: Weight for cross-encoder scores (None to use config)
+            reranker: Cross-encoder reranker (None to use the configured one, if enabled)
         """
         # Load config and use provided weights or defaults from config
         config = get_config()
         scoring_config = config.get_section('rag_scoring')
         weights = scoring_config.get('weights', {})
 
-        self.semantic_weight = semantic_weight if semantic_weight is not None else weights.get('semantic', 0.4)
-        self.keyword_weight = keyword_weight if keyword_weight is not None else weights.get('keyword', 0.3)
-        self.quality_weight = quality_weight if quality_weight is not None else weights.get('quality', 0.2)
-        self.recency_weight = recency_weight if recency_weight is not None else weights.get('recency', 0.1)
-
         # Validate weights sum to 1.0
-        total_weight = sum([self.semantic_weight, self.keyword_weight, self.quality_weight, self.recency_weight])
-        if abs(total_weight - 1.0) > 0.01:
-            logger.warning(f"Scoring weights sum to {total_weight}, not 1.0. Normalizing weights.")
-            self.semantic_weight /= total_weight
-            self.keyword_weight /= total_weight
-            self.quality_weight /= total_weight
-            self.recency_weight /= total_weight
-
-        # Initialize TF-IDF vectorizer for keyword scoring using config values
-        tfidf_config = scoring_config.get('tfidf', {})
-        ngram_range = tfidf_config.get('ngram_range', [1, 2])
-        self.tfidf_vectorizer = TfidfVectorizer(
-            stop_words=tfidf_config.get('stop_words', 'english'),
-            max_features=tfidf_config.get('max_features', 1000),
-            ngram_range=tuple(ngram_range),  # Convert list to tuple for TfidfVectorizer
-            lowercase=True
-        )
-        self.tfidf_fitted = False
+        self.weights = ScoringWeights(
+            semantic=semantic_weight if semantic_weight is not None else weights.get('semantic', 0.4),
+            keyword=keyword_weight if keyword_weight is not None else weights.get('keyword', 0.3),
+            quality=quality_weight if quality_weight is not None else weights.get('quality', 0.2),
+            recency=recency_weight if recency_weight is not None else weights.get('recency', 0.1),
+            rerank=rerank_weight if rerank_weight is not None else weights.get('rerank', 0.0)
+        ).normalized()
+
+        self.reranker = reranker if reranker is not None else (get_reranker() if self.weights.rerank > 0 else None)
+        if self.weights.rerank > 0 and self.reranker is None:
+            logger.warning("Rerank weight is set but rag_scoring.cross_encoder is disabled; rerank component will be skipped")
+
+    @property
+    def semantic_weight(self) -> float:
+        return self.weights.semantic
+
+    @property
+    def keyword_weight(self) -> float:
+        return self.weights.keyword
+
+    @property
+    def quality_weight(self) -> float:
+        return self.weights.quality
+
+    @property
+    def recency_weight(self) -> float:
+        return self.weights.recency
+
+    @property
+    def rerank_weight(self) -> float:
+        return self.weights.rerank
 
     def compute_semantic_scores(self, documents: List[Document], similarity_scores: List[float]) -> List[float]:
         """
@@ -77,64 +265,24 @@ class RAGScoringService:
         Returns:
             List of normalized semantic scores (0-1 range)
         """
-        if not similarity_scores:
-            return [0.0] * len(documents)
-
-        # Normalize scores to 0-1 range
-        min_score = min(similarity_scores)
-        max_score = max(similarity_scores)
+        return self._semantic_column(documents, similarity_scores).tolist()
 
-        if max_score == min_score:
-            return [1.0] * len(documents)
-
-        normalized_scores = [(score - min_score) / (max_score - min_score) for score in similarity_scores]
-        logger.debug(f"Semantic scores normalized: min={min_score:.3f}, max={max_score:.3f}")
-
-        return normalized_scores
-
-    def compute_keyword_scores(self, query: str, documents: List[Document]) -> List[float]:
+    def compute_keyword_scores(self, query: str, documents: List[Document], idf: Optional[Dict[str, float]] = None) -> List[float]:
         """
-        Compute keyword matching scores using TF-IDF cosine similarity
+        Compute keyword matching scores as a sparse dot product of term vectors
+
+        Chunk vectors are precomputed at ingestion (metadata "term_vector"); only the
+        query vector is built here.
 
         Args:
             query: User query
             documents: List of retrieved documents
+            idf: Corpus IDF per query term (None weights query terms equally)
 
         Returns:
             List of keyword matching scores (0-1 range)
         """
-        if not documents:
-            return []
-
-        # Extract document texts
-        doc_texts = [doc.page_content for doc in documents]
-
-        # Fit TF-IDF if not already fitted or refit for new corpus
-        try:
-            # Create corpus with query + documents
-            corpus = [query] + doc_texts
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
-
-            # Query vector is first row, document vectors are remaining rows
-            query_vector = tfidf_matrix[0:1]
-            doc_vectors = tfidf_matrix[1:]
-
-            # Compute cosine similarity between query and each document
-            similarities = cosine_similarity(query_vector, doc_vectors)[0]
-
-            # Normalize to 0-1 range
-            if len(similarities) > 0:
-                max_sim = max(similarities) if max(similarities) > 0 else 1.0
-                normalized_scores = [sim / max_sim for sim in similarities]
-            else:
-                normalized_scores = [0.0] * len(documents)
-
-            logger.debug(f"Keyword scores computed for {len(documents)} documents")
-            return normalized_scores
-
-        except Exception as e:
-            logger.error(f"Error computing keyword scores: {e}")
-            return [0.0] * len(documents)
+        return self._keyword_column(query, documents, idf).tolist()
 
     def compute_quality_scores(self, documents: List[Document]) -> List[float]:
         """
@@ -146,54 +294,7 @@ class RAGScoringService:
         Returns:
             List of quality scores (0-1 range)
         """
-        quality_scores = []
-
-        for doc in documents:
-            metadata = doc.metadata
-            score = 0.0
-
-            # Document type quality (formatted documents score higher)
-            doc_type = metadata.get('document_type', 'unknown')
-            if doc_type == 'formatted_document':
-                score += 0.3
-            elif doc_type == 'structured_text':
-                score += 0.2
-            elif doc_type == 'plain_text':
-                score += 0.1
-
-            # Content density (higher word density = better quality)
-            content_density = metadata.get('content_density', 0.0)
-            if content_density > 0:
-                # Normalize density score (typical range 0.1-0.2 for good content)
-                density_score = min(content_density * 5, 0.3)
-                score += density_score
-
-            # Position-based scoring (first chunks often contain important info)
-            chunk_position_ratio = metadata.get('chunk_position_ratio', 0.5)
-            if chunk_position_ratio <= 0.2:  # First 20% of document
-                score += 0.2
-            elif chunk_position_ratio <= 0.5:  # First 50% of document
-                score += 0.1
-
-            # Document size quality (medium-sized documents often better)
-            word_count = metadata.get('word_count', 0)
-            if 100 <= word_count <= 1000:  # Optimal chunk size range
-                score += 0.1
-            elif 50 <= word_count < 100 or 1000 < word_count <= 2000:
-                score += 0.05
-
-            # First page/chunk bonus (often contains summaries/introductions)
-            if metadata.get('is_first_chunk', False):
-                score += 0.1
-            if metadata.get('is_first_page', False):
-                score += 0.1
-
-            # Ensure score is in 0-1 range
-            score = min(score, 1.0)
-            quality_scores.append(score)
-
-        logger.debug(f"Quality scores computed: avg={np.mean(quality_scores):.3f}")
-        return quality_scores
+        return self._quality_column(extract_metadata_columns(documents)).tolist()
 
     def compute_recency_scores(self, documents: List[Document]) -> List[float]:
         """
@@ -205,70 +306,112 @@ class RAGScoringService:
         Returns:
             List of recency scores (0-1 range)
         """
-        recency_scores = []
-        current_time = datetime.now()
-
-        for doc in documents:
-            metadata = doc.metadata
-            score = 0.0
-
-            # File modification recency (primary factor)
-            file_modified_str = metadata.get('file_modified_timestamp')
-            if file_modified_str:
-                try:
-                    file_modified = datetime.fromisoformat(file_modified_str)
-                    days_old = (current_time - file_modified).days
-
-                    # Scoring based on age (exponential decay)
-                    if days_old <= 7:  # Within a week
-                        score += 0.5
-                    elif days_old <= 30:  # Within a month
-                        score += 0.3
-                    elif days_old <= 90:  # Within 3 months
-                        score += 0.2
-                    elif days_old <= 365:  # Within a year
-                        score += 0.1
-                    # Older than a year gets no recency bonus
-
-                except ValueError:
-                    logger.warning(f"Invalid file_modified_timestamp: {file_modified_str}")
-
-            # Ingestion recency (secondary factor)
-            ingestion_str = metadata.get('ingestion_timestamp')
-            if ingestion_str:
-                try:
-                    ingestion_time = datetime.fromisoformat(ingestion_str)
-                    hours_since_ingestion = (current_time - ingestion_time).total_seconds() / 3600
-
-                    # Recent ingestion bonus (content freshness)
-                    if hours_since_ingestion <= 24:  # Within 24 hours
-                        score += 0.2
-                    elif hours_since_ingestion <= 168:  # Within a week
-                        score += 0.1
-
-                except ValueError:
-                    logger.warning(f"Invalid ingestion_timestamp: {ingestion_str}")
-
-            # Default score for documents without timestamp info
-            if score == 0.0:
-                score = 0.3  # Neutral score for unknown recency
-
-            recency_scores.append(score)
-
-        logger.debug(f"Recency scores computed: avg={np.mean(recency_scores):.3f}")
-        return recency_scores
+        return self._recency_column(extract_metadata_columns(documents)).tolist()
+
+    def compute_rerank_scores(self, query: str, documents: List[Document]) -> Optional[List[float]]:
+        """
+        Compute cross-encoder relevance scores
+
+        Args:
+            query: User query
+            documents: List of retrieved documents
+
+        Returns:
+            Optional[List[float]]: Scores (0-1 range), or None when no reranker is
+                configured or the latency budget skipped reranking
+        """
+        if self.reranker is None:
+            return None
+        return self.reranker.score(query, documents)
+
+    def _semantic_column(self, documents: List[Document], similarity_scores: List[float]) -> np.ndarray:
+        """Min-max normalised similarity scores as an array"""
+        if not similarity_scores:
+            return np.zeros(len(documents))
+
+        scores = np.asarray(similarity_scores, dtype=np.float64)
+        min_score, max_score = scores.min(), scores.max()
+        if max_score == min_score:
+            return np.ones(len(documents))
+
+        logger.debug(f"Semantic scores normalized: min={min_score:.3f}, max={max_score:.3f}")
+        return (scores - min_score) / (max_score - min_score)
+
+    def _keyword_column(self, query: str, documents: List[Document], idf: Optional[Dict[str, float]]) -> np.ndarray:
+        """Max-normalised sparse dot products between the query and each chunk's term vector"""
+        if not documents:
+            return np.zeros(0)
+
+        try:
+            query_vector = query_term_vector(query, idf)
+
+            # Cosine similarity between query and each document (both vectors are L2-normalised)
+            similarities = np.fromiter(
+                (sparse_dot(query_vector, term_vector_from_metadata(doc.metadata, doc.page_content)) for doc in documents),
+                dtype=np.float64, count=len(documents)
+            )
+
+            # Normalize to 0-1 range
+            max_sim = similarities.max()
+            logger.debug(f"Keyword scores computed for {len(documents)} documents")
+            return similarities / max_sim if max_sim > 0 else similarities
+
+        except Exception as e:
+            logger.error(f"Error computing keyword scores: {e}")
+            return np.zeros(len(documents))
+
+    def _quality_column(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Quality score per document: the stored quality_score, computed only for older chunks"""
+        score = columns["quality_score"]
+        if not len(score):
+            return np.zeros(0)
+
+        missing = np.isnan(score)
+        if missing.any():
+            score = np.where(missing, static_quality_scores(columns), score)
+        logger.debug(f"Quality scores computed: avg={score.mean():.3f}")
+        return score
+
+    def _recency_column(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Recency score per document from the extracted timestamp columns"""
+        if not len(columns["file_modified_epoch"]):
+            return np.zeros(0)
+
+        now = datetime.now().timestamp()
+
+        # File modification recency (primary factor): 0.5 within a week, 0.3 a month,
+        # 0.2 three months, 0.1 a year. NaN (missing) timestamps fall in no bucket
+        days_old = np.floor((now - columns["file_modified_epoch"]) / 86400)
+        score = 0.1 * (days_old <= 365) + 0.1 * (days_old <= 90) + 0.1 * (days_old <= 30) + 0.2 * (days_old <= 7)
+
+        # Ingestion recency (secondary factor): 0.2 within 24 hours, 0.1 within a week
+        hours_since_ingestion = (now - columns["ingestion_epoch"]) / 3600
+        score += 0.1 * (hours_since_ingestion <= 24) + 0.1 * (hours_since_ingestion <= 168)
+
+        # Neutral score for documents without timestamp info
+        score[score == 0.0] = 0.3
+
+        logger.debug(f"Recency scores computed: avg={score.mean():.3f}")
+        return score
 
     def compute_combined_scores(self,
                               query: str,
                               documents: List[Document],
-                              similarity_scores: List[float]) -> List[Tuple[Document, float]]:
+                              similarity_scores: List[float],
+                              idf: Optional[Dict[str, float]] = None,
+                              top_k: Optional[int] = None) -> List[Tuple[Document, float]]:
         """
         Compute combined weighted scores for all documents
 
+        Metadata is read into columns once and every component is an array expression,
+        so the cost per candidate stays small for large over-fetch pools.
+
         Args:
             query: User query
             documents: List of retrieved documents
             similarity_scores: Raw similarity scores from vector search
+            idf: Corpus IDF per query term for keyword scoring (optional)
+            top_k: Only return the best top_k documents (None returns all)
 
         Returns:
             List of (document, combined_score) tuples sorted by score (highest first)
@@ -277,34 +420,48 @@ class RAGScoringService:
             return []
 
         logger.info(f"Computing combined scores for {len(documents)} documents")
+        weights = self.weights  # one snapshot for the whole call
+
+        # Optional fifth component; when skipped, the other weights are rescaled for this call
+        rerank_scores = np.zeros(len(documents))
+        if weights.rerank > 0:
+            reranked = self.compute_rerank_scores(query, documents)
+            if reranked is None:
+                weights = weights.without_rerank()
+            else:
+                rerank_scores = np.asarray(reranked, dtype=np.float64)
 
         # Compute individual scores
-        semantic_scores = self.compute_semantic_scores(documents, similarity_scores)
-        keyword_scores = self.compute_keyword_scores(query, documents)
-        quality_scores = self.compute_quality_scores(documents)
-        recency_scores = self.compute_recency_scores(documents)
+        columns = extract_metadata_columns(documents)
+        semantic_scores = self._semantic_column(documents, similarity_scores)
+        keyword_scores = self._keyword_column(query, documents, idf)
+        quality_scores = self._quality_column(columns)
+        recency_scores = self._recency_column(columns)
 
         # Combine scores with weights
-        combined_scores = []
-        for i in range(len(documents)):
-            combined_score = (
-                self.semantic_weight * semantic_scores[i] +
-                self.keyword_weight * keyword_scores[i] +
-                self.quality_weight * quality_scores[i] +
-                self.recency_weight * recency_scores[i]
-            )
-            combined_scores.append((documents[i], combined_score))
-
-            logger.debug(f"Doc {i}: semantic={semantic_scores[i]:.3f}, "
-                        f"keyword={keyword_scores[i]:.3f}, "
-                        f"quality={quality_scores[i]:.3f}, "
-                        f"recency={recency_scores[i]:.3f}, "
-                        f"combined={combined_score:.3f}")
-
-        # Sort by combined score (highest first)
-        combined_scores.sort(key=lambda x: x[1], reverse=True)
+        combined = (
+            weights.semantic * semantic_scores +
+            weights.keyword * keyword_scores +
+            weights.quality * quality_scores +
+            weights.recency * recency_scores +
+            weights.rerank * rerank_scores
+        )
 
-        logger.info(f"Combined scoring complete. Top score: {combined_scores[0][1]:.3f}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i in range(len(documents)):
+                logger.debug(f"Doc {i}: semantic={semantic_scores[i]:.3f}, "
+                            f"keyword={keyword_scores[i]:.3f}, "
+                            f"quality={quality_scores[i]:.3f}, "
+                            f"recency={recency_scores[i]:.3f}, "
+                            f"rerank={rerank_scores[i]:.3f}, "
+                            f"combined={combined[i]:.3f}")
+
+        order = top_k_indices(combined, top_k)
+        scores = combined[order].tolist()
+        combined_scores = [(documents[i], scores[rank]) for rank, i in enumerate(order.tolist())]
+
+        if combined_scores:
+            logger.info(f"Combined scoring complete. Top score: {combined_scores[0][1]:.3f}")
         return combined_scores
 
     def filter_by_threshold(self,
@@ -331,7 +488,8 @@ class RAGScoringService:
                       semantic_weight: float,
                       keyword_weight: float,
                       quality_weight: float,
-                      recency_weight: float):
+                      recency_weight: float,
+                      rerank_weight: Optional[float] = None):
         """
         Update scoring weights (useful for tuning)
 
@@ -340,41 +498,51 @@ class RAGScoringService:
             keyword_weight: Weight for keyword matching
             quality_weight: Weight for document quality
             recency_weight: Weight for recency
+            rerank_weight: Weight for cross-encoder scores (None keeps the current one)
         """
-        total = semantic_weight + keyword_weight + quality_weight + recency_weight
-
-        if abs(total - 1.0) > 0.01:
-            logger.warning(f"Weights sum to {total}, normalizing to 1.0")
-            semantic_weight /= total
-            keyword_weight /= total
-            quality_weight /= total
-            recency_weight /= total
-
-        self.semantic_weight = semantic_weight
-        self.keyword_weight = keyword_weight
-        self.quality_weight = quality_weight
-        self.recency_weight = recency_weight
+        # Single attribute assignment: concurrent calls see either the old or the new weights
+        if rerank_weight is None:
+            rerank_weight = self.weights.rerank
+        self.weights = ScoringWeights(semantic_weight, keyword_weight, quality_weight, recency_weight, rerank_weight).normalized()
 
         logger.info(f"Updated scoring weights: semantic={self.semantic_weight:.2f}, "
                    f"keyword={self.keyword_weight:.2f}, "
                    f"quality={self.quality_weight:.2f}, "
-                   f"recency={self.recency_weight:.2f}")
-
-# Default scoring service instance (will use config values)
-default_scoring_service = RAGScoringService()
+                   f"recency={self.recency_weight:.2f}, "
+                   f"rerank={self.rerank_weight:.2f}")
+
+# Default scoring service (config weights), created on first use
+_default_scoring_service: Optional[RAGScoringService] = None
+_default_scoring_service_lock = threading.Lock()
+
+def get_default_scoring_service() -> RAGScoringService:
+    """Get the shared scoring service, creating it on first use"""
+    global _default_scoring_service
+    if _default_scoring_service is None:
+        with _default_scoring_service_lock:
+            if _default_scoring_service is None:
+                _default_scoring_service = RAGScoringService()
+    return _default_scoring_service
 
 def score_documents(query: str,
                    documents: List[Document],
                    similarity_scores: List[float],
-                   threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+                   threshold: Optional[float] = None,
+                   idf: Optional[Dict[str, float]] = None,
+                   top_k: Optional[int] = None) -> List[Tuple[Document, float]]:
     """
     Convenience function to score documents using default service
 
+    Safe to call from concurrent request threads; nothing is shared between calls
+    except the read-only weights.
+
     Args:
         query: User query
         documents: Retrieved documents
         similarity_scores: Vector search similarity scores
         threshold: Minimum score threshold (None to use config default)
+        idf: Corpus IDF per query term for keyword scoring (optional)
+        top_k: Only keep the best top_k documents (None keeps all)
 
     Returns:
         List of (document, score) tuples above threshold, sorted by score
@@ -383,5 +551,6 @@ def score_documents(query: str,
         config = get_config()
         threshold = config.get('rag_scoring.default_threshold', 0.3)
 
-    scored_docs = default_scoring_service.compute_combined_scores(query, documents, similarity_scores)
-    return default_scoring_service.filter_by_threshold(scored_docs, threshold)
\ No newline at end of file
+    scoring_service = get_default_scoring_service()
+    scored_docs = scoring_service.compute_combined_scores(query, documents, similarity_scores, idf, top_k)
+    return scoring_service.filter_by_threshold(scored_docs, threshold)
\ No newline at end of file
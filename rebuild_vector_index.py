@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Vector Index Rebuild Script
+
+This script applies the HNSW parameters from retrieval.hnsw in the config
+(space, construction_ef, search_ef, M and per-collection overrides) to existing
+ChromaDB collections. search_ef can be changed in place; space, construction_ef
+and M are fixed when the index is built, so those collections are copied into a
+new collection with the stored embeddings (nothing is re-embedded) which then
+replaces the original.
+
+Usage:
+    python rebuild_vector_index.py [--collection <name> | --tenant_id <tenant_id>] [--batch_size <n>] [--force] [--dry_run]
+
+Examples:
+    # Show which collections differ from the configured HNSW parameters
+    python rebuild_vector_index.py --dry_run
+
+    # Rebuild the collection holding tenant "acme_corp"
+    python rebuild_vector_index.py --tenant_id acme_corp
+
+Note:
+    Stop the API/UI while rebuilding and back up first (python backup_vector_db.py).
+    A running API keeps handles to the replaced collection, so it must be restarted
+    after a rebuild.
+    Copies left by an interrupted rebuild (<name>_rebuild, <name>_old) are removed on the
+    next run, unless <name> is missing or empty - then they are kept and reported.
+"""
+
+import argparse
+import sys
+from typing import Dict, Any, List
+import sqlite_fix  # Import before ChromaDB
+
+import services
+from logger_setup import setup_logger
+
+logger = setup_logger()
+
+
+class VectorIndexRebuilder:
+    """Class to bring collection HNSW settings in line with config"""
+
+    def __init__(self, batch_size: int = 500, force: bool = False):
+        self.client = services._get_chroma_client()
+        self.batch_size = batch_size
+        self.force = force
+
+    def plan(self, collection_name: str) -> Dict[str, Any]:
+        """Compare a collection's HNSW settings with config"""
+        settings = services.get_hnsw_settings(collection_name)
+        current = (self.client.get_collection(collection_name).configuration or {}).get("hnsw") or {}
+
+        changes = {}
+        for key, value in settings.items():
+            current_value = current.get(services.HNSW_CONFIG_KEYS[key])
+            if current_value != value:
+                changes[key] = (current_value, value)
+
+        needs_rebuild = self.force or any(key in services.HNSW_BUILD_KEYS for key in changes)
+        return {"settings": settings, "changes": changes, "needs_rebuild": needs_rebuild}
+
+    def apply(self, collection_name: str, plan: Dict[str, Any]) -> bool:
+        """Update search_ef in place or rebuild the collection"""
+        if not plan["needs_rebuild"]:
+            if "search_ef" in plan["changes"]:
+                self.client.get_collection(collection_name).modify(
+                    configuration={"hnsw": {"ef_search": plan["settings"]["search_ef"]}}
+                )
+                logger.info(f"✓ {collection_name}: ef_search updated in place")
+            return True
+        return self.rebuild(collection_name, plan["settings"])
+
+    def _count(self, collection_name: str) -> int:
+        """Documents in a collection, 0 if it doesn't exist"""
+        if collection_name not in [collection.name for collection in self.client.list_collections()]:
+            return 0
+        return self.client.get_collection(collection_name).count()
+
+    def clear_leftovers(self, collection_name: str) -> bool:
+        """
+        Remove copies left by an interrupted rebuild when the collection itself is intact
+
+        Returns:
+            bool: False if the collection is missing or empty while a leftover may hold
+                the only copy of its documents - nothing is deleted then
+        """
+        existing = [collection.name for collection in self.client.list_collections()]
+        leftovers = [name for name in (f"{collection_name}_rebuild", f"{collection_name}_old") if name in existing]
+        if not leftovers:
+            return True
+        if self._count(collection_name) == 0:
+            logger.error(f"✗ {collection_name} is missing or empty but {', '.join(leftovers)} exist from an "
+                         f"interrupted rebuild; restore the data from them (or a backup) before rebuilding")
+            return False
+        for name in leftovers:
+            self.client.delete_collection(name)
+            logger.info(f"{collection_name}: removed leftover collection {name}")
+        return True
+
+    def rebuild(self, collection_name: str, settings: Dict[str, Any]) -> bool:
+        """Copy a collection into a new HNSW index and swap it in under the same name"""
+        if not self.clear_leftovers(collection_name):
+            return False
+        source = self.client.get_collection(collection_name)
+        temp_name = f"{collection_name}_rebuild"
+
+        target = self.client.create_collection(
+            temp_name,
+            configuration=services.hnsw_collection_configuration(settings),
+            metadata=source.metadata
+        )
+
+        total = source.count()
+        offset = 0
+        while offset < total:
+            batch = source.get(
+                include=['embeddings', 'documents', 'metadatas'],
+                limit=self.batch_size,
+                offset=offset
+            )
+            if not batch['ids']:
+                break
+            target.add(
+                ids=batch['ids'],
+                embeddings=batch['embeddings'],
+                documents=batch['documents'],
+                metadatas=batch['metadatas']
+            )
+            offset += len(batch['ids'])
+            logger.info(f"{collection_name}: copied {offset}/{total} documents")
+
+        if target.count() != total:
+            logger.error(f"✗ {collection_name}: rebuilt index has {target.count()} documents, expected {total}")
+            self.client.delete_collection(temp_name)
+            return False
+
+        services.replace_collection(collection_name, temp_name)
+        logger.info(f"✓ {collection_name}: rebuilt with {settings}")
+        return True
+
+
+def resolve_collections(args) -> List[str]:
+    """Collections selected on the command line (default: every collection in use)"""
+    if args.collection:
+        return [args.collection]
+    if args.tenant_id:
+        return [services.get_collection_name(args.tenant_id)]
+    return services.list_collection_names()
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Apply configured HNSW parameters to existing ChromaDB collections",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--collection', help='Collection to rebuild (default: all collections in use)')
+    target_group.add_argument('--tenant_id', help="Rebuild the collection holding this tenant's documents")
+    parser.add_argument('--batch_size', type=int, default=500, help='Documents copied per batch (default: 500)')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if only search_ef differs')
+    parser.add_argument('--dry_run', action='store_true', help='Show differences without changing anything')
+    parser.add_argument('--log_level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                        help='Set the logging level (default: INFO)')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+
+    try:
+        rebuilder = VectorIndexRebuilder(batch_size=args.batch_size, force=args.force)
+        collections = resolve_collections(args)
+        if not collections:
+            logger.warning("No collections found")
+            sys.exit(0)
+
+        failed = []
+        for collection_name in collections:
+            plan = rebuilder.plan(collection_name)
+            if not plan["changes"] and not plan["needs_rebuild"]:
+                logger.info(f"✓ {collection_name}: already matches config")
+                continue
+
+            for key, (current_value, value) in plan["changes"].items():
+                logger.info(f"{collection_name}: {key} {current_value} -> {value}")
+            action = "rebuild" if plan["needs_rebuild"] else "update in place"
+
+            if args.dry_run:
+                logger.info(f"🔍 DRY RUN: {collection_name} would {action}")
+            elif not rebuilder.apply(collection_name, plan):
+                failed.append(collection_name)
+
+        if failed:
+            logger.error(f"❌ Failed: {', '.join(failed)}")
+            sys.exit(1)
+        logger.info("✅ Done")
+        sys.exit(0)
+
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Rebuild interrupted by user - re-run to resume")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ Rebuild failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Two-stage retrieval pipeline
+
+Stage 1 fetches a wide candidate pool from the tenant's collection in a single
+filtered vector query and, when enabled, a BM25 keyword candidate list from the
+tenant's inverted index; the two lists are merged with reciprocal-rank fusion so
+exact-term matches the embedding missed still enter the pool. Stage 2 rescores the whole pool with RAGScoringService
+(semantic, keyword, quality, recency; keyword IDF comes from the BM25 index's
+document frequencies) so a chunk that ranked low semantically can
+still make the cut, then the pool is trimmed to chat.max_retrieval_results.
+With search_type "mmr" the trim step picks a diverse subset instead, using the
+candidates' stored embeddings. Per-stage timings are logged for every query.
+
+run_many() handles decomposed searches (several sub-queries from one LLM turn):
+the sub-queries share one batched embed and one Chroma query, and a chunk found
+by several of them is kept only for the sub-query it is most relevant to, so it
+is scored once and returned once. A sub-query is told its chunk is "already
+included" only if the owning sub-query actually returned it after reranking.
+
+arun() and arun_many() are the async entry points used by the async chat path:
+the CPU-bound work (query embedding, Chroma search, scoring) runs on a dedicated
+thread pool so it never blocks the event loop or competes with the loop's
+default executor.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+
+import services
+from bm25_index import reciprocal_rank_fusion, tokenize
+from rag_scoring import score_documents
+from term_vectors import idf_from_frequencies
+from config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ["similarity", "mmr"]
+
+# Thread pool for retrieval called from async code, created on first use
+_retrieval_executor: Optional[ThreadPoolExecutor] = None
+_retrieval_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Get the thread pool that runs retrieval for async callers (sized by retrieval.executor_workers)"""
+    global _retrieval_executor
+    if _retrieval_executor is None:
+        with _retrieval_executor_lock:
+            if _retrieval_executor is None:
+                workers = get_config().get('retrieval.executor_workers', 4)
+                _retrieval_executor = ThreadPoolExecutor(max_workers=max(int(workers), 1), thread_name_prefix="retrieval")
+    return _retrieval_executor
+
+
+def maximal_marginal_relevance(relevance: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Select a relevant but diverse subset with maximal marginal relevance
+
+    Each step picks the candidate maximising
+    lambda_mult * relevance - (1 - lambda_mult) * max cosine similarity to anything already picked.
+    Pairwise similarities are one matrix product and the running max is updated per
+    step as a vector, so there are no per-pair Python loops.
+
+    Args:
+        relevance: Relevance of each candidate to the query, shape (n,)
+        embeddings: Candidate embeddings, shape (n, dim)
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+
+    Returns:
+        List[int]: Indices of the selected candidates in selection order
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarity = normalized @ normalized.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        mmr_scores[~available] = -np.inf
+        best = int(np.argmax(mmr_scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
+
+
+def dedupe_candidate_pools(pools: List[Tuple[List[Document], List[float], Any]]) -> List[Tuple[List[Document], List[float], Any, int]]:
+    """
+    Keep each chunk only in the candidate pool of the sub-query it is most relevant to
+
+    Args:
+        pools: Per sub-query (documents, semantic relevance scores, embedding matrix or None)
+
+    Returns:
+        List: Per sub-query (documents, scores, embeddings, ids of the chunks left to
+            another sub-query), in the original order; ties go to the earlier sub-query
+    """
+    owner: Dict[str, Tuple[float, int]] = {}
+    for q, (documents, scores, _) in enumerate(pools):
+        for doc, score in zip(documents, scores):
+            if doc.id not in owner or score > owner[doc.id][0]:
+                owner[doc.id] = (score, q)
+
+    deduped = []
+    for q, (documents, scores, embeddings) in enumerate(pools):
+        rows = [i for i, doc in enumerate(documents) if owner[doc.id][1] == q]
+        deduped.append((
+            [documents[i] for i in rows],
+            [scores[i] for i in rows],
+            embeddings[rows] if embeddings is not None else None,
+            [doc.id for doc in documents if owner[doc.id][1] != q]
+        ))
+    return deduped
+
+
+def count_returned_duplicates(handed_off: List[List[str]], selected: List[List[Tuple[Document, float]]]) -> List[int]:
+    """
+    Count, per sub-query, the chunks it left to another sub-query that did return them
+
+    A chunk handed off by dedupe_candidate_pools can still be dropped by its owner's
+    threshold or top-k cut; such chunks are not counted, since no search returned them.
+
+    Args:
+        handed_off: Per sub-query, ids of the chunks left to another sub-query
+        selected: Per sub-query, the (document, score) results after rerank and select
+
+    Returns:
+        List[int]: Per sub-query number of handed-off chunks present in the final results
+    """
+    returned = {doc.id for results in selected for doc, _ in results}
+    return [sum(1 for chunk_id in chunk_ids if chunk_id in returned) for chunk_ids in handed_off]
+
+
+class RetrievalPipeline:
+    """Tenant-scoped over-fetch and rerank retrieval"""
+
+    def __init__(self, tenant_id: str = "default", user_role: str = "customer"):
+        """
+        Initialize the pipeline for one tenant and role
+
+        Args:
+            tenant_id: Tenant whose documents are searched
+            user_role: Role used for RBAC filtering
+        """
+        config = get_config()
+        retrieval_config = config.get_section('retrieval')
+        two_stage_config = retrieval_config.get('two_stage', {})
+
+        # Per-tenant overrides of search_type / mmr settings
+        tenant_config = (retrieval_config.get('tenants') or {}).get(tenant_id) or {}
+
+        self.tenant_id = tenant_id
+        self.user_role = user_role
+        self.search_type = tenant_config.get('search_type', retrieval_config.get('search_type', 'similarity'))
+        if self.search_type not in SEARCH_TYPES:
+            logger.warning(f"Unsupported search_type '{self.search_type}' for tenant {tenant_id}, using 'similarity'")
+            self.search_type = 'similarity'
+        mmr_config = {**retrieval_config.get('mmr', {}), **(tenant_config.get('mmr') or {})}
+        self.mmr_lambda = mmr_config.get('lambda_mult', 0.5)
+        self.two_stage = two_stage_config.get('enabled', True)
+        # Without two-stage mode only retrieval.k chunks are fetched and reordered (legacy behaviour)
+        self.candidate_pool = two_stage_config.get('candidate_pool', 50) if self.two_stage else retrieval_config.get('k', 5)
+        self.max_results = config.get('chat.max_retrieval_results', 8)
+        self.threshold = retrieval_config.get('threshold', 0.2)
+        bm25_config = retrieval_config.get('bm25', {})
+        self.keyword_search = bm25_config.get('enabled', True)
+        self.rrf_k = bm25_config.get('rrf_k', 60)
+
+        self.retriever = services.create_tenant_aware_retriever(
+            tenant_id=tenant_id,
+            user_role=user_role,
+            search_kwargs={"k": self.candidate_pool}
+        )
+
+    def fetch_candidates(self, query: str) -> Tuple[List[Document], List[float], Any]:
+        """Stage 1: one filtered ANN query for the candidate pool (with embeddings for MMR)"""
+        with services.tenant_query_context(self.tenant_id):
+            if self.search_type == "mmr":
+                documents, scores, embeddings, _ = self.retriever.invoke_with_embeddings(query)
+                return documents, scores, embeddings
+            documents, scores = self.retriever.invoke_with_scores(query)
+            return documents, scores, None
+
+    def fuse_keyword_candidates(self, query: str, documents: List[Document], scores: List[float], embeddings: Any) -> Tuple[List[Document], List[float], Any]:
+        """Stage 1b: merge BM25 hits into the dense pool with reciprocal-rank fusion"""
+        keyword_hits = services.get_bm25_index().search(self.tenant_id, query, self.user_role, k=self.candidate_pool)
+        if not keyword_hits:
+            return documents, scores, embeddings
+
+        dense_ids = [doc.id for doc in documents]
+        fused = reciprocal_rank_fusion([dense_ids, [chunk_id for chunk_id, _ in keyword_hits]], k=self.rrf_k)
+        pool_ids = [chunk_id for chunk_id, _ in fused[:self.candidate_pool]]
+        dense_set = set(dense_ids)
+        missing = [chunk_id for chunk_id in pool_ids if chunk_id not in dense_set]
+        if not missing:
+            return documents, scores, embeddings
+
+        with services.tenant_query_context(self.tenant_id):
+            extra_docs, extra_scores, extra_embeddings = self.retriever.fetch_by_ids(query, missing)
+
+        # Rebuild the pool in fused order from dense rows and keyword-only rows
+        rows = {doc.id: ("dense", i) for i, doc in enumerate(documents)}
+        rows.update({doc.id: ("keyword", i) for i, doc in enumerate(extra_docs)})
+        merged_docs, merged_scores, merged_embeddings = [], [], []
+        for chunk_id in pool_ids:
+            if chunk_id not in rows:
+                continue  # in the keyword index but no longer in the vector store
+            source, i = rows[chunk_id]
+            merged_docs.append(documents[i] if source == "dense" else extra_docs[i])
+            merged_scores.append(scores[i] if source == "dense" else extra_scores[i])
+            if embeddings is not None:
+                merged_embeddings.append(embeddings[i] if source == "dense" else extra_embeddings[i])
+
+        merged_embeddings = np.vstack(merged_embeddings) if embeddings is not None and merged_embeddings else embeddings
+        return merged_docs, merged_scores, merged_embeddings
+
+    def rerank(self, query: str, documents: List[Document], similarity_scores: List[float]) -> List[Tuple[Document, float]]:
+        """Stage 2: hybrid rescoring of the pool, thresholded and best first"""
+        try:
+            # MMR needs the whole reranked pool; plain similarity only keeps max_results
+            top_k = None if self.search_type == "mmr" else self.max_results
+            return score_documents(query, documents, similarity_scores, threshold=self.threshold,
+                                   idf=self.query_idf(query), top_k=top_k)
+        except Exception as e:
+            logger.warning(f"RAG scoring failed, keeping vector search order: {e}")
+            return list(zip(documents, similarity_scores))
+
+    def query_idf(self, query: str) -> Optional[Dict[str, float]]:
+        """IDF of the query terms over the tenant's corpus, or None if unavailable"""
+        try:
+            num_docs, frequencies = services.get_bm25_index().document_frequency(self.tenant_id, set(tokenize(query)))
+        except Exception as e:
+            logger.warning(f"Could not read corpus statistics for keyword scoring: {e}")
+            return None
+        return idf_from_frequencies(num_docs, frequencies) if num_docs else None
+
+    def select(self, scored_docs: List[Tuple[Document, float]], documents: List[Document], embeddings: Any) -> List[Tuple[Document, float]]:
+        """Stage 3: cut to max_results, by score or by MMR over the candidate embeddings"""
+        if self.search_type != "mmr" or embeddings is None or len(scored_docs) <= 1:
+            return scored_docs[:self.max_results]
+
+        # Hybrid scores are the relevance term, stored embeddings the diversity term
+        row_of = {id(doc): row for row, doc in enumerate(documents)}
+        rows = [row_of[id(doc)] for doc, _ in scored_docs]
+        relevance = np.array([score for _, score in scored_docs], dtype=np.float32)
+        picked = maximal_marginal_relevance(relevance, embeddings[rows], self.max_results, self.mmr_lambda)
+        return [scored_docs[i] for i in picked]
+
+    def run(self, query: str) -> Dict[str, Any]:
+        """
+        Retrieve and rank documents for a query
+
+        Args:
+            query: Search query
+
+        Returns:
+            Dict[str, Any]: "documents" as (document, score) tuples best first,
+                "candidate_count" and "timings_ms" per stage
+        """
+        start = time.perf_counter()
+        documents, similarity_scores, embeddings = self.fetch_candidates(query)
+        dense_done = time.perf_counter()
+
+        if self.keyword_search:
+            documents, similarity_scores, embeddings = self.fuse_keyword_candidates(query, documents, similarity_scores, embeddings)
+        fetched = time.perf_counter()
+
+        scored_docs = self.rerank(query, documents, similarity_scores) if documents else []
+        reranked = time.perf_counter()
+
+        scored_docs = self.select(scored_docs, documents, embeddings)
+        finished = time.perf_counter()
+
+        timings = {
+            "fetch": (dense_done - start) * 1000,
+            "keyword": (fetched - dense_done) * 1000,
+            "rerank": (reranked - fetched) * 1000,
+            "select": (finished - reranked) * 1000,
+            "total": (finished - start) * 1000
+        }
+        logger.info(f"Retrieval ({self.search_type}) for tenant {self.tenant_id}: {len(documents)} candidates -> "
+                    f"{len(scored_docs)} results (fetch {timings['fetch']:.1f}ms, keyword {timings['keyword']:.1f}ms, rerank {timings['rerank']:.1f}ms, "
+                    f"select {timings['select']:.1f}ms, total {timings['total']:.1f}ms)")
+
+        return {
+            "documents": scored_docs,
+            "candidate_count": len(documents),
+            "timings_ms": timings
+        }
+
+    def run_many(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieve and rank documents for several sub-queries in one batch
+
+        Args:
+            queries: Search queries, e.g. the retriever calls of one LLM turn
+
+        Returns:
+            List[Dict[str, Any]]: One result per query in the shape of run(), plus
+                "duplicates": chunks left to another sub-query that ranked them higher
+                and returned them
+        """
+        if len(queries) <= 1:
+            return [{**self.run(query), "duplicates": 0} for query in queries]
+
+        start = time.perf_counter()
+        with services.tenant_query_context(self.tenant_id):
+            per_query, _ = self.retriever.invoke_many(queries)
+        dense_done = time.perf_counter()
+
+        pools = []
+        for query, (documents, scores, embeddings) in zip(queries, per_query):
+            if self.keyword_search:
+                documents, scores, embeddings = self.fuse_keyword_candidates(query, documents, scores, embeddings)
+            pools.append((documents, scores, embeddings))
+        fetched = time.perf_counter()
+
+        deduped = dedupe_candidate_pools(pools)
+        deduplicated = time.perf_counter()
+
+        results = []
+        for query, (documents, scores, embeddings, _) in zip(queries, deduped):
+            scored_docs = self.rerank(query, documents, scores) if documents else []
+            results.append({
+                "documents": self.select(scored_docs, documents, embeddings),
+                "candidate_count": len(documents)
+            })
+        duplicates = count_returned_duplicates([pool[3] for pool in deduped], [result["documents"] for result in results])
+        for result, count in zip(results, duplicates):
+            result["duplicates"] = count
+        finished = time.perf_counter()
+
+        timings = {
+            "fetch": (dense_done - start) * 1000,
+            "keyword": (fetched - dense_done) * 1000,
+            "dedupe": (deduplicated - fetched) * 1000,
+            "rerank": (finished - deduplicated) * 1000,
+            "total": (finished - start) * 1000
+        }
+        for result in results:
+            result["timings_ms"] = timings
+        logger.info(f"Batched retrieval ({self.search_type}) for tenant {self.tenant_id}: {len(queries)} queries, "
+                    f"{sum(len(pool[0]) for pool in deduped)} unique of {sum(len(pool[0]) for pool in pools)} candidates "
+                    f"(fetch {timings['fetch']:.1f}ms, keyword {timings['keyword']:.1f}ms, dedupe {timings['dedupe']:.1f}ms, "
+                    f"rerank {timings['rerank']:.1f}ms, total {timings['total']:.1f}ms)")
+        return results
+
+    async def arun(self, query: str) -> Dict[str, Any]:
+        """Async run(): retrieves on the retrieval executor without blocking the event loop"""
+        return await self._in_executor(self.run, query)
+
+    async def arun_many(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Async run_many(): retrieves on the retrieval executor without blocking the event loop"""
+        return await self._in_executor(self.run_many, queries)
+
+    @staticmethod
+    async def _in_executor(fn, *args):
+        loop = asyncio.get_running_loop()
+        # Copy the caller's context so context variables (tenant, tracing) carry over to the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(get_retrieval_executor(), lambda: context.run(fn, *args))
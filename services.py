@@ -1,54 +1,577 @@
-
 # Import SQLite3 fix BEFORE any ChromaDB imports
 import sqlite_fix
 
-from langchain_chroma import Chroma
-from sentence_transformers import SentenceTransformer
 from langchain.schema.vectorstore import VectorStoreRetriever
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
 import os
+import re
+import zlib
+import hashlib
 import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import numpy as np
+from embedding_engine import EmbeddingEngine, load_sentence_transformer
+from embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from tenant_doc_counts import TenantDocumentCounter, count_by_tenant
+from bm25_index import BM25Index
+from cross_encoder_rerank import get_reranker
+from agent_pool import get_agent_pool
+from config_loader import get_config
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Load configuration
+config = get_config()
+embedding_config = config.get_section('embedding')
+
+# Tenant that query embeddings are attributed to in query cache metrics
+_query_tenant: ContextVar[Optional[str]] = ContextVar("query_tenant", default=None)
+
+@contextmanager
+def tenant_query_context(tenant_id: str):
+    """Attribute query embeddings made inside this block to tenant_id"""
+    token = _query_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        _query_tenant.reset(token)
+
 class SentenceTransformerEmbeddings:
-    def __init__(self, model_name: str):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str, batch_size: int = 32, sort_by_length: bool = True, cache: Optional[EmbeddingCache] = None, query_cache_size: int = 2048, backend: str = "torch", onnx_file_name: Optional[str] = None):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file_name = onnx_file_name
+        # Backends produce slightly different vectors, so non-torch backends get their own cache namespace
+        self.cache_key = model_name if backend == "torch" else f"{model_name}|{backend}"
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+        self.cache = cache
+        self.query_cache = QueryEmbeddingCache(max_entries=query_cache_size) if query_cache_size > 0 else None
+        # Model weights are loaded on first embed (or by warm_up), not at construction
+        self.model = None
+        self.engine = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.engine is not None
+
+    def load(self) -> "SentenceTransformerEmbeddings":
+        """Load the SentenceTransformer model if it isn't loaded yet"""
+        if self.engine is not None:
+            return self
+        with self._load_lock:
+            if self.engine is None:
+                start = time.perf_counter()
+                try:
+                    model = load_sentence_transformer(self.model_name, self.backend, self.onnx_file_name)
+                except Exception as e:
+                    if self.backend == "torch":
+                        raise
+                    logger.warning(f"Embedding backend '{self.backend}' unavailable, falling back to torch: {e}")
+                    self.backend = "torch"
+                    self.cache_key = self.model_name
+                    model = load_sentence_transformer(self.model_name, "torch")
+                if self.query_cache is not None:
+                    # Case folding in cache keys is only lossless when the tokenizer lowercases anyway
+                    self.query_cache.lowercase = bool(getattr(getattr(model, 'tokenizer', None), 'do_lower_case', False))
+                self.model = model
+                self.engine = EmbeddingEngine(model, batch_size=self.batch_size, sort_by_length=self.sort_by_length)
+                logger.info(f"Loaded embedding model {self.model_name} ({self.backend} backend) in {time.perf_counter() - start:.2f}s")
+        return self
 
-    def embed_documents(self, texts):
-        return self.model.encode(texts).tolist()
+    def embed_documents(self, texts) -> List[List[float]]:
+        # LangChain's Embeddings contract is a list of lists - only for external LangChain callers;
+        # services.add_documents writes embed_documents_array() to Chroma without this copy
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_documents_array(self, texts) -> np.ndarray:
+        """Embed documents into a float32 matrix (one row per text), using the document cache"""
+        if self.cache is None:
+            return self._encode_documents(texts)
+        return self.cache.embed_with_cache(self.cache_key, texts, self._encode_documents)
 
     def embed_query(self, text):
-        return self.model.encode([text])[0].tolist()
+        if self.query_cache is None:
+            return self._encode_query(text)
+        return self.query_cache.get_or_compute(text, self._encode_query, tenant_id=_query_tenant.get())
+
+    def embed_queries(self, texts) -> List[List[float]]:
+        """Embed several queries with one encode call for the ones not in the query cache"""
+        if self.query_cache is None:
+            return self._encode_queries(texts)
+        return self.query_cache.get_or_compute_many(texts, self._encode_queries, tenant_id=_query_tenant.get())
+
+    def _encode_documents(self, texts) -> np.ndarray:
+        return self.load().engine.encode(texts)
+
+    def _encode_query(self, text):
+        return self.load().engine.encode([text])[0].tolist()
 
-embedding_model = SentenceTransformerEmbeddings('sentence-transformers/all-MiniLM-L6-v2')
+    def _encode_queries(self, texts):
+        return self.load().engine.encode(list(texts)).tolist()
+
+def _create_embedding_cache() -> Optional[EmbeddingCache]:
+    """Create the persistent document embedding cache if enabled in config"""
+    cache_config = embedding_config.get('cache', {})
+    if not cache_config.get('enabled', True):
+        return None
+    try:
+        return EmbeddingCache(
+            cache_config.get('path', 'knowledgeBase/embedding_cache.sqlite3'),
+            max_entries=cache_config.get('max_entries', 100000)
+        )
+    except Exception as e:
+        logger.warning(f"Embedding cache unavailable, embedding without cache: {e}")
+        return None
 
 persist_directory = 'knowledgeBase'
-db_collection_name = "general_rentomojo"
+vector_store_config = config.get_section('vector_store')
+db_collection_name = vector_store_config.get('collection_name', "general_rentomojo")
 
-# Create directory if it doesn't exist
-if not os.path.exists(persist_directory):
-    os.makedirs(persist_directory)
+# Collection sharding: "single" (all tenants in db_collection_name), "per_tenant" or "hashed"
+SHARDING_MODES = ["single", "per_tenant", "hashed"]
+sharding_config = vector_store_config.get('sharding', {})
+sharding_mode = sharding_config.get('mode', 'single')
+if sharding_mode not in SHARDING_MODES:
+    logger.warning(f"Unknown vector_store.sharding.mode '{sharding_mode}', using 'single'")
+    sharding_mode = 'single'
 
-vector_store = Chroma(
-    collection_name=db_collection_name,
-    embedding_function=embedding_model,
-    persist_directory=persist_directory
-)
+# Lazily created singletons - nothing heavy is loaded at import time
+_embedding_model: Optional[SentenceTransformerEmbeddings] = None
+_chroma_client = None
+_vector_stores: Dict[str, Any] = {}
+_document_counter: Optional[TenantDocumentCounter] = None
+_bm25_index: Optional[BM25Index] = None
+_init_lock = threading.RLock()
+# Held only while counting chunks, so a slow first reconcile doesn't block opening stores
+_reconcile_lock = threading.Lock()
 
-def create_tenant_aware_retriever(tenant_id: str, user_role: str, search_kwargs: Dict[str, Any] = None) -> VectorStoreRetriever:
+# Background warm-up state
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_error: Optional[str] = None
+_ready = threading.Event()
+
+def get_embedding_model() -> SentenceTransformerEmbeddings:
+    """
+    Get the shared embedding wrapper, creating it on first use
+
+    The wrapper is cheap to create; model weights load on the first embed call
+    or when warm_up() runs.
+
+    Returns:
+        SentenceTransformerEmbeddings: Shared embedding function
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        with _init_lock:
+            if _embedding_model is None:
+                query_cache_config = embedding_config.get('query_cache', {})
+                _embedding_model = SentenceTransformerEmbeddings(
+                    embedding_config.get('model_name', 'sentence-transformers/all-MiniLM-L6-v2'),
+                    batch_size=embedding_config.get('batch_size', 32),
+                    sort_by_length=embedding_config.get('sort_by_length', True),
+                    cache=_create_embedding_cache(),
+                    query_cache_size=query_cache_config.get('max_entries', 2048) if query_cache_config.get('enabled', True) else 0,
+                    backend=embedding_config.get('backend', 'torch'),
+                    onnx_file_name=embedding_config.get('onnx_file_name')
+                )
+    return _embedding_model
+
+def get_collection_name(tenant_id: Optional[str] = None) -> str:
+    """
+    Resolve the Chroma collection that holds a tenant's documents
+
+    Args:
+        tenant_id (str, optional): Tenant to route; None means the default collection
+
+    Returns:
+        str: Collection name for the configured sharding mode
+    """
+    if tenant_id is None or sharding_mode == "single":
+        return db_collection_name
+
+    prefix = sharding_config.get('collection_prefix', db_collection_name)
+    if sharding_mode == "hashed":
+        num_buckets = max(1, int(sharding_config.get('num_buckets', 8)))
+        bucket = zlib.crc32(tenant_id.encode("utf-8")) % num_buckets
+        return f"{prefix}_bucket_{bucket:03d}"
+
+    # Chroma names allow [a-zA-Z0-9._-] and must end alphanumeric; keep rewritten ids unique
+    safe_tenant = re.sub(r"[^a-zA-Z0-9_-]", "_", tenant_id)[:400]
+    if safe_tenant != tenant_id or not safe_tenant[-1:].isalnum():
+        safe_tenant = f"{safe_tenant}-{hashlib.sha1(tenant_id.encode('utf-8')).hexdigest()[:8]}"
+    return f"{prefix}_tenant_{safe_tenant}"
+
+# HNSW settings: config names -> Chroma collection configuration keys
+HNSW_CONFIG_KEYS = {"space": "space", "construction_ef": "ef_construction", "search_ef": "ef_search", "M": "max_neighbors"}
+# Fixed when a collection is created; changing them needs rebuild_vector_index.py
+HNSW_BUILD_KEYS = ["space", "construction_ef", "M"]
+
+def get_hnsw_settings(collection_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get HNSW parameters for a collection (retrieval.hnsw with per-collection overrides)
+
+    Args:
+        collection_name (str, optional): Collection to resolve overrides for
+
+    Returns:
+        Dict[str, Any]: space, construction_ef, search_ef and M
+    """
+    hnsw_config = dict(config.get('retrieval.hnsw', {}) or {})
+    overrides = hnsw_config.pop('collections', None) or {}
+    settings = {key: hnsw_config[key] for key in HNSW_CONFIG_KEYS if hnsw_config.get(key) is not None}
+    settings.update({key: value for key, value in (overrides.get(collection_name) or {}).items()
+                     if key in HNSW_CONFIG_KEYS and value is not None})
+    return settings
+
+def hnsw_collection_configuration(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate HNSW settings into a Chroma collection configuration"""
+    return {"hnsw": {HNSW_CONFIG_KEYS[key]: value for key, value in settings.items()}}
+
+def _apply_hnsw_search_settings(collection) -> None:
+    """Align an existing collection's search-time HNSW settings with config"""
+    settings = get_hnsw_settings(collection.name)
+    current = (collection.configuration or {}).get("hnsw") or {}
+
+    if settings.get("search_ef") is not None and current.get("ef_search") != settings["search_ef"]:
+        collection.modify(configuration={"hnsw": {"ef_search": settings["search_ef"]}})
+        logger.info(f"Set ef_search={settings['search_ef']} on collection {collection.name}")
+
+    stale = [key for key in HNSW_BUILD_KEYS
+             if key in settings and current.get(HNSW_CONFIG_KEYS[key]) not in (None, settings[key])]
+    if stale:
+        logger.warning(f"Collection {collection.name} was built with different HNSW {', '.join(stale)}; "
+                       f"run: python rebuild_vector_index.py --collection {collection.name}")
+
+def _get_chroma_client():
+    """Get the persistent Chroma client shared by every collection"""
+    global _chroma_client
+    if _chroma_client is None:
+        with _init_lock:
+            if _chroma_client is None:
+                import chromadb
+
+                # Create directory if it doesn't exist
+                if not os.path.exists(persist_directory):
+                    os.makedirs(persist_directory)
+
+                _chroma_client = chromadb.PersistentClient(path=persist_directory)
+    return _chroma_client
+
+def get_vector_store(tenant_id: Optional[str] = None):
+    """
+    Get the Chroma vector store for a tenant, opening the collection on first use
+
+    Args:
+        tenant_id (str, optional): Tenant whose shard to open; None means the default collection
+
+    Returns:
+        Chroma: Vector store for the tenant's collection
+    """
+    collection_name = get_collection_name(tenant_id)
+    store = _vector_stores.get(collection_name)
+    if store is None:
+        with _init_lock:
+            store = _vector_stores.get(collection_name)
+            if store is None:
+                from langchain_chroma import Chroma
+
+                # HNSW configuration only takes effect when the collection is created
+                store = Chroma(
+                    client=_get_chroma_client(),
+                    collection_name=collection_name,
+                    embedding_function=get_embedding_model(),
+                    collection_configuration=hnsw_collection_configuration(get_hnsw_settings(collection_name))
+                )
+                _apply_hnsw_search_settings(store._collection)
+                _vector_stores[collection_name] = store
+    return store
+
+def list_collection_names() -> List[str]:
+    """
+    List the collections that hold documents for the configured sharding mode
+
+    Returns:
+        List[str]: Existing collection names; in sharded modes only the shards, not the
+            pre-sharding default collection (see migrate_to_sharded_collections.py)
+    """
+    existing = [collection.name for collection in _get_chroma_client().list_collections()]
+    if sharding_mode == "single":
+        return [db_collection_name] if db_collection_name in existing else []
+
+    prefix = sharding_config.get('collection_prefix', db_collection_name)
+    marker = f"{prefix}_bucket_" if sharding_mode == "hashed" else f"{prefix}_tenant_"
+    return sorted(name for name in existing if name.startswith(marker))
+
+def warm_up() -> None:
+    """Load the embedding model (and cross-encoder, if enabled) and open the vector store, then mark services ready"""
+    global _warmup_error
+    try:
+        start = time.perf_counter()
+        if sharding_mode == "single":
+            get_vector_store()
+        else:
+            # Shards are opened per tenant on first use; only the client is shared
+            _get_chroma_client()
+        get_embedding_model().load()
+        reranker = get_reranker()
+        if reranker is not None:
+            # Loads the cross-encoder and seeds its latency estimate before the first request
+            reranker.warm_up()
+        _warmup_error = None
+        _ready.set()
+        logger.info(f"Services warmed up in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        _warmup_error = str(e)
+        logger.error(f"Service warm-up failed: {e}")
+
+def start_background_warmup() -> threading.Thread:
+    """
+    Start warm_up() in a daemon thread (no-op if already started)
+
+    Returns:
+        threading.Thread: The warm-up thread
+    """
+    global _warmup_thread
+    with _init_lock:
+        if _warmup_thread is None or (not _warmup_thread.is_alive() and not _ready.is_set()):
+            _warmup_thread = threading.Thread(target=warm_up, name="services-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+def is_ready() -> bool:
+    """Return True once the embedding model and vector store are loaded"""
+    if not _ready.is_set() and _chroma_client is not None and _embedding_model is not None and _embedding_model.is_loaded:
+        # Loaded on demand without a warm-up call
+        _ready.set()
+    return _ready.is_set()
+
+def get_readiness() -> Dict[str, Any]:
+    """
+    Get service readiness without triggering any loading
+
+    Returns:
+        Dict[str, Any]: status ("ready", "warming", "cold" or "error") and component flags
+    """
+    if is_ready():
+        status = "ready"
+    elif _warmup_error:
+        status = "error"
+    elif _warmup_thread is not None and _warmup_thread.is_alive():
+        status = "warming"
+    else:
+        status = "cold"
+
+    return {
+        "status": status,
+        "embedding_model_loaded": _embedding_model is not None and _embedding_model.is_loaded,
+        "vector_store_open": _chroma_client is not None,
+        "error_message": _warmup_error
+    }
+
+def __getattr__(name: str):
+    # Backward compatibility for `services.vector_store` (default collection) / `from services import embedding_model`
+    if name == "vector_store":
+        return get_vector_store()
+    if name == "embedding_model":
+        return get_embedding_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class TenantScoredRetriever(VectorStoreRetriever):
+    """Retriever that also returns the vector store's relevance score for each document"""
+
+    def invoke_with_scores(self, query: str) -> Tuple[List[Any], List[float]]:
+        """
+        Run one filtered ANN query and return documents with their relevance scores
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            Tuple[List[Document], List[float]]: Documents and scores in [0, 1], best first
+        """
+        docs_and_scores = self.vectorstore.similarity_search_with_relevance_scores(query, **self.search_kwargs)
+        docs = [doc for doc, _ in docs_and_scores]
+        # Distance-to-relevance conversions can leave [0, 1] slightly for unnormalized vectors
+        scores = [min(max(float(score), 0.0), 1.0) for _, score in docs_and_scores]
+        return docs, scores
+
+    def invoke_with_embeddings(self, query: str) -> Tuple[List[Any], List[float], np.ndarray, np.ndarray]:
+        """
+        Run one filtered ANN query that also returns the candidates' stored embeddings
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            Tuple: documents, relevance scores in [0, 1], candidate embedding matrix
+                (one row per document) and the query embedding
+        """
+        from langchain_core.documents import Document
+
+        store = self.vectorstore
+        query_embedding = np.asarray(store.embeddings.embed_query(query), dtype=np.float32)
+        search_kwargs = dict(self.search_kwargs)
+        results = store._collection.query(
+            query_embeddings=query_embedding[None, :],
+            n_results=search_kwargs.pop("k", 4),
+            where=search_kwargs.pop("filter", None) or None,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+
+        relevance_fn = store._select_relevance_score_fn()
+        docs = [
+            Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(results["ids"][0], results["documents"][0], results["metadatas"][0])
+        ]
+        scores = [min(max(float(relevance_fn(distance)), 0.0), 1.0) for distance in results["distances"][0]]
+        embeddings = np.asarray(results["embeddings"][0], dtype=np.float32).reshape(len(docs), query_embedding.shape[0])
+        return docs, scores, embeddings, query_embedding
+
+    def invoke_many(self, queries: List[str]) -> Tuple[List[Tuple[List[Any], List[float], np.ndarray]], np.ndarray]:
+        """
+        Run several queries with one batched embed and one filtered ANN query
+
+        Used for decomposed searches: the sub-queries are embedded together (cache
+        misses in a single encode call) and sent to Chroma as one query with
+        several query embeddings.
+
+        Args:
+            queries (List[str]): Search queries
+
+        Returns:
+            Tuple: per query (documents, relevance scores in [0, 1], candidate embedding
+                matrix), and the query embedding matrix (one row per query)
+        """
+        from langchain_core.documents import Document
+
+        store = self.vectorstore
+        query_embeddings = np.asarray(store.embeddings.embed_queries(queries), dtype=np.float32)
+        search_kwargs = dict(self.search_kwargs)
+        results = store._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=search_kwargs.pop("k", 4),
+            where=search_kwargs.pop("filter", None) or None,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+
+        relevance_fn = store._select_relevance_score_fn()
+        per_query = []
+        for q in range(len(queries)):
+            docs = [
+                Document(page_content=text, metadata=metadata or {}, id=doc_id)
+                for doc_id, text, metadata in zip(results["ids"][q], results["documents"][q], results["metadatas"][q])
+            ]
+            scores = [min(max(float(relevance_fn(distance)), 0.0), 1.0) for distance in results["distances"][q]]
+            embeddings = np.asarray(results["embeddings"][q], dtype=np.float32).reshape(len(docs), query_embeddings.shape[1])
+            per_query.append((docs, scores, embeddings))
+        return per_query, query_embeddings
+
+    def fetch_by_ids(self, query: str, ids: List[str]) -> Tuple[List[Any], List[float], np.ndarray]:
+        """
+        Load chunks found by another retriever (e.g. keyword search) and score them against the query
+
+        Relevance comes from the stored embeddings with the collection's distance metric,
+        so these scores are comparable with invoke_with_scores(). The retriever's tenant and
+        role filter is applied again, so ids the caller may not see are dropped.
+
+        Args:
+            query (str): Search query
+            ids (List[str]): Chunk ids to load
+
+        Returns:
+            Tuple: documents (in the order of ids, missing or filtered-out ids skipped),
+                relevance scores and embeddings
+        """
+        from langchain_core.documents import Document
+
+        store = self.vectorstore
+        query_embedding = np.asarray(store.embeddings.embed_query(query), dtype=np.float32)
+        if not ids:
+            return [], [], np.zeros((0, query_embedding.shape[0]), dtype=np.float32)
+
+        results = store._collection.get(
+            ids=ids,
+            where=self.search_kwargs.get("filter") or None,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        position = {doc_id: i for i, doc_id in enumerate(results["ids"])}
+        order = [position[doc_id] for doc_id in ids if doc_id in position]
+
+        embeddings = np.asarray(results["embeddings"], dtype=np.float32).reshape(len(results["ids"]), query_embedding.shape[0])[order]
+        space = ((store._collection.configuration or {}).get("hnsw") or {}).get("space", "l2")
+        if space == "cosine":
+            norms = np.maximum(np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding), 1e-12)
+            distances = 1.0 - embeddings @ query_embedding / norms
+        elif space == "ip":
+            distances = 1.0 - embeddings @ query_embedding
+        else:
+            distances = ((embeddings - query_embedding) ** 2).sum(axis=1)
+
+        relevance_fn = store._select_relevance_score_fn()
+        docs = [
+            Document(page_content=results["documents"][i], metadata=results["metadatas"][i] or {}, id=results["ids"][i])
+            for i in order
+        ]
+        scores = [min(max(float(relevance_fn(distance)), 0.0), 1.0) for distance in distances]
+        return docs, scores, embeddings
+
+# Memoized retrievers and compiled filters keyed by tenant context, least recently used first;
+# bounded by retrieval.retriever_cache_size - see invalidate_retriever_cache()
+_retriever_cache: "OrderedDict[tuple, TenantScoredRetriever]" = OrderedDict()
+_filter_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_retriever_cache_lock = threading.Lock()
+
+def _retriever_cache_size() -> int:
+    return max(int(config.get('retrieval.retriever_cache_size', 256)), 1)
+
+def _remember(cache: OrderedDict, key: tuple, value: Any) -> Any:
+    """Store a value in an LRU cache unless another thread stored one first (caller holds _retriever_cache_lock)"""
+    value = cache.setdefault(key, value)
+    cache.move_to_end(key)
+    while len(cache) > _retriever_cache_size():
+        cache.popitem(last=False)
+    return value
+
+def _freeze(value: Any) -> Any:
+    """Turn nested search kwargs into a hashable cache key"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def create_tenant_aware_retriever(tenant_id: str, user_role: str, search_kwargs: Dict[str, Any] = None) -> TenantScoredRetriever:
     """
     Create a tenant-aware retriever with metadata filtering for multi-tenant RBAC
 
+    Retrievers are memoized per (tenant_id, user_role, search_kwargs), so repeated
+    calls for the same context return the same object. replace_collection() and
+    drop_collection() invalidate them via invalidate_retriever_cache().
+
     Args:
         tenant_id (str): Unique identifier for the tenant
         user_role (str): User role for RBAC filtering (customer, vendor, associate, leadership, hr)
         search_kwargs (Dict[str, Any], optional): Additional search parameters
 
     Returns:
-        VectorStoreRetriever: Configured retriever with tenant and role-based filtering
+        TenantScoredRetriever: Configured retriever with tenant and role-based filtering;
+            invoke_with_scores() also returns relevance scores
     """
+    cache_key = (tenant_id, user_role, _freeze(search_kwargs or {}))
+    with _retriever_cache_lock:
+        retriever = _retriever_cache.get(cache_key)
+        if retriever is not None:
+            _retriever_cache.move_to_end(cache_key)
+            return retriever
+
     # Default search parameters
     default_search_kwargs = {
         "k": 4,  # Number of documents to retrieve
@@ -59,20 +582,113 @@ def create_tenant_aware_retriever(tenant_id: str, user_role: str, search_kwargs:
     if search_kwargs:
         default_search_kwargs.update(search_kwargs)
 
-    # Build metadata filter for tenant and role-based access
-    metadata_filter = build_metadata_filter(tenant_id, user_role)
-
-    # Merge tenant filter with any existing filters
-    if "filter" in default_search_kwargs:
-        default_search_kwargs["filter"].update(metadata_filter)
-    else:
-        default_search_kwargs["filter"] = metadata_filter
+    # Merge tenant filter with any existing filters (copied so the caller's dict isn't mutated)
+    default_search_kwargs["filter"] = dict(default_search_kwargs.get("filter") or {})
+    default_search_kwargs["filter"].update(get_compiled_filter(tenant_id, user_role))
 
     logger.info(f"Created tenant-aware retriever for tenant_id: {tenant_id}, user_role: {user_role}")
     logger.debug(f"Retriever filter: {default_search_kwargs['filter']}")
 
-    # Create and return the retriever with tenant-aware filtering
-    return vector_store.as_retriever(search_kwargs=default_search_kwargs)
+    # Create the retriever with tenant-aware filtering and remember it for this context
+    retriever = TenantScoredRetriever(vectorstore=get_vector_store(tenant_id), search_kwargs=default_search_kwargs)
+    with _retriever_cache_lock:
+        return _remember(_retriever_cache, cache_key, retriever)
+
+def get_compiled_filter(tenant_id: str, user_role: str) -> Dict[str, Any]:
+    """
+    Get the memoized ChromaDB filter for a tenant and role
+
+    The returned dict is shared between callers and must be treated as read-only;
+    use build_metadata_filter() for a fresh copy.
+
+    Args:
+        tenant_id (str): Unique identifier for the tenant
+        user_role (str): User role for RBAC filtering
+
+    Returns:
+        Dict[str, Any]: Metadata filter for ChromaDB
+    """
+    cache_key = (tenant_id, user_role)
+    with _retriever_cache_lock:
+        compiled = _filter_cache.get(cache_key)
+        if compiled is not None:
+            _filter_cache.move_to_end(cache_key)
+            return compiled
+    compiled = build_metadata_filter(tenant_id, user_role)
+    with _retriever_cache_lock:
+        return _remember(_filter_cache, cache_key, compiled)
+
+def invalidate_retriever_cache(tenant_id: Optional[str] = None, collection_name: Optional[str] = None) -> int:
+    """
+    Drop memoized retrievers and filters, and the pooled agents holding those retrievers
+
+    Called with collection_name by replace_collection() and drop_collection(): the open
+    vector store for it and every retriever searching it still point at the old
+    collection. Only this process's caches are cleared; other processes (e.g. a
+    running API after rebuild_vector_index.py) must be restarted.
+
+    Args:
+        tenant_id (str, optional): Only drop entries for this tenant
+        collection_name (str, optional): Only drop retrievers searching this collection,
+            and the open vector store for it
+
+    Returns:
+        int: Number of retrievers removed
+    """
+    def matches(key: tuple) -> bool:
+        if tenant_id is not None and key[0] != tenant_id:
+            return False
+        return collection_name is None or get_collection_name(key[0]) == collection_name
+
+    with _retriever_cache_lock:
+        retriever_keys = [key for key in _retriever_cache if matches(key)]
+        for key in retriever_keys:
+            del _retriever_cache[key]
+        if collection_name is None:
+            # Filters don't depend on the collection
+            for key in [key for key in _filter_cache if tenant_id is None or key[0] == tenant_id]:
+                del _filter_cache[key]
+
+    if collection_name is not None:
+        with _init_lock:
+            _vector_stores.pop(collection_name, None)
+
+    # Pooled agents keep their own retriever references, including ones already evicted above
+    pool = get_agent_pool()
+    if collection_name is None:
+        pool.invalidate(tenant_id)
+    else:
+        for pooled_tenant in pool.tenant_ids():
+            if (tenant_id is None or pooled_tenant == tenant_id) and get_collection_name(pooled_tenant) == collection_name:
+                pool.invalidate(pooled_tenant)
+
+    logger.info(f"Invalidated {len(retriever_keys)} cached retrievers for "
+                f"tenant: {tenant_id or 'all'}, collection: {collection_name or 'all'}")
+    return len(retriever_keys)
+
+def replace_collection(collection_name: str, replacement_name: str) -> None:
+    """
+    Swap a fully built collection in under collection_name
+
+    The original is renamed to <collection_name>_old before the replacement takes its
+    name, and only deleted afterwards, so an interrupted swap never leaves the
+    replacement as the only copy under a temporary name.
+
+    Args:
+        collection_name (str): Collection to replace
+        replacement_name (str): Collection holding the new copy of the documents
+    """
+    client = _get_chroma_client()
+    old_name = f"{collection_name}_old"
+    client.get_collection(collection_name).modify(name=old_name)
+    client.get_collection(replacement_name).modify(name=collection_name)
+    client.delete_collection(old_name)
+    invalidate_retriever_cache(collection_name=collection_name)
+
+def drop_collection(collection_name: str) -> None:
+    """Delete a collection and the retrievers, vector store and pooled agents using it"""
+    _get_chroma_client().delete_collection(collection_name)
+    invalidate_retriever_cache(collection_name=collection_name)
 
 def build_metadata_filter(tenant_id: str, user_role: str) -> Dict[str, Any]:
     """
@@ -115,6 +731,218 @@ def build_metadata_filter(tenant_id: str, user_role: str) -> Dict[str, Any]:
     logger.debug(f"Built metadata filter for tenant_id: {tenant_id}, user_role: {user_role}")
     return combined_filter
 
+def get_document_counter() -> TenantDocumentCounter:
+    """Get the persistent per-tenant chunk counter, creating it on first use"""
+    global _document_counter
+    if _document_counter is None:
+        with _init_lock:
+            if _document_counter is None:
+                _document_counter = TenantDocumentCounter(
+                    vector_store_config.get('doc_counts_path', 'knowledgeBase/tenant_doc_counts.sqlite3')
+                )
+    return _document_counter
+
+def reconcile_document_counts(batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Recount chunks per tenant from the vector store and overwrite the counters
+
+    Only metadatas are fetched, in pages, so this is safe to run on large collections.
+
+    Returns:
+        Dict[str, int]: Fresh chunk count per tenant
+    """
+    client = _get_chroma_client()
+
+    def metadata_pages():
+        for name in list_collection_names():
+            collection = client.get_collection(name)
+            offset = 0
+            while True:
+                page = collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+                if not page['ids']:
+                    break
+                yield page['metadatas']
+                offset += len(page['ids'])
+
+    counts = count_by_tenant(metadata_pages())
+    get_document_counter().replace_all(counts)
+    logger.info(f"Reconciled document counts for {len(counts)} tenants")
+    return counts
+
+def get_tenant_document_count(tenant_id: str) -> int:
+    """
+    Get a tenant's chunk count from the counter table
+
+    The first call on a store that was never reconciled (e.g. one ingested before
+    counters existed) recounts once; every later call is a single-row lookup.
+    """
+    counter = get_document_counter()
+    if counter.reconciled_at() is None:
+        with _reconcile_lock:
+            if counter.reconciled_at() is None:
+                reconcile_document_counts()
+    return counter.get(tenant_id)
+
+def get_bm25_index() -> BM25Index:
+    """Get the persisted BM25 keyword index, opening it on first use"""
+    global _bm25_index
+    if _bm25_index is None:
+        with _init_lock:
+            if _bm25_index is None:
+                bm25_config = config.get('retrieval.bm25', {})
+                _bm25_index = BM25Index(
+                    bm25_config.get('path', 'knowledgeBase/bm25_index.sqlite3'),
+                    k1=bm25_config.get('k1', 1.5),
+                    b=bm25_config.get('b', 0.75)
+                )
+    return _bm25_index
+
+def _group_by_tenant(default_tenant: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, tuple]:
+    """Split parallel id/text/metadata lists by the chunk's tenant_id metadata"""
+    groups: Dict[str, tuple] = {}
+    for chunk_id, text, metadata in zip(ids, texts, metadatas):
+        tenant = (metadata or {}).get('tenant_id') or default_tenant
+        group = groups.setdefault(tenant, ([], [], []))
+        group[0].append(chunk_id)
+        group[1].append(text)
+        group[2].append(metadata or {})
+    return groups
+
+def rebuild_bm25_index(tenant_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """
+    Re-index chunks from the vector store into the BM25 index
+
+    Args:
+        tenant_id (str, optional): Only rebuild this tenant (default: all tenants)
+
+    Returns:
+        int: Number of chunks indexed
+    """
+    index = get_bm25_index()
+    index.clear(tenant_id)
+    client = _get_chroma_client()
+    collection_names = [get_collection_name(tenant_id)] if tenant_id else list_collection_names()
+    where = {"tenant_id": tenant_id} if tenant_id else None
+
+    indexed = 0
+    for name in collection_names:
+        collection = client.get_collection(name)
+        offset = 0
+        while True:
+            page = collection.get(include=['documents', 'metadatas'], where=where, limit=batch_size, offset=offset)
+            if not page['ids']:
+                break
+            for tenant, (ids, texts, metadatas) in _group_by_tenant(None, page['ids'], page['documents'], page['metadatas']).items():
+                if tenant:
+                    index.add(tenant, ids, texts, metadatas)
+                    indexed += len(ids)
+            offset += len(page['ids'])
+
+    logger.info(f"Rebuilt BM25 index for {tenant_id or 'all tenants'}: {indexed} chunks")
+    return indexed
+
+# Chunks per Chroma upsert call, below Chroma's maximum batch size
+_WRITE_BATCH_SIZE = 1000
+
+def add_documents(tenant_id: str, documents: List[Any]) -> List[str]:
+    """
+    Add documents to the tenant's collection and update the tenant counters and keyword index
+
+    Args:
+        tenant_id (str): Tenant that owns the documents (selects the shard)
+        documents (List[Document]): Chunks with tenant metadata
+
+    Returns:
+        List[str]: Ids of the stored chunks
+    """
+    if not documents:
+        return []
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+    ids = [getattr(doc, 'id', None) or str(uuid.uuid4()) for doc in documents]
+
+    # The float32 matrix goes straight to Chroma; the LangChain store would route it through
+    # embed_documents() and a list-of-lists copy
+    embeddings = get_embedding_model().embed_documents_array(texts)
+    collection = get_vector_store(tenant_id)._collection
+    for start in range(0, len(ids), _WRITE_BATCH_SIZE):
+        end = start + _WRITE_BATCH_SIZE
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            documents=texts[start:end],
+            # Chroma rejects empty metadata dicts
+            metadatas=[metadata or None for metadata in metadatas[start:end]]
+        )
+
+    get_document_counter().adjust(count_by_tenant([metadatas]))
+    for tenant, (chunk_ids, chunk_texts, chunk_metadatas) in _group_by_tenant(tenant_id, ids, texts, metadatas).items():
+        get_bm25_index().add(tenant, chunk_ids, chunk_texts, chunk_metadatas)
+    return ids
+
+def delete_documents(tenant_id: Optional[str], ids: List[str], collection_name: Optional[str] = None) -> int:
+    """
+    Delete chunks from the tenant's collection and update the tenant counters and keyword index
+
+    Route chunk deletes through here rather than calling vector_store.delete directly,
+    which would leave the counters and keyword index out of step until a reconcile.
+    Counters and postings are adjusted for the tenant_id stored on each deleted chunk.
+
+    Args:
+        tenant_id (str, optional): Tenant that owns the documents (selects the shard)
+        ids (List[str]): Chunk ids to delete
+        collection_name (str, optional): Delete from this collection instead of the
+            tenant's shard (e.g. when moving chunks out of the pre-sharding collection)
+
+    Returns:
+        int: Number of chunks that existed and were deleted
+    """
+    if not ids:
+        return 0
+    if collection_name is not None:
+        collection = _get_chroma_client().get_collection(collection_name)
+    else:
+        collection = get_vector_store(tenant_id)._collection
+    existing = collection.get(ids=ids, include=['metadatas'])
+    if not existing['ids']:
+        return 0
+    collection.delete(ids=existing['ids'])
+    removed = count_by_tenant([existing['metadatas']])
+    get_document_counter().adjust({tenant: -count for tenant, count in removed.items()})
+    texts = [""] * len(existing['ids'])
+    for tenant, (chunk_ids, _, _) in _group_by_tenant(tenant_id, existing['ids'], texts, existing['metadatas']).items():
+        if tenant:
+            get_bm25_index().delete(tenant, chunk_ids)
+    return len(existing['ids'])
+
+def record_metadata_update(old_metadatas: List[Dict[str, Any]], new_metadatas: List[Dict[str, Any]],
+                           ids: Optional[List[str]] = None, texts: Optional[List[str]] = None) -> None:
+    """
+    Move counts between tenants after chunk metadata was rewritten in place
+
+    Pass an empty dict as the old metadata of a chunk whose old copy was already
+    removed through delete_documents() (e.g. moved to another shard).
+
+    Args:
+        old_metadatas (List[Dict]): Metadata before the update
+        new_metadatas (List[Dict]): Metadata after the update, same order
+        ids (List[str], optional): Chunk ids, to re-index tenant/role changes for keyword search
+        texts (List[str], optional): Chunk texts, same order as ids
+    """
+    deltas = count_by_tenant([new_metadatas])
+    for tenant, count in count_by_tenant([old_metadatas]).items():
+        deltas[tenant] = deltas.get(tenant, 0) - count
+    get_document_counter().adjust(deltas)
+
+    if ids is not None and texts is not None:
+        index = get_bm25_index()
+        for tenant, (chunk_ids, _, _) in _group_by_tenant(None, ids, texts, old_metadatas).items():
+            if tenant:
+                index.delete(tenant, chunk_ids)
+        for tenant, (chunk_ids, chunk_texts, chunk_metadatas) in _group_by_tenant(None, ids, texts, new_metadatas).items():
+            if tenant:
+                index.add(tenant, chunk_ids, chunk_texts, chunk_metadatas)
+
 def get_vector_store_status(tenant_id: str = None) -> Dict[str, Any]:
     """
     Get vector store status with optional tenant filtering
@@ -125,27 +953,19 @@ def get_vector_store_status(tenant_id: str = None) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Vector store status information
     """
+    collection_name = get_collection_name(tenant_id)
     try:
-        # Get collection info
-        collection = vector_store._collection
-
         if tenant_id:
-            # Get tenant-specific document count
-            # Note: ChromaDB doesn't have direct count with filter, so we get all tenant documents
-            tenant_filter = {"tenant_id": tenant_id}
             try:
-                results = collection.get(
-                    where=tenant_filter
-                )
-                # Get actual count of tenant documents
-                tenant_doc_count = len(results['ids']) if results['ids'] else 0
+                # Maintained counter - a single-row lookup instead of fetching every tenant record
+                tenant_doc_count = get_tenant_document_count(tenant_id)
                 has_tenant_docs = tenant_doc_count > 0
 
                 # For tenant-specific requests, return tenant document count as main count
                 status = {
                     "status": "ready" if tenant_doc_count > 0 else "not_found",
                     "document_count": tenant_doc_count,
-                    "collection_name": db_collection_name,
+                    "collection_name": collection_name,
                     "tenant_document_count": tenant_doc_count,
                     "has_tenant_documents": has_tenant_docs
                 }
@@ -155,18 +975,22 @@ def get_vector_store_status(tenant_id: str = None) -> Dict[str, Any]:
                 status = {
                     "status": "error",
                     "document_count": 0,
-                    "collection_name": db_collection_name,
+                    "collection_name": collection_name,
                     "tenant_document_count": 0,
                     "has_tenant_documents": False,
                     "error_message": f"Error accessing tenant data: {str(e)}"
                 }
         else:
-            # Get total collection count for general requests
-            total_count = collection.count()
+            # Get total count across all collections for general requests
+            if sharding_mode == "single":
+                total_count = get_vector_store()._collection.count()
+            else:
+                client = _get_chroma_client()
+                total_count = sum(client.get_collection(name).count() for name in list_collection_names())
             status = {
                 "status": "ready" if total_count > 0 else "empty",
                 "document_count": total_count,
-                "collection_name": db_collection_name,
+                "collection_name": collection_name,
                 "tenant_document_count": None,
                 "has_tenant_documents": None
             }
@@ -179,8 +1003,36 @@ def get_vector_store_status(tenant_id: str = None) -> Dict[str, Any]:
         return {
             "status": "error",
             "document_count": 0,
-            "collection_name": db_collection_name,
+            "collection_name": collection_name,
             "error_message": str(e),
             "tenant_document_count": 0,
             "has_tenant_documents": False
         }
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss statistics for the persistent document embedding cache
+
+    Returns:
+        Dict[str, Any]: Cache statistics, or {"enabled": False} if the cache is off
+    """
+    embedding_model = get_embedding_model()
+    if embedding_model.cache is None:
+        return {"enabled": False}
+    stats = embedding_model.cache.get_stats()
+    stats["enabled"] = True
+    return stats
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit-rate statistics for the in-process query embedding cache
+
+    Returns:
+        Dict[str, Any]: Overall and per-tenant counters, or {"enabled": False} if the cache is off
+    """
+    embedding_model = get_embedding_model()
+    if embedding_model.query_cache is None:
+        return {"enabled": False}
+    stats = embedding_model.query_cache.get_stats()
+    stats["enabled"] = True
+    return stats
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Per-tenant document counters
+
+TenantDocumentCounter keeps one row per tenant with the number of chunks stored
+in the vector store, so status calls read a single row instead of fetching every
+matching record from ChromaDB. Counters are adjusted by services on ingest,
+delete (services.delete_documents) and metadata updates; the reconcile command
+recounts from the vector store and repairs any drift.
+
+Usage:
+    python tenant_doc_counts.py [--reconcile]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TenantDocumentCounter:
+    """SQLite table of chunk counts keyed by tenant"""
+
+    def __init__(self, path: str):
+        """
+        Initialize the counter store
+
+        Args:
+            path: SQLite file used to persist the counters
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tenant_counts (
+                tenant_id TEXT PRIMARY KEY,
+                document_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS counter_state (
+                key TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, tenant_id: str) -> int:
+        """Return the stored chunk count for a tenant (0 if unknown)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_count FROM tenant_counts WHERE tenant_id = ?", (tenant_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_all(self) -> Dict[str, int]:
+        """Return every tenant's stored chunk count"""
+        with self._lock:
+            rows = self._conn.execute("SELECT tenant_id, document_count FROM tenant_counts").fetchall()
+        return dict(rows)
+
+    def adjust(self, deltas: Dict[str, int]) -> None:
+        """
+        Add signed deltas to tenant counters in one transaction
+
+        Args:
+            deltas: Change in chunk count per tenant (negative for removals)
+        """
+        rows = [(tenant_id, delta, time.time()) for tenant_id, delta in deltas.items() if tenant_id and delta]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO tenant_counts (tenant_id, document_count, updated_at) VALUES (?, MAX(?, 0), ?)
+                ON CONFLICT(tenant_id) DO UPDATE SET
+                    document_count = MAX(tenant_counts.document_count + ?, 0),
+                    updated_at = excluded.updated_at
+            """, [(tenant_id, delta, updated_at, delta) for tenant_id, delta, updated_at in rows])
+            self._conn.commit()
+
+    def replace_all(self, counts: Dict[str, int]) -> None:
+        """Overwrite all counters with freshly computed values and mark them reconciled"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM tenant_counts")
+            self._conn.executemany(
+                "INSERT INTO tenant_counts (tenant_id, document_count, updated_at) VALUES (?, ?, ?)",
+                [(tenant_id, count, now) for tenant_id, count in counts.items() if count > 0]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO counter_state (key, value) VALUES ('reconciled_at', ?)", (now,)
+            )
+            self._conn.commit()
+
+    def reconciled_at(self) -> Optional[float]:
+        """Return the epoch time of the last reconcile, or None if never reconciled"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counter_state WHERE key = 'reconciled_at'").fetchone()
+        return row[0] if row else None
+
+
+def count_by_tenant(metadata_batches: Iterable[list]) -> Dict[str, int]:
+    """
+    Count chunks per tenant from batches of ChromaDB metadatas
+
+    Args:
+        metadata_batches: Iterable of metadata lists as returned by collection.get()
+
+    Returns:
+        Dict[str, int]: Chunk count per tenant_id (untagged chunks are skipped)
+    """
+    counts: Dict[str, int] = {}
+    for metadatas in metadata_batches:
+        for metadata in metadatas:
+            tenant_id = (metadata or {}).get('tenant_id')
+            if tenant_id:
+                counts[tenant_id] = counts.get(tenant_id, 0) + 1
+    return counts
+
+
+def main():
+    """Print tenant counters, optionally recounting them from the vector store first"""
+    parser = argparse.ArgumentParser(description="Inspect or reconcile per-tenant document counters")
+    parser.add_argument("--reconcile", action="store_true", help="Recount every tenant from the vector store")
+    args = parser.parse_args()
+
+    import services
+
+    if args.reconcile:
+        before = services.get_document_counter().get_all()
+        after = services.reconcile_document_counts()
+        for tenant_id in sorted(set(before) | set(after)):
+            if before.get(tenant_id, 0) != after.get(tenant_id, 0):
+                print(f"fixed {tenant_id}: {before.get(tenant_id, 0)} -> {after.get(tenant_id, 0)}")
+
+    for tenant_id, count in sorted(services.get_document_counter().get_all().items()):
+        print(f"{tenant_id}: {count}")
+
+
+if __name__ == "__main__":
+    main()
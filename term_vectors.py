@@ -0,0 +1,67 @@
+"""
+Sparse term vectors for keyword scoring
+
+Chunks get a log-tf, L2-normalised term vector at ingestion time, stored as JSON in
+the chunk metadata ("term_vector"). At query time the query gets a log-tf x IDF
+vector, with IDF taken from the tenant's corpus statistics in the BM25 index, and
+keyword relevance is a sparse dot product (the lnc.ltc weighting scheme). Because
+IDF only enters on the query side, stored chunk vectors stay valid as the corpus
+grows and nothing has to be fitted per query.
+"""
+
+import json
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+from bm25_index import tokenize
+
+TERM_VECTOR_KEY = "term_vector"
+
+
+def _log_tf_vector(terms: List[str], weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """(1 + log tf) per term, optionally multiplied by a per-term weight, L2-normalised"""
+    vector = {term: (1.0 + math.log(tf)) * (weights.get(term, 1.0) if weights else 1.0)
+              for term, tf in Counter(terms).items()}
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm == 0:
+        return {}
+    return {term: value / norm for term, value in vector.items()}
+
+
+def document_term_vector(text: str) -> Dict[str, float]:
+    """Build the stored term vector for a chunk"""
+    return _log_tf_vector(tokenize(text))
+
+
+def query_term_vector(query: str, idf: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Build the query term vector, weighting terms by IDF when corpus statistics are available"""
+    return _log_tf_vector(tokenize(query), idf)
+
+
+def idf_from_frequencies(num_docs: int, document_frequencies: Dict[str, int]) -> Dict[str, float]:
+    """Smoothed IDF, log((1 + N) / (1 + df)) + 1, as used for TF-IDF weighting"""
+    return {term: math.log((1 + num_docs) / (1 + df)) + 1.0 for term, df in document_frequencies.items()}
+
+
+def serialize_term_vector(vector: Dict[str, float]) -> str:
+    """Encode a term vector for ChromaDB metadata (scalar values only)"""
+    return json.dumps({term: round(value, 4) for term, value in vector.items()}, separators=(",", ":"))
+
+
+def term_vector_from_metadata(metadata: Dict, text: str) -> Dict[str, float]:
+    """Read a chunk's stored term vector, computing it for chunks ingested before vectors existed"""
+    stored = metadata.get(TERM_VECTOR_KEY) if metadata else None
+    if stored:
+        try:
+            return json.loads(stored)
+        except (TypeError, ValueError):
+            pass
+    return document_term_vector(text)
+
+
+def sparse_dot(query_vector: Dict[str, float], document_vector: Dict[str, float]) -> float:
+    """Dot product of two sparse vectors (cosine similarity for normalised inputs)"""
+    if len(query_vector) > len(document_vector):
+        query_vector, document_vector = document_vector, query_vector
+    return sum(value * document_vector.get(term, 0.0) for term, value in query_vector.items())
@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures for the test scripts
+"""
+
+import pytest
+import agent_pool
+
+
+@pytest.fixture
+def pooled_agents(monkeypatch):
+    """
+    Serve agents from a fresh agent pool for one test
+
+    Call the fixture with a builder(tenant_id, user_role); the shared pool and
+    GOOGLE_API_KEY are restored when the test ends.
+    """
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+
+    def install(builder):
+        pool = agent_pool.AgentPool(builder=builder)
+        monkeypatch.setattr(agent_pool, "_agent_pool", pool)
+        return pool
+    return install
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the agent graph built by echo.create_agent
+Drives the real graph through ainvoke with a fake tool-calling chat model and a
+stub retrieval pipeline, so no LLM, vector store or embedding model is needed;
+also checks the tool_end events streamed for each call
+"""
+
+import asyncio
+import sys
+import types
+import pytest
+from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import echo
+from chat_streaming import stream_chat_events
+
+RETRIEVER_CALLS = [
+    {"name": "retriever_tool", "args": {"query": "late fee"}, "id": "call-1"},
+    {"name": "retriever_tool", "args": {"query": "refund window"}, "id": "call-2"},
+    {"name": "no_such_tool", "args": {}, "id": "call-3"},
+]
+
+
+class FakeToolCallingModel(GenericFakeChatModel):
+    """Replays scripted messages; tools are accepted and ignored"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class StubPipeline:
+    """Records async retrieval calls; the sync entry points must not be used by ainvoke"""
+
+    def __init__(self, fail_batch: bool = False, delay: float = 0.0):
+        self.fail_batch = fail_batch
+        self.delay = delay
+        self.batches = []
+        self.single_queries = []
+
+    @staticmethod
+    def _result(query):
+        return {"documents": [(Document(page_content=f"policy for {query}"), 0.9)], "candidate_count": 1, "duplicates": 0}
+
+    async def arun_many(self, queries):
+        self.batches.append(list(queries))
+        await asyncio.sleep(self.delay)
+        if self.fail_batch:
+            raise RuntimeError("vector store unavailable")
+        return [self._result(query) for query in queries]
+
+    async def arun(self, query):
+        self.single_queries.append(query)
+        return self._result(query)
+
+    def run(self, query):
+        raise AssertionError("sync retrieval used on the async path")
+
+    def run_many(self, queries):
+        raise AssertionError("sync retrieval used on the async path")
+
+
+def _run_agent(pipeline, monkeypatch):
+    script = iter([AIMessage(content="", tool_calls=RETRIEVER_CALLS), AIMessage(content="Here is the policy")])
+    monkeypatch.setattr(echo, "init_base_llm", lambda: FakeToolCallingModel(messages=script, disable_streaming=True))
+    agent = echo.create_agent("acme", "customer", pipeline=pipeline)
+    return asyncio.run(agent.ainvoke({"messages": [HumanMessage(content="late fees and refunds?")]}))
+
+
+def test_async_tool_node_batches_retriever_calls(monkeypatch):
+    """Both searches of one turn go to arun_many together; results come back in call order"""
+    pipeline = StubPipeline()
+    result = _run_agent(pipeline, monkeypatch)
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert pipeline.batches == [["late fee", "refund window"]] and pipeline.single_queries == []
+    assert [m.tool_call_id for m in tool_messages] == ["call-1", "call-2", "call-3"]
+    assert "policy for late fee" in tool_messages[0].content
+    assert "policy for refund window" in tool_messages[1].content
+    assert tool_messages[2].content.startswith("Incorrect Tool Name")
+    assert result["messages"][-1].content == "Here is the policy"
+
+
+def test_failed_batch_falls_back_to_single_searches(monkeypatch):
+    """If the batched retrieval raises, each search is retried on its own through the async tool"""
+    pipeline = StubPipeline(fail_batch=True)
+    result = _run_agent(pipeline, monkeypatch)
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert len(pipeline.batches) == 1
+    assert sorted(pipeline.single_queries) == ["late fee", "refund window"]
+    assert "policy for late fee" in tool_messages[0].content
+    assert "policy for refund window" in tool_messages[1].content
+
+
+class FailingJiraTool:
+    def create_ticket(self, *args):
+        raise ConnectionError("Jira is down")
+
+
+def test_tool_end_events_as_each_call_finishes(monkeypatch):
+    """A fast failing Jira call ends (as an error) before the slower batched searches"""
+    monkeypatch.setitem(sys.modules, "jira_tool", types.SimpleNamespace(JiraTool=FailingJiraTool))
+    jira_call = {"name": "create_jira_ticket", "id": "call-4", "args": {
+        "summary": "s", "description": "d", "intent": "complaints", "urgency": "low", "sentiment": "neutral"}}
+    script = iter([AIMessage(content="", tool_calls=RETRIEVER_CALLS + [jira_call]), AIMessage(content="Done")])
+    monkeypatch.setattr(echo, "init_base_llm", lambda: FakeToolCallingModel(messages=script, disable_streaming=True))
+    agent = echo.create_agent("acme", "customer", pipeline=StubPipeline(delay=0.2))
+
+    async def collect():
+        return [event async for event in stream_chat_events(agent, {"messages": [HumanMessage(content="q")]})]
+
+    ends = [event["data"] for event in asyncio.run(collect()) if event["event"] == "tool_end"]
+
+    assert [end["id"] for end in ends] == ["call-3", "call-4", "call-1", "call-2"]
+    statuses = {end["id"]: end["status"] for end in ends}
+    assert statuses == {"call-1": "ok", "call-2": "ok", "call-3": "error", "call-4": "error"}
+    assert "Jira is down" in next(end["error"] for end in ends if end["id"] == "call-4")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled agent pool
+Uses a plain builder function in place of create_agent to check reuse, LRU and
+idle eviction, and that concurrent requests build each agent once
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agent_pool import AgentPool
+
+
+class CountingBuilder:
+    """Builds a (tenant_id, user_role, n) tuple per call and counts calls"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tenant_id, user_role):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            return (tenant_id, user_role, self.calls)
+
+
+def test_reuse_across_interleaved_tenants():
+    """Interleaved tenants reuse their agents instead of rebuilding on every switch"""
+    builder = CountingBuilder()
+    pool = AgentPool(builder=builder, max_agents=8)
+
+    agents = [pool.get(tenant, "customer") for tenant in ["acme", "globex", "acme", "globex", "acme"]]
+
+    assert builder.calls == 2
+    assert agents[0] is agents[2] is agents[4] and agents[1] is agents[3]
+    stats = pool.get_stats()
+    assert stats["hits"] == 3 and stats["misses"] == 2 and stats["builds"] == 2
+
+
+def test_lru_and_idle_eviction():
+    """The least recently used agent goes first; idle agents expire after the TTL"""
+    builder = CountingBuilder()
+    pool = AgentPool(builder=builder, max_agents=2, idle_ttl_seconds=0.2)
+
+    pool.get("a", "customer")
+    pool.get("b", "customer")
+    pool.get("a", "customer")
+    pool.get("c", "customer")          # evicts b
+    assert pool.get_stats()["evicted_lru"] == 1
+    pool.get("a", "customer")
+    assert builder.calls == 3
+
+    time.sleep(0.3)
+    pool.get("a", "customer")          # a and c expired
+    stats = pool.get_stats()
+    assert builder.calls == 4 and stats["evicted_idle"] == 2 and stats["entries"] == 1
+
+
+def test_concurrent_requests_build_once():
+    """Concurrent first requests for one tenant and role share a single build"""
+    builder = CountingBuilder(delay=0.1)
+    pool = AgentPool(builder=builder)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        agents = list(executor.map(lambda _: pool.get("acme", "associate"), range(32)))
+
+    assert builder.calls == 1
+    assert all(agent is agents[0] for agent in agents)
+    stats = pool.get_stats()
+    assert stats["build_ms_max"] >= 100
+    # Requests that waited for the build are hits, not misses
+    assert stats["misses"] == 1 and stats["hits"] == 31
+    assert not pool._build_locks
+
+
+def test_failed_build_is_retried_by_one_waiter():
+    """After a failed build, queued requests still share one lock, so only one of them rebuilds"""
+    builder = CountingBuilder(delay=0.1)
+    failures = []
+
+    def flaky_builder(tenant_id, user_role):
+        agent = builder(tenant_id, user_role)
+        if agent[2] == 1:
+            raise RuntimeError("first build fails")
+        return agent
+
+    pool = AgentPool(builder=flaky_builder)
+
+    def request(_):
+        try:
+            return pool.get("acme", "customer")
+        except RuntimeError as e:
+            failures.append(e)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        agents = [agent for agent in executor.map(request, range(8)) if agent is not None]
+
+    assert builder.calls == 2 and len(failures) == 1
+    assert len(agents) == 7 and all(agent is agents[0] for agent in agents)
+    assert pool.get_stats()["build_failures"] == 1
+    assert not pool._build_locks
+
+
+def test_invalidate():
+    """Invalidated agents are rebuilt on next use"""
+    builder = CountingBuilder()
+    pool = AgentPool(builder=builder)
+    pool.get("acme", "customer")
+    pool.get("acme", "associate")
+    pool.get("globex", "customer")
+
+    assert pool.invalidate(tenant_id="acme") == 2
+    pool.get("acme", "customer")
+    assert builder.calls == 4
+
+
+if __name__ == "__main__":
+    test_reuse_across_interleaved_tenants()
+    test_lru_and_idle_eviction()
+    test_concurrent_requests_build_once()
+    test_failed_build_is_retried_by_one_waiter()
+    test_invalidate()
+    print("All agent pool tests passed")
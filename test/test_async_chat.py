@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the async chat path
+Sends parallel requests to the chat endpoint with an agent whose ainvoke waits
+like a slow LLM call, and checks they finish in about the time of one; also
+checks that a session only serves the tenant it was created for and that
+ending a session doesn't stall other requests
+"""
+
+import asyncio
+import time
+import httpx
+import pytest
+from langchain_core.messages import AIMessage
+
+from api.main import app
+
+LLM_SECONDS = 0.3
+
+
+class SlowAsyncAgent:
+    """Stands in for a compiled agent whose LLM call takes LLM_SECONDS"""
+
+    async def ainvoke(self, state):
+        await asyncio.sleep(LLM_SECONDS)
+        return {"messages": list(state["messages"]) + [AIMessage(content=f"re: {state['messages'][-1].content}")]}
+
+
+async def _post_chats(count: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post("/api/v1/chat-tenant", data={"message": f"question {i}", "tenant_id": f"tenant-{i % 3}"})
+            for i in range(count)
+        ))
+        return responses, time.perf_counter() - start
+
+
+def test_parallel_chats_take_about_one_call(pooled_agents):
+    """Eight parallel chats finish in roughly the time of one slow LLM call"""
+    pooled_agents(lambda tenant_id, user_role: SlowAsyncAgent())
+    responses, elapsed = asyncio.run(_post_chats(8))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sorted(response.json()["response"] for response in responses) == sorted(f"re: question {i}" for i in range(8))
+    assert elapsed < 2 * LLM_SECONDS
+
+
+async def _reuse_session_across_tenants():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post("/api/v1/chat-tenant", data={"message": "acme question", "tenant_id": "acme"})
+        session_id = first.json()["session_id"]
+        other_tenant = await client.post("/api/v1/chat-tenant", data={"message": "peek", "tenant_id": "globex", "session_id": session_id})
+        other_role = await client.post("/api/v1/chat-tenant", data={"message": "peek", "tenant_id": "acme", "user_role": "hr", "session_id": session_id})
+        legacy = await client.post("/api/v1/chat", data={"message": "follow-up", "session_id": session_id})
+        return session_id, other_tenant, other_role, legacy
+
+
+def test_session_is_bound_to_its_tenant(pooled_agents):
+    """Reusing a session id with another tenant or role is rejected; the legacy endpoint uses the session's tenant"""
+    built_for = []
+
+    def builder(tenant_id, user_role):
+        built_for.append(tenant_id)
+        return SlowAsyncAgent()
+
+    pooled_agents(builder)
+    session_id, other_tenant, other_role, legacy = asyncio.run(_reuse_session_across_tenants())
+
+    assert other_tenant.status_code == 403 and other_role.status_code == 403
+    assert legacy.status_code == 200 and legacy.json()["session_id"] == session_id
+    assert set(built_for) == {"acme"}
+
+
+async def _end_session_while_pinging(session_id: str):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        end = asyncio.create_task(client.post("/api/v1/session/end", json={"session_id": session_id}))
+        await asyncio.sleep(0.01)
+        await client.get("/")
+        ping_seconds = time.perf_counter() - start
+        return (await end).status_code, ping_seconds
+
+
+def test_session_end_does_not_block_other_requests(monkeypatch):
+    """Saving a session (a slow summarization call) runs off the event loop"""
+    from api.routes import session
+    from api.dependencies import get_or_create_session
+    monkeypatch.setattr(session, "save_current_chat_session", lambda session_id: time.sleep(LLM_SECONDS))
+    session_id = get_or_create_session()
+
+    status, ping_seconds = asyncio.run(_end_session_while_pinging(session_id))
+
+    assert status == 200
+    assert ping_seconds < LLM_SECONDS / 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
+    print("All async chat tests passed")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the tenant-scoped BM25 keyword index and reciprocal-rank fusion
+"""
+
+import os
+import tempfile
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+PUBLIC = {"document_visibility": "Public"}
+CUSTOMER_ONLY = {"document_visibility": "Private", "access_role_customer": True}
+VENDOR_ONLY = {"document_visibility": "Private", "access_role_vendor": True}
+
+
+def _new_index():
+    return BM25Index(os.path.join(tempfile.mkdtemp(), "bm25.sqlite3"))
+
+
+def test_tokenize_keeps_codes_together():
+    """SKU-like codes stay one token and stop words are dropped"""
+    assert tokenize("What is the fee for RM-1042 on Plan_v2?") == ["fee", "rm-1042", "plan_v2"]
+
+
+def test_exact_term_ranks_first_and_respects_roles():
+    """A rare exact term wins, and chunks the role can't see are never returned"""
+    index = _new_index()
+    index.add("acme", ["c1", "c2", "c3"],
+              ["monthly rent for sofa", "invoice RM-1042 late fee", "RM-1042 vendor pricing sheet"],
+              [PUBLIC, CUSTOMER_ONLY, VENDOR_ONLY])
+
+    customer_hits = [chunk_id for chunk_id, _ in index.search("acme", "RM-1042", "customer")]
+    vendor_hits = [chunk_id for chunk_id, _ in index.search("acme", "RM-1042", "vendor")]
+
+    assert customer_hits == ["c2"]
+    assert vendor_hits == ["c3"]
+
+
+def test_tenants_are_isolated_and_persisted():
+    """Other tenants' chunks never match, and postings survive reopening the index"""
+    path = os.path.join(tempfile.mkdtemp(), "bm25.sqlite3")
+    index = BM25Index(path)
+    index.add("acme", ["a1"], ["deposit refund policy"], [PUBLIC])
+    index.add("globex", ["g1"], ["deposit refund policy"], [PUBLIC])
+
+    reopened = BM25Index(path)
+    assert [chunk_id for chunk_id, _ in reopened.search("acme", "refund", "customer")] == ["a1"]
+
+
+def test_delete_removes_postings():
+    """Deleted chunks drop out of results and document frequencies"""
+    index = _new_index()
+    index.add("acme", ["c1", "c2"], ["refund policy", "refund timeline"], [PUBLIC, PUBLIC])
+    index.delete("acme", ["c1"])
+
+    assert [chunk_id for chunk_id, _ in index.search("acme", "refund", "customer")] == ["c2"]
+    assert index.document_frequency("acme", ["refund", "policy"]) == (1, {"refund": 1, "policy": 0})
+
+
+def test_changes_from_another_process_are_reloaded():
+    """A second index on the same file (e.g. the ingestion CLI) is seen by an already loaded one"""
+    path = os.path.join(tempfile.mkdtemp(), "bm25.sqlite3")
+    api_index = BM25Index(path)
+    api_index.add("acme", ["c1"], ["refund policy"], [PUBLIC])
+    assert [chunk_id for chunk_id, _ in api_index.search("acme", "refund", "customer")] == ["c1"]
+
+    ingestion = BM25Index(path)
+    ingestion.add("acme", ["c2"], ["refund timeline"], [PUBLIC])
+    ingestion.delete("acme", ["c1"])
+    ingestion.add("acme", ["c1"], ["refund policy"], [VENDOR_ONLY])
+
+    assert [chunk_id for chunk_id, _ in api_index.search("acme", "refund", "customer")] == ["c2"]
+
+    # A local write after a remote one must not hide the remote change
+    ingestion.add("acme", ["c3"], ["refund fees"], [PUBLIC])
+    api_index.add("acme", ["c4"], ["refund dates"], [PUBLIC])
+    assert sorted(chunk_id for chunk_id, _ in api_index.search("acme", "refund", "customer")) == ["c2", "c3", "c4"]
+
+
+def test_reciprocal_rank_fusion():
+    """Ids ranked well by both lists beat ids ranked first by only one"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert [item_id for item_id, _ in fused] == ["b", "a", "d", "c"]
+
+
+if __name__ == "__main__":
+    test_tokenize_keeps_codes_together()
+    test_exact_term_ranks_first_and_respects_roles()
+    test_tenants_are_isolated_and_persisted()
+    test_delete_removes_postings()
+    test_changes_from_another_process_are_reloaded()
+    test_reciprocal_rank_fusion()
+    print("All BM25 index tests passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming chat events
+Streams a small LangGraph agent (fake chat model plus a tool node that emits
+tool events) through chat_streaming and through the /api/v1/chat/stream endpoint
+"""
+
+import asyncio
+import json
+from operator import add
+from typing import TypedDict, Annotated, Sequence
+import httpx
+import pytest
+from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, BaseMessage, ToolMessage
+
+import echo_ui
+from chat_streaming import stream_chat_events, dispatch_tool_event, format_sse, TOOL_START_EVENT, TOOL_END_EVENT
+
+ANSWER = "Late fees are waived for the first month"
+
+
+class AgentState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add]
+
+
+def build_agent(tenant_id: str = "default", user_role: str = "customer"):
+    """Search once, then answer: the same shape as the real agent's tool round-trip"""
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=ANSWER)]))
+
+    async def search(state, config):
+        await dispatch_tool_event(TOOL_START_EVENT, {"id": "1", "tool": "retriever_tool", "input": {"query": "late fee"}}, config)
+        await asyncio.sleep(0.01)
+        await dispatch_tool_event(TOOL_END_EVENT, {"id": "1", "tool": "retriever_tool", "status": "ok"}, config)
+        return {"messages": [ToolMessage(tool_call_id="1", content="Document 1: late fee policy")]}
+
+    async def answer(state):
+        return {"messages": [await model.ainvoke(state["messages"])]}
+
+    graph = StateGraph(AgentState)
+    graph.add_node("tool_agent", RunnableLambda(lambda state: state, afunc=search))
+    graph.add_node("llm", RunnableLambda(lambda state: state, afunc=answer))
+    graph.set_entry_point("tool_agent")
+    graph.add_edge("tool_agent", "llm")
+    graph.add_edge("llm", END)
+    return graph.compile()
+
+
+async def _collect(agent):
+    return [event async for event in stream_chat_events(agent, {"messages": [HumanMessage(content="late fee?")]})]
+
+
+def test_event_order_and_final_message():
+    """Tool events come first, then tokens that add up to the final message"""
+    events = asyncio.run(_collect(build_agent()))
+    names = [event["event"] for event in events]
+
+    assert names[:2] == ["tool_start", "tool_end"]
+    assert names[-1] == "message" and set(names[2:-1]) == {"token"}
+    assert "".join(event["data"]["text"] for event in events if event["event"] == "token") == ANSWER
+
+    final = events[-1]["data"]
+    assert final["response"] == ANSWER and final["tool_calls"] == 1
+    assert final["time_to_first_token_ms"] <= final["total_ms"]
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _post_stream():
+    from api.main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/v1/chat/stream", data={"message": "late fee?", "tenant_id": "acme"})
+        return response.status_code, response.headers["content-type"], response.text
+
+
+def test_stream_endpoint(pooled_agents):
+    """The endpoint sends SSE events and stores the exchange in the session"""
+    pooled_agents(build_agent)
+    status, content_type, body = asyncio.run(_post_stream())
+
+    assert status == 200 and content_type.startswith("text/event-stream")
+    events = _parse_sse(body)
+    assert [name for name, _ in events][:2] == ["tool_start", "tool_end"]
+    name, final = events[-1]
+    assert name == "message" and final["response"] == ANSWER and final["tenant_id"] == "acme"
+
+    history = echo_ui.get_current_chat_messages(final["session_id"])
+    assert [message.content for message in history] == ["late fee?", ANSWER]
+    echo_ui.drop_conversation(final["session_id"])
+
+
+def test_format_sse():
+    """Events are rendered as 'event:' and 'data:' lines ending with a blank line"""
+    assert format_sse("token", {"text": "hi"}) == 'event: token\ndata: {"text": "hi"}\n\n'
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
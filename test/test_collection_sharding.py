@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for collection sharding
+Checks how services.get_collection_name routes tenants in each sharding mode
+"""
+
+import re
+import zlib
+import pytest
+import services
+
+# Chroma collection names: 3-512 chars of [a-zA-Z0-9._-], starting and ending alphanumeric
+CHROMA_NAME = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9._-]{1,510}[a-zA-Z0-9]$")
+
+
+@pytest.fixture
+def sharding(monkeypatch):
+    """Switch services to a sharding mode for one test"""
+    def configure(mode, **settings):
+        monkeypatch.setattr(services, "sharding_mode", mode)
+        monkeypatch.setattr(services, "sharding_config", {"mode": mode, "collection_prefix": "kb", **settings})
+    return configure
+
+
+def test_single_mode_uses_default_collection(sharding):
+    """Every tenant shares the configured collection"""
+    sharding("single")
+    assert services.get_collection_name("acme") == services.db_collection_name
+    assert services.get_collection_name(None) == services.db_collection_name
+
+
+def test_per_tenant_names_are_sanitized(sharding):
+    """Tenant ids that are not valid collection names are rewritten into valid ones"""
+    sharding("per_tenant")
+    assert services.get_collection_name("acme") == "kb_tenant_acme"
+    for tenant_id in ["a/b", "acme corp", "tenant_", "ünïcode", "x" * 600]:
+        assert CHROMA_NAME.match(services.get_collection_name(tenant_id)), tenant_id
+
+
+def test_per_tenant_names_are_unique(sharding):
+    """Tenant ids that sanitize to the same text still get their own collections"""
+    sharding("per_tenant")
+    tenant_ids = ["a_b", "a/b", "a b", "a.b", "x" * 500 + "1", "x" * 500 + "2"]
+    names = [services.get_collection_name(tenant_id) for tenant_id in tenant_ids]
+    assert len(set(names)) == len(tenant_ids)
+    assert services.get_collection_name("a/b") == services.get_collection_name("a/b")
+
+
+def test_hashed_buckets_are_stable(sharding):
+    """Buckets come from crc32, so a tenant's shard is the same in every process and release"""
+    sharding("hashed", num_buckets=8)
+    assert services.get_collection_name("acme") == f"kb_bucket_{zlib.crc32(b'acme') % 8:03d}"
+    assert services.get_collection_name("acme") == "kb_bucket_006"
+
+    names = {services.get_collection_name(f"tenant-{i}") for i in range(200)}
+    assert names <= {f"kb_bucket_{bucket:03d}" for bucket in range(8)}
+    assert len(names) == 8
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session conversation state in echo_ui
+Runs process_user_message against a recording agent (built through the agent
+pool) and checks that sessions don't see each other's messages and don't block
+each other, and that idle conversations are dropped
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from langchain_core.messages import AIMessage
+
+import echo_ui
+
+
+class RecordingAgent:
+    """Stands in for a compiled agent: records each prompt and echoes the last message"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def invoke(self, state):
+        time.sleep(self.delay)
+        with self._lock:
+            self.prompts.append([message.content for message in state["messages"]])
+        return {"messages": list(state["messages"]) + [AIMessage(content=f"re: {state['messages'][-1].content}")]}
+
+
+def test_sessions_are_isolated(pooled_agents):
+    """Interleaved sessions only send their own history to the agent"""
+    agent = RecordingAgent()
+    pooled_agents(lambda tenant_id, user_role: agent)
+
+    echo_ui.process_user_message("alpha one", session_id="session-a")
+    echo_ui.process_user_message("beta one", session_id="session-b", tenant_id="globex")
+    echo_ui.process_user_message("alpha two", session_id="session-a")
+    last_prompt = [content for content in agent.prompts[-1] if not content.startswith("Previous chat context")]
+
+    assert last_prompt == ["alpha one", "re: alpha one", "alpha two"]
+    assert [m.content for m in echo_ui.get_current_chat_messages("session-b")] == ["beta one", "re: beta one"]
+
+    echo_ui.clear_chat_session("session-a")
+    assert echo_ui.get_current_chat_messages("session-a") == []
+    echo_ui.drop_conversation("session-a")
+    echo_ui.drop_conversation("session-b")
+
+
+def test_sessions_run_concurrently(pooled_agents):
+    """Requests from different sessions overlap instead of queueing on shared state"""
+    agent = RecordingAgent(delay=0.2)
+    pooled_agents(lambda tenant_id, user_role: agent)
+    sessions = [f"concurrent-{i}" for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda sid: echo_ui.process_user_message(f"hello from {sid}", session_id=sid), sessions))
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.8
+    for sid in sessions:
+        assert [m.content for m in echo_ui.get_current_chat_messages(sid)] == [f"hello from {sid}", f"re: hello from {sid}"]
+        echo_ui.drop_conversation(sid)
+
+
+def test_saved_summary_stays_in_its_session(pooled_agents, monkeypatch, tmp_path):
+    """A saved chat's summary is context for the same session only, never for other sessions"""
+    import chat_mgmt
+    monkeypatch.setattr(chat_mgmt, "CHAT_SUMMARY_FILE", str(tmp_path / "chat_summary.txt"))
+    monkeypatch.setattr(echo_ui, "_summarize_current_chat", lambda messages, old: old + "\nacme refund chat")
+    agent = RecordingAgent()
+    pooled_agents(lambda tenant_id, user_role: agent)
+
+    echo_ui.process_user_message("refund please", session_id="summary-a", tenant_id="acme")
+    echo_ui.save_current_chat_session("summary-a")
+    echo_ui.process_user_message("hello", session_id="summary-b", tenant_id="globex")
+    echo_ui.process_user_message("and now?", session_id="summary-a", tenant_id="acme")
+
+    assert agent.prompts[1] == ["hello"]
+    assert agent.prompts[2] == ["Previous chat context: \nacme refund chat", "and now?"]
+    assert "acme refund chat" in chat_mgmt.load_chat_summary()
+    echo_ui.drop_conversation("summary-a")
+    echo_ui.drop_conversation("summary-b")
+
+
+@pytest.fixture
+def session_limits(monkeypatch):
+    """Set chat.sessions limits for one test and start from no conversations"""
+    monkeypatch.setattr(echo_ui, "_conversations", {})
+
+    def configure(idle_ttl_seconds=86400, max_sessions=1000, cleanup_interval_seconds=600):
+        limits = {"idle_ttl_seconds": idle_ttl_seconds, "max_sessions": max_sessions,
+                  "cleanup_interval_seconds": cleanup_interval_seconds}
+        monkeypatch.setattr(echo_ui, "get_session_limits", lambda: limits)
+    return configure
+
+
+def test_idle_conversations_expire(session_limits):
+    """Conversations idle past the TTL are dropped; active ones stay"""
+    session_limits(idle_ttl_seconds=60)
+    echo_ui.get_conversation("idle")["last_activity"] = datetime.now() - timedelta(seconds=120)
+    echo_ui.get_conversation("active")
+
+    assert echo_ui.expire_conversations() == ["idle"]
+    assert set(echo_ui._conversations) == {"active"}
+
+
+def test_conversation_cap_drops_least_recently_active(session_limits):
+    """Creating a conversation above max_sessions drops the one idle the longest"""
+    session_limits(max_sessions=2)
+    echo_ui.get_conversation("first")
+    echo_ui.get_conversation("second")
+    echo_ui.get_conversation("first")       # used again, so "second" is now the oldest
+    echo_ui.get_conversation("third")
+
+    assert set(echo_ui._conversations) == {"first", "third"}
+
+
+def test_cleanup_old_sessions_drops_api_sessions(session_limits, monkeypatch):
+    """The scheduled cleanup removes idle API sessions together with their conversations"""
+    from api import dependencies
+    session_limits(idle_ttl_seconds=60)
+    monkeypatch.setattr(dependencies, "get_session_limits", echo_ui.get_session_limits)
+    monkeypatch.setattr(dependencies, "_sessions", {})
+
+    stale = dependencies.get_or_create_session()
+    fresh = dependencies.get_or_create_session()
+    echo_ui.get_conversation(stale)
+    echo_ui.get_conversation(fresh)
+    dependencies._sessions[stale]["last_activity"] = datetime.now() - timedelta(seconds=120)
+
+    assert dependencies.cleanup_old_sessions() == 1
+    assert set(dependencies._sessions) == {fresh}
+    assert set(echo_ui._conversations) == {fresh}
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
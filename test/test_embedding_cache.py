@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent document embedding cache and the query embedding LRU
+"""
+
+import os
+import tempfile
+import numpy as np
+from embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+class CountingEncoder:
+    """Encoder that records which texts it was asked to embed"""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(t), 0.5] for t in texts], dtype=np.float32)
+
+
+def _new_cache(max_entries=100):
+    directory = tempfile.mkdtemp()
+    return EmbeddingCache(os.path.join(directory, "cache.sqlite3"), max_entries=max_entries)
+
+
+def test_only_missing_texts_are_encoded():
+    """Second call with overlapping texts only encodes the new one"""
+    cache = _new_cache()
+    encoder = CountingEncoder()
+
+    cache.embed_with_cache("model-a", ["alpha", "beta"], encoder)
+    result = cache.embed_with_cache("model-a", ["beta", "gamma", "alpha"], encoder)
+
+    assert encoder.seen == ["alpha", "beta", "gamma"]
+    assert result.dtype == np.float32
+    assert result[:, 0].tolist() == [4, 5, 5]
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+
+
+def test_keys_are_scoped_by_model():
+    """The same text under a different model name is a miss"""
+    cache = _new_cache()
+    encoder = CountingEncoder()
+
+    cache.embed_with_cache("model-a", ["alpha"], encoder)
+    cache.embed_with_cache("model-b", ["alpha"], encoder)
+
+    assert encoder.seen == ["alpha", "alpha"]
+
+
+def test_duplicate_texts_encoded_once():
+    """Repeated chunks in one call are embedded a single time"""
+    cache = _new_cache()
+    encoder = CountingEncoder()
+
+    result = cache.embed_with_cache("model-a", ["same", "same", "other"], encoder)
+
+    assert encoder.seen == ["same", "other"]
+    assert result.shape == (3, 2)
+
+
+def test_lru_eviction():
+    """Least recently used entries are dropped above the size cap"""
+    cache = _new_cache(max_entries=2)
+    encoder = CountingEncoder()
+
+    cache.embed_with_cache("model-a", ["one"], encoder)
+    cache.embed_with_cache("model-a", ["two"], encoder)
+    cache.embed_with_cache("model-a", ["one"], encoder)  # refresh "one"
+    cache.embed_with_cache("model-a", ["three"], encoder)  # evicts "two"
+
+    encoder.seen.clear()
+    cache.embed_with_cache("model-a", ["one", "two"], encoder)
+
+    assert encoder.seen == ["two"]
+    assert cache.get_stats()["evictions"] >= 1
+
+
+def test_query_cache_normalizes_and_tracks_tenants():
+    """Whitespace/case variants share one entry and hits are counted per tenant"""
+    cache = QueryEmbeddingCache(max_entries=10, lowercase=True)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return [float(len(text))]
+
+    cache.get_or_compute("Sofa  rental fee", compute, tenant_id="acme")
+    cache.get_or_compute(" sofa rental FEE ", compute, tenant_id="acme")
+    cache.get_or_compute("sofa rental fee", compute, tenant_id="globex")
+
+    assert calls == ["sofa rental fee"]
+    stats = cache.get_stats()
+    assert stats["tenants"]["acme"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert stats["tenants"]["globex"]["hits"] == 1
+
+
+def test_query_cache_is_bounded():
+    """Oldest queries are dropped once the cache is full"""
+    cache = QueryEmbeddingCache(max_entries=2)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return [1.0]
+
+    for query in ["a", "b", "a", "c", "b"]:
+        cache.get_or_compute(query, compute)
+
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.get_stats()["entries"] == 2
+
+
+if __name__ == "__main__":
+    test_only_missing_texts_are_encoded()
+    test_keys_are_scoped_by_model()
+    test_duplicate_texts_encoded_once()
+    test_lru_eviction()
+    test_query_cache_normalizes_and_tracks_tenants()
+    test_query_cache_is_bounded()
+    print("All embedding cache tests passed")
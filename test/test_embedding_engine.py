@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the batched embedding engine
+Checks batching, length sorting and output ordering without loading a real model
+"""
+
+import numpy as np
+from embedding_engine import EmbeddingEngine, cosine_drift
+
+
+class FakeModel:
+    """Minimal stand-in for SentenceTransformer that embeds text by its length"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_output_order_and_dtype():
+    """Embeddings come back as float32 in the original input order"""
+    texts = ["a" * n for n in [7, 1, 5, 3, 9, 2]]
+    engine = EmbeddingEngine(FakeModel(), batch_size=2)
+
+    embeddings = engine.encode(texts)
+
+    assert isinstance(embeddings, np.ndarray)
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (6, 2)
+    assert embeddings[:, 0].tolist() == [7, 1, 5, 3, 9, 2]
+
+
+def test_batches_grouped_by_length():
+    """With sorting enabled each batch holds texts of neighbouring lengths"""
+    model = FakeModel()
+    texts = ["a" * n for n in [7, 1, 5, 3, 9, 2]]
+    engine = EmbeddingEngine(model, batch_size=2, sort_by_length=True)
+
+    engine.encode(texts)
+
+    batch_lengths = [[len(t) for t in call] for call in model.calls]
+    assert batch_lengths == [[1, 2], [3, 5], [7, 9]]
+
+
+def test_throughput_stats():
+    """Per-batch counters accumulate across encode calls"""
+    engine = EmbeddingEngine(FakeModel(), batch_size=4)
+    engine.encode(["one", "two", "three", "four", "five"])
+
+    stats = engine.get_stats()
+    assert stats["batches"] == 2
+    assert stats["texts"] == 5
+
+    engine.reset_stats()
+    assert engine.get_stats()["texts"] == 0
+
+
+def test_empty_input():
+    """Empty input returns an empty matrix with the model dimension"""
+    embeddings = EmbeddingEngine(FakeModel()).encode([])
+    assert embeddings.shape == (0, 2)
+
+
+def test_cosine_drift():
+    """Identical vectors have no drift; a rotated row shows up as the worst case"""
+    reference = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+
+    same = cosine_drift(reference, reference * 3)
+    assert abs(same["min_cosine"] - 1.0) < 1e-6
+    assert same["max_drift"] < 1e-6
+
+    rotated = cosine_drift(reference, np.array([[1.0, 0.0], [1.0, 1.0]], dtype=np.float32))
+    assert abs(rotated["min_cosine"] - np.sqrt(0.5)) < 1e-6
+
+
+if __name__ == "__main__":
+    test_output_order_and_dtype()
+    test_batches_grouped_by_length()
+    test_throughput_stats()
+    test_empty_input()
+    test_cosine_drift()
+    print("All embedding engine tests passed")
@@ -7,7 +7,9 @@ Demonstrates how to use the scoring algorithms
 import sys
 from datetime import datetime, timedelta
 from langchain.schema import Document
-from rag_scoring import RAGScoringService, score_documents
+import numpy as np
+from rag_scoring import RAGScoringService, ScoringWeights, score_documents, top_k_indices, compute_quality_score
+from cross_encoder_rerank import CrossEncoderReranker
 
 def create_test_documents():
     """Create sample documents with different metadata for testing"""
@@ -171,13 +173,91 @@ def test_convenience_function():
         filename = doc.metadata.get('filename', 'unknown')
         print(f"  - {filename}: {score:.3f}")
 
+def test_top_k_selection():
+    """top_k returns the head of the full ranking, using argpartition selection"""
+
+    query = "machine learning guide"
+    documents = create_test_documents()
+    similarity_scores = [0.5, 0.9, 0.7]
+    scorer = RAGScoringService()
+
+    full_ranking = scorer.compute_combined_scores(query, documents, similarity_scores)
+    top_two = scorer.compute_combined_scores(query, documents, similarity_scores, top_k=2)
+
+    assert [doc.page_content for doc, _ in top_two] == [doc.page_content for doc, _ in full_ranking[:2]]
+    assert [score for _, score in top_two] == [score for _, score in full_ranking[:2]]
+    # Ties keep input order, as the previous list sort did
+    assert top_k_indices(np.array([0.2, 0.5, 0.5, 0.1]), 2).tolist() == [1, 2]
+    # Ties at the k boundary keep the earliest indices, like a stable full sort
+    tied = np.array([0.5, 0.1, 0.5, 0.9, 0.5, 0.5] * 50)
+    for k in (1, 2, 3, 7, 100):
+        assert top_k_indices(tied, k).tolist() == np.argsort(-tied, kind="stable")[:k].tolist()
+    assert top_k_indices(np.array([0.2, 0.5]), 0).tolist() == []
+
+def test_precomputed_features():
+    """Stored quality_score and epoch fields give the same scores as the raw metadata"""
+
+    documents = create_test_documents()
+    scorer = RAGScoringService()
+
+    precomputed = []
+    for doc in documents:
+        metadata = dict(doc.metadata)
+        metadata["quality_score"] = compute_quality_score(metadata)
+        metadata["ingestion_epoch"] = datetime.fromisoformat(metadata["ingestion_timestamp"]).timestamp()
+        metadata["file_modified_epoch"] = datetime.fromisoformat(metadata["file_modified_timestamp"]).timestamp()
+        precomputed.append(Document(page_content=doc.page_content, metadata=metadata))
+
+    assert scorer.compute_quality_scores(precomputed) == [round(s, 6) for s in scorer.compute_quality_scores(documents)]
+    assert scorer.compute_recency_scores(precomputed) == scorer.compute_recency_scores(documents)
+
+    # The stored score is what gets used, not the raw fields
+    precomputed[0].metadata["quality_score"] = 0.05
+    assert scorer.compute_quality_scores(precomputed)[0] == 0.05
+
+class FixedReranker(CrossEncoderReranker):
+    """Reranker returning preset scores (None simulates a latency-budget skip)"""
+
+    def __init__(self, scores):
+        super().__init__()
+        self.fixed_scores = scores
+
+    def score(self, query, documents):
+        return self.fixed_scores
+
+def test_rerank_component():
+    """Rerank scores act as a fifth weight, and skipping them rescales the other four"""
+
+    query = "machine learning guide"
+    documents = create_test_documents()
+    similarity_scores = [0.9, 0.7, 0.5]
+    base = RAGScoringService(0.4, 0.3, 0.2, 0.1, rerank_weight=0.0)
+    base_scores = [score for _, score in base.compute_combined_scores(query, documents, similarity_scores)]
+
+    # A skipped rerank falls back to exactly the four-component scores
+    skipped = RAGScoringService(0.32, 0.24, 0.16, 0.08, rerank_weight=0.2, reranker=FixedReranker(None))
+    skipped_scores = [score for _, score in skipped.compute_combined_scores(query, documents, similarity_scores)]
+    assert np.allclose(skipped_scores, base_scores)
+
+    # With rerank scores each document gets 0.8 x its four-component score + 0.2 x its rerank score
+    base_by_doc = {id(doc): score for doc, score in base.compute_combined_scores(query, documents, similarity_scores)}
+    reranked = RAGScoringService(0.32, 0.24, 0.16, 0.08, rerank_weight=0.2, reranker=FixedReranker([0.0, 0.0, 1.0]))
+    for doc, score in reranked.compute_combined_scores(query, documents, similarity_scores):
+        rerank_score = 1.0 if doc is documents[2] else 0.0
+        assert np.isclose(score, 0.8 * base_by_doc[id(doc)] + 0.2 * rerank_score)
+
+    assert ScoringWeights(0.4, 0.2, 0.1, 0.1, 0.2).without_rerank() == ScoringWeights(0.5, 0.25, 0.125, 0.125, 0.0)
+
 if __name__ == "__main__":
     try:
         test_scoring_service()
         test_convenience_function()
+        test_top_k_selection()
+        test_precomputed_features()
+        test_rerank_component()
     except ImportError as e:
         print(f"Import error: {e}")
-        print("Please install required dependencies: pip install scikit-learn numpy")
+        print("Please install required dependencies: pip install numpy")
         sys.exit(1)
     except Exception as e:
         print(f"Test failed: {e}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the retrieval pipeline helpers
+Checks MMR selection and multi-query dedupe without a vector store or embedding model
+(run_many is driven through a stub retriever and a similarity-threshold rerank)
+"""
+
+import numpy as np
+from langchain.schema import Document
+from retrieval_pipeline import maximal_marginal_relevance, dedupe_candidate_pools, RetrievalPipeline
+
+
+def test_mmr_skips_near_duplicates():
+    """A duplicate of the best chunk loses to a less relevant but different chunk"""
+    embeddings = np.array([
+        [1.0, 0.0],    # best match
+        [1.0, 0.01],   # near-duplicate of the best match
+        [0.0, 1.0],    # different passage
+    ], dtype=np.float32)
+    relevance = np.array([0.9, 0.88, 0.6], dtype=np.float32)
+
+    assert maximal_marginal_relevance(relevance, embeddings, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_lambda_one_is_relevance_order():
+    """With lambda_mult=1 the selection is plain ranking by relevance"""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(10, 4)).astype(np.float32)
+    relevance = rng.random(10).astype(np.float32)
+
+    selected = maximal_marginal_relevance(relevance, embeddings, k=5, lambda_mult=1.0)
+
+    assert selected == np.argsort(-relevance)[:5].tolist()
+
+
+def test_mmr_bounds():
+    """k larger than the pool returns every candidate once; empty pools return nothing"""
+    embeddings = np.eye(3, dtype=np.float32)
+    selected = maximal_marginal_relevance(np.array([0.1, 0.5, 0.3]), embeddings, k=10)
+
+    assert sorted(selected) == [0, 1, 2]
+    assert maximal_marginal_relevance(np.zeros(0), np.zeros((0, 3)), k=3) == []
+
+
+def test_dedupe_keeps_chunk_for_most_relevant_query():
+    """A chunk found by two sub-queries stays only with the one that scored it higher"""
+    shared, only_a, only_b = (Document(page_content=text, id=text) for text in ("shared", "a", "b"))
+    pools = [
+        ([shared, only_a], [0.6, 0.5], np.eye(2, dtype=np.float32)),
+        ([only_b, shared], [0.9, 0.8], np.eye(2, dtype=np.float32)[::-1]),
+    ]
+
+    (docs_a, scores_a, emb_a, dup_a), (docs_b, scores_b, emb_b, dup_b) = dedupe_candidate_pools(pools)
+
+    assert [doc.id for doc in docs_a] == ["a"] and scores_a == [0.5] and dup_a == ["shared"]
+    assert [doc.id for doc in docs_b] == ["b", "shared"] and scores_b == [0.9, 0.8] and dup_b == []
+    assert emb_a.tolist() == [[0.0, 1.0]]
+    assert emb_b.shape == (2, 2)
+
+
+class StubRetriever:
+    """Returns fixed candidate pools for a batch of sub-queries"""
+
+    def __init__(self, pools):
+        self.pools = pools
+
+    def invoke_many(self, queries):
+        return [self.pools[query] for query in queries], None
+
+
+class ThresholdPipeline(RetrievalPipeline):
+    """RetrievalPipeline without a vector store: rerank keeps candidates at or above a per-query threshold"""
+
+    def __init__(self, pools, thresholds):
+        self.tenant_id, self.user_role = "acme", "customer"
+        self.search_type, self.keyword_search = "similarity", False
+        self.max_results, self.thresholds = 8, thresholds
+        self.retriever = StubRetriever(pools)
+
+    def rerank(self, query, documents, similarity_scores):
+        return [(doc, score) for doc, score in zip(documents, similarity_scores) if score >= self.thresholds[query]]
+
+
+POOLS = {
+    "a": ([Document(page_content="shared", id="shared"), Document(page_content="a", id="a")], [0.3, 0.2], None),
+    "b": ([Document(page_content="shared", id="shared")], [0.5], None),
+}
+
+
+def test_run_many_counts_duplicates_returned_by_owner():
+    """A chunk left to another sub-query counts as a duplicate when that sub-query returns it"""
+    a, b = ThresholdPipeline(POOLS, {"a": 0.25, "b": 0.4}).run_many(["a", "b"])
+
+    assert a["documents"] == [] and a["duplicates"] == 1
+    assert [doc.id for doc, _ in b["documents"]] == ["shared"]
+
+
+def test_run_many_ignores_duplicates_dropped_by_owner():
+    """A handed-off chunk that the owner's rerank drops is not reported as already included"""
+    a, b = ThresholdPipeline(POOLS, {"a": 0.25, "b": 0.6}).run_many(["a", "b"])
+
+    assert a["documents"] == [] and b["documents"] == []
+    assert a["duplicates"] == 0 and a["candidate_count"] == 1
+
+
+if __name__ == "__main__":
+    test_mmr_skips_near_duplicates()
+    test_mmr_lambda_one_is_relevance_order()
+    test_mmr_bounds()
+    test_dedupe_keeps_chunk_for_most_relevant_query()
+    test_run_many_counts_duplicates_returned_by_owner()
+    test_run_many_ignores_duplicates_dropped_by_owner()
+    print("All retrieval pipeline tests passed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for memoized tenant-aware retrievers
+Uses an in-memory Chroma client, so no vector store is written to disk and no
+embedding model is loaded
+"""
+
+import chromadb
+import pytest
+import services
+
+
+@pytest.fixture
+def memory_store(monkeypatch):
+    """Fresh in-memory Chroma client and empty retriever caches"""
+    client = chromadb.EphemeralClient()
+    for collection in client.list_collections():
+        client.delete_collection(collection.name)
+    monkeypatch.setattr(services, "_chroma_client", client)
+    monkeypatch.setattr(services, "_vector_stores", {})
+    # Never loaded here; created without the on-disk embedding cache
+    monkeypatch.setattr(services, "_embedding_model", services.SentenceTransformerEmbeddings("unused", cache=None))
+    services.invalidate_retriever_cache()
+    yield client
+    services.invalidate_retriever_cache()
+
+
+def test_retrievers_are_memoized_per_context(memory_store):
+    """Same tenant, role and search settings share one retriever; any difference gets its own"""
+    first = services.create_tenant_aware_retriever("acme", "customer", {"k": 10})
+    assert services.create_tenant_aware_retriever("acme", "customer", {"k": 10}) is first
+    assert services.create_tenant_aware_retriever("acme", "customer", {"k": 20}) is not first
+    assert services.create_tenant_aware_retriever("acme", "associate", {"k": 10}) is not first
+    assert services.get_compiled_filter("acme", "customer") is services.get_compiled_filter("acme", "customer")
+
+
+def test_invalidate_by_tenant_and_collection(memory_store):
+    """Invalidation drops only the matching retrievers; a replaced collection's store is reopened"""
+    acme = services.create_tenant_aware_retriever("acme", "customer")
+    globex = services.create_tenant_aware_retriever("globex", "customer")
+
+    assert services.invalidate_retriever_cache(tenant_id="acme") == 1
+    assert services.create_tenant_aware_retriever("acme", "customer") is not acme
+    assert services.create_tenant_aware_retriever("globex", "customer") is globex
+
+    collection_name = services.get_collection_name("globex")
+    store = services.get_vector_store("globex")
+    services.invalidate_retriever_cache(collection_name=collection_name)
+    assert services.create_tenant_aware_retriever("globex", "customer") is not globex
+    assert services.get_vector_store("globex") is not store
+
+
+def test_dropping_a_collection_rebuilds_retrievers_and_pooled_agents(memory_store, pooled_agents):
+    """drop_collection reaches pooled agents too, which hold retrievers of their own"""
+    pool = pooled_agents(lambda tenant_id, user_role: object())
+    agent = pool.get("acme", "customer")
+    retriever = services.create_tenant_aware_retriever("acme", "customer")
+
+    services.drop_collection(services.get_collection_name("acme"))
+
+    assert services.create_tenant_aware_retriever("acme", "customer") is not retriever
+    assert pool.get("acme", "customer") is not agent
+
+
+def test_cache_is_bounded(memory_store, monkeypatch):
+    """The least recently used retriever is dropped once the cache is full"""
+    monkeypatch.setattr(services, "_retriever_cache_size", lambda: 2)
+    first = services.create_tenant_aware_retriever("a", "customer")
+    services.create_tenant_aware_retriever("b", "customer")
+    services.create_tenant_aware_retriever("a", "customer")
+    services.create_tenant_aware_retriever("c", "customer")     # evicts b
+
+    assert len(services._retriever_cache) == 2
+    assert services.create_tenant_aware_retriever("a", "customer") is first
+
+
+def test_fetch_by_ids_applies_tenant_and_role_filter(memory_store, monkeypatch):
+    """Keyword hits are access-checked again, so internal or foreign chunks never come back"""
+    retriever = services.create_tenant_aware_retriever("acme", "customer")
+    monkeypatch.setattr(retriever.vectorstore.embeddings, "embed_query", lambda text: [1.0, 0.0])
+    retriever.vectorstore._collection.add(
+        ids=["public", "internal", "foreign"],
+        embeddings=[[1.0, 0.0], [1.0, 0.0], [1.0, 0.0]],
+        documents=["refund policy", "refund escalation notes", "refund policy"],
+        metadatas=[
+            {"tenant_id": "acme", "document_visibility": "Public"},
+            {"tenant_id": "acme", "document_visibility": "Private", "access_role_associate": True},
+            {"tenant_id": "globex", "document_visibility": "Public"},
+        ]
+    )
+
+    docs, scores, embeddings = retriever.fetch_by_ids("refund", ["internal", "public", "foreign", "missing"])
+
+    assert [doc.id for doc in docs] == ["public"]
+    assert len(scores) == 1 and embeddings.shape == (1, 2)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
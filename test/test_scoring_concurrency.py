@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent RAG scoring
+Runs hundreds of score_documents calls from a thread pool and checks every result
+against the same calls run serially
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from langchain.schema import Document
+from rag_scoring import RAGScoringService, ScoringWeights, score_documents
+
+WORDS = ("refund policy late fee sofa rent deposit delivery invoice RM-1042 "
+         "damage waiver tenure upgrade relocation maintenance").split()
+
+
+def _make_requests(count: int, seed: int = 7):
+    """Queries with their own candidate pools, like independent chat requests"""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        pool_size = rng.randint(5, 50)
+        documents = [
+            Document(
+                page_content=" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))),
+                metadata={
+                    "document_type": rng.choice(["formatted_document", "structured_text", "plain_text"]),
+                    "content_density": rng.random() * 0.3,
+                    "chunk_position_ratio": rng.random(),
+                    "word_count": rng.randint(10, 2500),
+                    "is_first_chunk": rng.random() < 0.3,
+                    "ingestion_timestamp": (datetime.now() - timedelta(hours=rng.randint(1, 500))).isoformat(),
+                    "file_modified_timestamp": (datetime.now() - timedelta(days=rng.randint(1, 400))).isoformat()
+                }
+            )
+            for _ in range(pool_size)
+        ]
+        query = " ".join(rng.sample(WORDS, 3))
+        scores = [rng.random() for _ in documents]
+        top_k = rng.choice([None, 3, 8])
+        requests.append((query, documents, scores, top_k))
+    return requests
+
+
+def _run(request):
+    query, documents, scores, top_k = request
+    results = score_documents(query, documents, scores, threshold=0.0, top_k=top_k)
+    return [(id(doc), score) for doc, score in results]
+
+
+def test_concurrent_matches_serial():
+    """Concurrent score_documents calls return exactly what serial calls return"""
+    requests = _make_requests(400)
+    serial = [_run(request) for request in requests]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        concurrent = list(executor.map(_run, requests))
+
+    assert concurrent == serial
+
+
+def test_weight_updates_are_atomic():
+    """A call racing update_weights uses either the old or the new weights, never a mix"""
+    scorer = RAGScoringService(0.4, 0.3, 0.2, 0.1)
+    query, documents, scores, _ = _make_requests(1, seed=3)[0]
+    old_weights, new_weights = ScoringWeights(0.4, 0.3, 0.2, 0.1), ScoringWeights(0.1, 0.2, 0.3, 0.4)
+
+    def expected(weights):
+        scorer.weights = weights
+        return scorer.compute_combined_scores(query, documents, scores)
+
+    allowed = [[score for _, score in expected(old_weights)], [score for _, score in expected(new_weights)]]
+
+    def score_once(i):
+        if i % 10 == 0:
+            scorer.update_weights(*(new_weights if i % 20 == 0 else old_weights))
+        return [score for _, score in scorer.compute_combined_scores(query, documents, scores)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(score_once, range(200)))
+
+    assert all(result in allowed for result in results)
+
+
+if __name__ == "__main__":
+    test_concurrent_matches_serial()
+    test_weight_updates_are_atomic()
+    print("All scoring concurrency tests passed")
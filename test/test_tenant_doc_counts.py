@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-tenant document counters used by status endpoints
+The services tests use an in-memory Chroma client and a fake embedding engine
+"""
+
+import os
+import tempfile
+import chromadb
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+import services
+from bm25_index import BM25Index
+from tenant_doc_counts import TenantDocumentCounter, count_by_tenant
+
+
+def _new_counter():
+    return TenantDocumentCounter(os.path.join(tempfile.mkdtemp(), "counts.sqlite3"))
+
+
+def test_adjust_accumulates_and_never_goes_negative():
+    """Ingest and delete deltas add up per tenant and are clamped at zero"""
+    counter = _new_counter()
+
+    counter.adjust({"acme": 5, "globex": 2})
+    counter.adjust({"acme": -2})
+    counter.adjust({"globex": -10})
+
+    assert counter.get("acme") == 3
+    assert counter.get("globex") == 0
+    assert counter.get("unknown") == 0
+
+
+def test_replace_all_marks_reconciled():
+    """Reconcile overwrites drifted counters and records when it ran"""
+    counter = _new_counter()
+    counter.adjust({"acme": 7, "stale": 1})
+    assert counter.reconciled_at() is None
+
+    counter.replace_all({"acme": 4, "globex": 1})
+
+    assert counter.get_all() == {"acme": 4, "globex": 1}
+    assert counter.reconciled_at() is not None
+
+
+def test_count_by_tenant_skips_untagged_chunks():
+    """Chunks without tenant metadata are not attributed to any tenant"""
+    pages = [
+        [{"tenant_id": "acme"}, {"tenant_id": "globex"}, {}],
+        [{"tenant_id": "acme"}, None],
+    ]
+    assert count_by_tenant(pages) == {"acme": 2, "globex": 1}
+
+
+class _FakeEngine:
+    """Stands in for EmbeddingEngine: every text gets the same unit vector"""
+
+    def encode(self, texts):
+        return np.tile(np.array([1.0, 0.0, 0.0], dtype=np.float32), (len(texts), 1))
+
+
+@pytest.fixture
+def memory_services(monkeypatch):
+    """services backed by an in-memory Chroma client, temporary counters and keyword index"""
+    client = chromadb.EphemeralClient()
+    for collection in client.list_collections():
+        client.delete_collection(collection.name)
+    embedding_model = services.SentenceTransformerEmbeddings("unused", cache=None, query_cache_size=0)
+    embedding_model.engine = _FakeEngine()
+    directory = tempfile.mkdtemp()
+    monkeypatch.setattr(services, "_chroma_client", client)
+    monkeypatch.setattr(services, "_vector_stores", {})
+    monkeypatch.setattr(services, "_embedding_model", embedding_model)
+    monkeypatch.setattr(services, "_document_counter", TenantDocumentCounter(os.path.join(directory, "counts.sqlite3")))
+    monkeypatch.setattr(services, "_bm25_index", BM25Index(os.path.join(directory, "bm25.sqlite3")))
+    return services
+
+
+def test_ingest_delete_then_reconcile_leaves_counters_unchanged(memory_services):
+    """Counters maintained by add_documents and delete_documents match a full recount"""
+    ids = memory_services.add_documents("acme", [
+        Document(page_content=f"refund policy part {i}", metadata={"tenant_id": "acme", "document_visibility": "Public"})
+        for i in range(4)
+    ])
+    memory_services.add_documents("globex", [
+        Document(page_content="deposit rules", metadata={"tenant_id": "globex", "document_visibility": "Public"})
+    ])
+
+    assert memory_services.delete_documents("acme", ids[:3] + ["unknown"]) == 3
+    counter = memory_services.get_document_counter()
+    maintained = counter.get_all()
+
+    assert maintained == {"acme": 1, "globex": 1}
+    assert memory_services.reconcile_document_counts() == maintained
+    assert counter.get_all() == maintained
+    assert [chunk_id for chunk_id, _ in memory_services.get_bm25_index().search("acme", "refund", "customer")] == ids[3:]
+
+
+if __name__ == "__main__":
+    test_adjust_accumulates_and_never_goes_negative()
+    test_replace_all_marks_reconciled()
+    test_count_by_tenant_skips_untagged_chunks()
+    print("All tenant document counter tests passed")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for ingest-time term vectors and keyword scoring
+"""
+
+import math
+from langchain.schema import Document
+from term_vectors import (
+    TERM_VECTOR_KEY, document_term_vector, query_term_vector, idf_from_frequencies,
+    serialize_term_vector, term_vector_from_metadata, sparse_dot
+)
+from rag_scoring import RAGScoringService
+
+
+def test_vectors_are_normalised_and_roundtrip():
+    """Stored vectors are unit length and survive metadata serialisation"""
+    vector = document_term_vector("refund refund policy for deposits")
+    assert math.isclose(sum(v * v for v in vector.values()), 1.0, rel_tol=1e-6)
+
+    stored = term_vector_from_metadata({TERM_VECTOR_KEY: serialize_term_vector(vector)}, "")
+    assert stored.keys() == vector.keys()
+    assert all(abs(stored[t] - vector[t]) < 1e-4 for t in vector)
+
+
+def test_idf_favours_rare_terms():
+    """A rare query term outweighs a common one"""
+    idf = idf_from_frequencies(100, {"rent": 90, "rm-1042": 1})
+    query = query_term_vector("rent RM-1042", idf)
+
+    common = sparse_dot(query, document_term_vector("monthly rent"))
+    rare = sparse_dot(query, document_term_vector("invoice RM-1042"))
+    assert rare > common
+
+
+def test_keyword_scores_use_stored_vectors_and_fallback():
+    """Chunks with a stored vector and legacy chunks without one score the same way"""
+    text = "late fee charged after the due date"
+    with_vector = Document(page_content=text, metadata={TERM_VECTOR_KEY: serialize_term_vector(document_term_vector(text))})
+    legacy = Document(page_content=text, metadata={})
+    unrelated = Document(page_content="sofa delivery schedule", metadata={})
+
+    scores = RAGScoringService().compute_keyword_scores("late fee", [with_vector, legacy, unrelated])
+
+    assert math.isclose(scores[0], 1.0, rel_tol=1e-3)
+    assert math.isclose(scores[1], 1.0, rel_tol=1e-3)
+    assert scores[2] == 0.0
+
+
+if __name__ == "__main__":
+    test_vectors_are_normalised_and_roundtrip()
+    test_idf_favours_rare_terms()
+    test_keyword_scores_use_stored_vectors_and_fallback()
+    print("All term vector tests passed")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent tool execution
+Checks ordering, overlap, per-tool timeouts (counted from when a call starts)
+and error capture with plain callables
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from tool_runner import ToolCallRunner
+
+request_tenant: ContextVar[str] = ContextVar("request_tenant", default="none")
+
+
+def _sleep_then(value, seconds):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+
+def test_calls_overlap_and_keep_order():
+    """Three 0.3s calls overlap (run one after another they'd take 0.9s) and come back in call order"""
+    runner = ToolCallRunner(max_workers=4)
+    start = time.perf_counter()
+    outcomes = runner.run([("search", _sleep_then(i, 0.3 - 0.05 * i)) for i in range(3)])
+    elapsed = time.perf_counter() - start
+
+    assert [outcome.value for outcome in outcomes] == [0, 1, 2]
+    assert elapsed < 0.6
+
+
+def test_per_tool_timeout_and_errors():
+    """A slow tool times out on its own budget; failures don't affect other calls"""
+    runner = ToolCallRunner(max_workers=4, default_timeout=5, timeouts={"slow_tool": 0.1})
+
+    def fail():
+        raise ValueError("jira unavailable")
+
+    slow, failed, fast = runner.run([
+        ("slow_tool", _sleep_then("late", 0.5)),
+        ("create_jira_ticket", fail),
+        ("search", _sleep_then("ok", 0.01)),
+    ])
+
+    assert slow.timed_out and slow.value is None
+    assert failed.error == "jira unavailable" and not failed.timed_out
+    assert fast.value == "ok" and fast.error is None
+
+
+def test_deadline_starts_when_call_runs():
+    """Calls queued behind the request's other calls get their full timeout once they start"""
+    runner = ToolCallRunner(max_workers=1, timeouts={"search": 0.3})
+
+    outcomes = runner.run([("search", _sleep_then(i, 0.15)) for i in range(3)])
+
+    assert [outcome.value for outcome in outcomes] == [0, 1, 2]
+    assert not any(outcome.timed_out for outcome in outcomes)
+
+
+def test_hung_call_does_not_starve_next_request():
+    """A call left running after its timeout doesn't hold a worker the next request needs"""
+    runner = ToolCallRunner(max_workers=1, timeouts={"slow_tool": 0.05, "search": 0.2})
+
+    (slow,) = runner.run([("slow_tool", _sleep_then("late", 0.5))])
+    (fast,) = runner.run([("search", _sleep_then("ok", 0.01))])
+
+    assert slow.timed_out
+    assert fast.value == "ok"
+
+
+def test_context_variables_carry_over():
+    """Calls see the context variables of the request that issued them"""
+    runner = ToolCallRunner(max_workers=2)
+    token = request_tenant.set("acme")
+    try:
+        (outcome,) = runner.run([("search", request_tenant.get)])
+    finally:
+        request_tenant.reset(token)
+
+    assert outcome.value == "acme"
+
+
+def test_async_calls_overlap_and_time_out():
+    """arun awaits calls concurrently, in call order, with the same per-tool timeouts"""
+    runner = ToolCallRunner(default_timeout=5, timeouts={"slow_tool": 0.1})
+
+    async def sleep_then(value, seconds):
+        await asyncio.sleep(seconds)
+        return value
+
+    start = time.perf_counter()
+    first, second, slow = asyncio.run(runner.arun([
+        ("search", lambda: sleep_then("a", 0.3)),
+        ("search", lambda: sleep_then("b", 0.3)),
+        ("slow_tool", lambda: sleep_then("late", 1.0)),
+    ]))
+    elapsed = time.perf_counter() - start
+
+    assert (first.value, second.value) == ("a", "b")
+    assert slow.timed_out
+    assert elapsed < 0.6
+
+
+def test_async_on_done_reports_each_call_as_it_finishes():
+    """on_done sees the fast call before the slow one, with the call's index"""
+    runner = ToolCallRunner(default_timeout=5)
+    finished = []
+
+    async def sleep_then(value, seconds):
+        await asyncio.sleep(seconds)
+        return value
+
+    async def on_done(index, outcome):
+        finished.append((index, outcome.value))
+
+    asyncio.run(runner.arun([
+        ("search", lambda: sleep_then("slow", 0.2)),
+        ("search", lambda: sleep_then("fast", 0.01)),
+    ], on_done=on_done))
+
+    assert finished == [(1, "fast"), (0, "slow")]
+
+
+if __name__ == "__main__":
+    test_calls_overlap_and_keep_order()
+    test_per_tool_timeout_and_errors()
+    test_deadline_starts_when_call_runs()
+    test_hung_call_does_not_starve_next_request()
+    test_context_variables_carry_over()
+    test_async_calls_overlap_and_time_out()
+    test_async_on_done_reports_each_call_as_it_finishes()
+    print("All tool runner tests passed")
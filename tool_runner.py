@@ -0,0 +1,169 @@
+"""
+Concurrent tool execution for the agent's tool node
+
+The tool calls in one LLM message are independent, so they run on a small
+thread pool of their own instead of one after another: the tool phase takes
+about as long as the slowest call rather than the sum. Results come back in
+call order, and each call has its own timeout (per tool name, from chat.tools
+in config), counted from when the call starts running. A call still queued
+behind the same request's other calls gives up after the same timeout. A call
+that times out is reported to the LLM as failed; its thread finishes in the
+background but is not waited for, and since every request gets fresh workers a
+hung call never holds up another request's tools. arun() is the asyncio counterpart for the
+async chat path: the calls are coroutines gathered on the event loop, with the
+same per-tool timeouts.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class ToolOutcome(NamedTuple):
+    """Result of one tool call: value on success, error message on failure or timeout"""
+    value: Any
+    error: Optional[str]
+    elapsed_ms: float
+    timed_out: bool = False
+
+
+class _CallStart:
+    """Set by the worker thread when a call starts running"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.at = 0.0
+
+    def mark(self) -> None:
+        self.at = time.perf_counter()
+        self.event.set()
+
+
+class ToolCallRunner:
+    """Runs independent tool calls concurrently with per-tool timeouts"""
+
+    def __init__(self, max_workers: int = 4, default_timeout: float = 30.0, timeouts: Optional[Dict[str, float]] = None):
+        """
+        Initialize the runner
+
+        Args:
+            max_workers: Maximum tool calls of one request running at once
+            default_timeout: Seconds a tool call may take unless overridden
+            timeouts: Per tool name overrides of default_timeout
+        """
+        self.max_workers = max(int(max_workers), 1)
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+
+    def timeout_for(self, tool_name: str) -> float:
+        """Timeout in seconds for a tool"""
+        return self.timeouts.get(tool_name, self.default_timeout)
+
+    def run(self, calls: List[Tuple[str, Callable[[], Any]]]) -> List[ToolOutcome]:
+        """
+        Run tool calls concurrently and collect their outcomes in call order
+
+        Args:
+            calls: (tool name, zero-argument callable) per call
+
+        Returns:
+            List[ToolOutcome]: One outcome per call, in the order given
+        """
+        if not calls:
+            return []
+        # A pool per request: calls of other requests (or ones left hung by a timeout) can't hold its workers
+        executor = ThreadPoolExecutor(max_workers=min(len(calls), self.max_workers), thread_name_prefix="tool")
+        try:
+            submitted = []
+            for name, fn in calls:
+                started = _CallStart()
+                # Run in a copy of the caller's context so context variables (tenant, tracing) carry over
+                future = executor.submit(contextvars.copy_context().run, self._timed, fn, started)
+                submitted.append((name, future, started, time.perf_counter()))
+            return [self._collect(name, future, started, queued_at) for name, future, started, queued_at in submitted]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, name: str, future, started: _CallStart, queued_at: float) -> ToolOutcome:
+        """Wait for one call: up to its timeout to start, then up to its timeout to finish"""
+        timeout = self.timeout_for(name)
+        if not started.event.wait(max(queued_at + timeout - time.perf_counter(), 0.0)) and future.cancel():
+            logger.warning(f"Tool {name} did not start within {timeout:.0f}s")
+            return ToolOutcome(None, f"did not start within {timeout:.0f}s", (time.perf_counter() - queued_at) * 1000, True)
+        started.event.wait()
+        try:
+            value, elapsed_ms = future.result(timeout=max(started.at + timeout - time.perf_counter(), 0.0))
+            return ToolOutcome(value, None, elapsed_ms)
+        except FutureTimeoutError:
+            logger.warning(f"Tool {name} timed out after {timeout:.0f}s")
+            return ToolOutcome(None, f"timed out after {timeout:.0f}s", (time.perf_counter() - started.at) * 1000, True)
+        except Exception as e:
+            return ToolOutcome(None, str(e), (time.perf_counter() - started.at) * 1000)
+
+    async def arun(self, calls: List[Tuple[str, Callable[[], Awaitable[Any]]]],
+                   on_done: Optional[Callable[[int, ToolOutcome], Awaitable[None]]] = None) -> List[ToolOutcome]:
+        """
+        Run async tool calls concurrently and collect their outcomes in call order
+
+        Args:
+            calls: (tool name, zero-argument coroutine function) per call
+            on_done: Awaited with (call index, outcome) as soon as each call finishes,
+                e.g. to report progress while slower calls are still running
+
+        Returns:
+            List[ToolOutcome]: One outcome per call, in the order given
+        """
+        async def run_one(index: int, name: str, fn: Callable[[], Awaitable[Any]]) -> ToolOutcome:
+            start = time.perf_counter()
+            timeout = self.timeout_for(name)
+            try:
+                value = await asyncio.wait_for(fn(), timeout=timeout)
+                outcome = ToolOutcome(value, None, (time.perf_counter() - start) * 1000)
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {name} timed out after {timeout:.0f}s")
+                outcome = ToolOutcome(None, f"timed out after {timeout:.0f}s", (time.perf_counter() - start) * 1000, True)
+            except Exception as e:
+                outcome = ToolOutcome(None, str(e), (time.perf_counter() - start) * 1000)
+
+            if on_done is not None:
+                try:
+                    await on_done(index, outcome)
+                except Exception as e:
+                    logger.warning(f"Tool {name} completion callback failed: {e}")
+            return outcome
+
+        return list(await asyncio.gather(*(run_one(i, name, fn) for i, (name, fn) in enumerate(calls))))
+
+    @staticmethod
+    def _timed(fn: Callable[[], Any], started: _CallStart) -> Tuple[Any, float]:
+        started.mark()
+        value = fn()
+        return value, (time.perf_counter() - started.at) * 1000
+
+
+# Shared runner built from config, created on first use
+_tool_runner: Optional[ToolCallRunner] = None
+_tool_runner_lock = threading.Lock()
+
+
+def get_tool_runner() -> ToolCallRunner:
+    """Get the shared tool runner configured from chat.tools"""
+    global _tool_runner
+    if _tool_runner is None:
+        with _tool_runner_lock:
+            if _tool_runner is None:
+                tools_config = get_config().get('chat.tools', {}) or {}
+                _tool_runner = ToolCallRunner(
+                    max_workers=tools_config.get('max_workers', 4),
+                    default_timeout=tools_config.get('timeout_seconds', 30),
+                    timeouts=tools_config.get('timeouts', {})
+                )
+    return _tool_runner
@@ -4,6 +4,9 @@ Vector Database Metadata Update Script for Multi-Tenant RBAC
 
 This script updates existing documents in the ChromaDB vector store to include
 the new multi-tenant metadata fields: tenant_id, access_roles, and document_visibility.
+Every collection is scanned; with collection sharding enabled, documents that end up
+with a tenant_id routed to another collection are moved there (re-added with their
+embeddings, then deleted from the old collection).
 
 Usage:
     python update_existing_docs_metadata.py --tenant_id <tenant_id> --access_roles <role1> <role2> [--document_visibility <visibility>] [--dry_run]
@@ -27,7 +30,10 @@ from datetime import datetime
 import sqlite_fix  # Import before ChromaDB
 
 # Import our existing services and models
-from services import vector_store, db_collection_name
+from services import (
+    get_collection_name, get_vector_store, list_collection_names, record_metadata_update, delete_documents,
+    _get_chroma_client
+)
 from api.models.requests import UserRole, DocumentVisibility
 from logger_setup import setup_logger
 
@@ -38,9 +44,9 @@ class VectorDBMetadataUpdater:
     """Class to handle updating metadata for existing documents in ChromaDB"""
 
     def __init__(self):
-        self.vector_store = vector_store
-        self.collection = vector_store._collection
+        self.client = _get_chroma_client()
         self.updated_count = 0
+        self.moved_count = 0
         self.error_count = 0
 
     def validate_inputs(self, tenant_id: str, access_roles: list, document_visibility: str) -> bool:
@@ -71,13 +77,18 @@ class VectorDBMetadataUpdater:
         return True
 
     def get_existing_documents(self) -> Optional[Dict]:
-        """Retrieve all existing documents from the vector store"""
+        """Retrieve all existing documents from every collection, remembering each one's collection"""
         try:
             logger.info("Fetching existing documents from ChromaDB...")
-            # Get all documents from the collection
-            results = self.collection.get(
-                include=['metadatas', 'documents']
-            )
+            results = {'ids': [], 'metadatas': [], 'documents': [], 'collections': []}
+            for collection_name in list_collection_names():
+                page = self.client.get_collection(collection_name).get(
+                    include=['metadatas', 'documents']
+                )
+                results['ids'].extend(page['ids'])
+                results['metadatas'].extend(page['metadatas'])
+                results['documents'].extend(page['documents'])
+                results['collections'].extend([collection_name] * len(page['ids']))
 
             if not results['ids']:
                 logger.warning("No documents found in the vector store")
@@ -182,11 +193,29 @@ class VectorDBMetadataUpdater:
                     logger.debug(f"Updating document {doc_id} metadata")
 
             if not dry_run:
-                # Perform batch update
                 logger.info(f"Updating metadata for {len(updated_ids)} documents...")
-                self.collection.update(
+                target_collection = get_collection_name(tenant_id)
+                by_collection: Dict[str, List[int]] = {}
+                for position, doc_index in enumerate(docs_to_update):
+                    by_collection.setdefault(documents['collections'][doc_index], []).append(position)
+
+                old_metadatas = [documents['metadatas'][doc_index] for doc_index in docs_to_update]
+                for collection_name, positions in by_collection.items():
+                    ids = [updated_ids[p] for p in positions]
+                    metadatas = [updated_metadatas[p] for p in positions]
+                    if collection_name == target_collection:
+                        self.client.get_collection(collection_name).update(ids=ids, metadatas=metadatas)
+                    else:
+                        self.move_documents(collection_name, ids, metadatas, tenant_id)
+                        # delete_documents already took the old copies off the counters and keyword index
+                        for p in positions:
+                            old_metadatas[p] = {}
+                # Keep per-tenant document counters in step with the reassigned tenant_id
+                record_metadata_update(
+                    old_metadatas,
+                    updated_metadatas,
                     ids=updated_ids,
-                    metadatas=updated_metadatas
+                    texts=[documents['documents'][doc_index] for doc_index in docs_to_update]
                 )
 
                 self.updated_count = len(updated_ids)
@@ -201,6 +230,25 @@ class VectorDBMetadataUpdater:
             self.error_count += 1
             return False
 
+    def move_documents(self, source_collection: str, ids: List[str], metadatas: List[Dict], tenant_id: str) -> None:
+        """Move chunks into the new tenant's shard: re-add with their embeddings, then delete the originals"""
+        source = self.client.get_collection(source_collection)
+        existing = source.get(ids=ids, include=['embeddings', 'documents'])
+        # get() does not keep the requested order
+        position = {chunk_id: i for i, chunk_id in enumerate(existing['ids'])}
+        order = [position[chunk_id] for chunk_id in ids]
+
+        target = get_vector_store(tenant_id)._collection
+        target.add(
+            ids=ids,
+            embeddings=[existing['embeddings'][i] for i in order],
+            documents=[existing['documents'][i] for i in order],
+            metadatas=metadatas
+        )
+        delete_documents(None, ids, collection_name=source_collection)
+        self.moved_count += len(ids)
+        logger.info(f"Moved {len(ids)} documents from {source_collection} to {target.name}")
+
     def verify_updates(self, updated_ids: List[str], tenant_id: str, access_roles: list) -> bool:
         """Verify that the updates were applied correctly"""
         try:
@@ -210,14 +258,14 @@ class VectorDBMetadataUpdater:
             sample_size = min(3, len(updated_ids))
             sample_ids = updated_ids[:sample_size]
 
-            results = self.collection.get(
+            results = get_vector_store(tenant_id)._collection.get(
                 ids=sample_ids,
                 include=['metadatas']
             )
 
             verification_passed = True
             for i, metadata in enumerate(results['metadatas']):
-                doc_id = sample_ids[i]
+                doc_id = results['ids'][i]
 
                 if metadata.get('tenant_id') != tenant_id:
                     logger.error(f"❌ Verification failed for {doc_id}: tenant_id mismatch")
@@ -254,7 +302,7 @@ class VectorDBMetadataUpdater:
         logger.info("=" * 60)
         logger.info("VECTOR DATABASE METADATA UPDATE SCRIPT")
         logger.info("=" * 60)
-        logger.info(f"Target Collection: {db_collection_name}")
+        logger.info(f"Target Collection: {get_collection_name(tenant_id)}")
         logger.info(f"Tenant ID: {tenant_id}")
         logger.info(f"Access Roles: {', '.join(access_roles)}")
         logger.info(f"Document Visibility: {document_visibility}")
@@ -303,6 +351,7 @@ class VectorDBMetadataUpdater:
             logger.info("🔍 This was a dry run - no actual changes made")
         else:
             logger.info(f"📊 Documents updated: {self.updated_count}")
+            logger.info(f"📦 Documents moved to the tenant's collection: {self.moved_count}")
             logger.info(f"❌ Errors encountered: {self.error_count}")
             logger.info("✅ Update process completed successfully")
         logger.info("=" * 60)